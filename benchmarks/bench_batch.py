@@ -0,0 +1,81 @@
+'''
+Time a formula over a table, evaluated row by row and a column at a time.
+
+The row-by-row times call the interpreter once per row, as embedders did before batch
+evaluation. The batch times are for lists, and for NumPy arrays if NumPy is installed.
+The last formula calls a builtin, so its batches fall back to row by row.
+
+Run from the repository root with `python -m benchmarks.bench_batch [rows...]`.
+'''
+
+import random
+import sys
+import time
+
+from src import compile_formula
+from src._batch import numpy
+from src._environment import Environment
+from src._interpret import Interpreter
+from src._symbols import symbols
+
+FORMULAS = [
+    'price * quantity - discount',
+    '(price * quantity > 100 and quantity < 10) or price < 0.5',
+    'price * quantity > clock()',
+]
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+
+
+def table(rows: int) -> dict[str, list[object]]:
+    rng = random.Random(rows)
+    return {
+        'price': [round(rng.uniform(0, 50), 2) for _ in range(rows)],
+        'quantity': [rng.randint(1, 20) for _ in range(rows)],
+        'discount': [rng.choice([0, 5, 10]) for _ in range(rows)],
+    }
+
+
+def row_by_row(source: str, columns: dict[str, list[object]]) -> list[object]:
+    expression = compile_formula(source).expression
+    interpreter = Interpreter()
+    symbol_columns = [
+        (symbols.intern(name), values) for name, values in columns.items()
+    ]
+    results = []
+    for row in range(len(columns['price'])):
+        env = Environment(enclosing=interpreter.globals)
+        for symbol, values in symbol_columns:
+            env.define(symbol, values[row])
+        results.append(interpreter.eval_expr(expression, env))
+    return results
+
+
+def timed(function, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or DEFAULT_SIZES
+    names = ['rows', 'by row', 'lists'] + (['numpy'] if numpy is not None else [])
+    for source in FORMULAS:
+        formula = compile_formula(source)
+        print(source)
+        print(''.join(f'{name:>10}' for name in names))
+        for size in sizes:
+            columns = table(size)
+            times = [
+                timed(row_by_row, source, columns),
+                timed(formula.evaluate, columns),
+            ]
+            if numpy is not None:
+                arrays = {name: numpy.array(values) for name, values in columns.items()}
+                times.append(timed(formula.evaluate, arrays))
+            print(f'{size:>10}' + ''.join(f'{t:>9.3f}s' for t in times))
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+'''
+Time field-heavy object code, with and without inline caches on property accesses.
+
+Without caches, every access looks the property up in its instance's shape (and, for
+methods, up the class chain). The sites are made megamorphic before the run, which is
+how the interpreter treats sites that see too many shapes.
+
+The first table times single accesses on their own, and the second whole programs, in
+which the rest of the tree-walker's work dilutes the difference.
+
+Run from the repository root with `python -m benchmarks.bench_classes`.
+'''
+
+import io
+import time
+from collections import Counter
+from timeit import Timer
+from typing import cast
+
+from src._expr import Get, Set
+from src._interpret import Interpreter
+from src._lox_class import LoxInstance, get_property, set_property
+from src._parse import Parser
+from src._scan import scan
+from src._stmt import Stmt, walk
+from src._symbols import symbols
+
+PROGRAMS = {
+    # One class: every site is monomorphic.
+    'particles': '''
+        class Particle {
+            init(x, y, dx, dy) { this.x = x; this.y = y; this.dx = dx; this.dy = dy; }
+            step() {
+                this.x = this.x + this.dx;
+                this.y = this.y + this.dy;
+                if (this.x < 0 or this.x > 100) this.dx = -this.dx;
+                if (this.y < 0 or this.y > 100) this.dy = -this.dy;
+            }
+        }
+        var a = Particle(1, 2, 3, 4);
+        var b = Particle(50, 50, -1, 2);
+        var c = Particle(99, 1, 2, -3);
+        for (var i = 0; i < 5000; i = i + 1) { a.step(); b.step(); c.step(); }
+        print a.x + b.y + c.x;
+    ''',
+    # Three classes through the same sites: polymorphic.
+    'shapes': '''
+        class Square { init(s) { this.side = s; this.area = s * s; } }
+        class Rect { init(w, h) { this.w = w; this.h = h; this.area = w * h; } }
+        class Tri { init(b, h) { this.b = b; this.h = h; this.area = b * h / 2; } }
+        var square = Square(3);
+        var rect = Rect(2, 5);
+        var tri = Tri(4, 4);
+        var total = 0;
+        var next = 0;
+        for (var i = 0; i < 20000; i = i + 1) {
+            var shape = square;
+            if (next == 1) shape = rect;
+            if (next == 2) shape = tri;
+            next = next + 1;
+            if (next == 3) next = 0;
+            total = total + shape.area;
+            shape.area = shape.area + 1;
+        }
+        print total;
+    ''',
+    # Building records with a fixed layout.
+    'records': '''
+        class Record {}
+        var sum = 0;
+        for (var i = 0; i < 10000; i = i + 1) {
+            var r = Record();
+            r.id = i; r.a = 1; r.b = 2; r.c = 3; r.d = 4;
+            sum = sum + r.id + r.a + r.b + r.c + r.d;
+        }
+        print sum;
+    ''',
+}
+
+
+# A single access, timed in isolation from the rest of the interpreter.
+ACCESSES = {
+    'field get': 'o.f;',
+    'method get': 'o.m;',
+    'field set': 'o.f = 1;',
+    'new field': 'o.g = 1;',
+}
+ACCESS_SETUP = '''
+    class A { m() {} }
+    class B < A {}
+    class C < B { init() { this.a = 1; this.b = 2; this.f = 3; } }
+    var o = C();
+'''
+
+
+def property_sites(statements: list[Stmt]) -> list[Get | Set]:
+    return [
+        node
+        for stmt in statements
+        for node in walk(stmt)
+        if isinstance(node, (Get, Set))
+    ]
+
+
+def best_time(source: str, cached: bool, repeat: int = 3) -> tuple[float, Counter]:
+    best = float('inf')
+    states: Counter = Counter()
+    for _ in range(repeat):
+        # Parse afresh each time, so caches from one run don't help the next.
+        tokens, _ = scan(source)
+        statements = Parser().parse(tokens)
+        if not cached:
+            for site in property_sites(statements):
+                site.cache.megamorphic = True
+        interpreter = Interpreter(output=io.StringIO())
+        start = time.perf_counter()
+        interpreter.interpret(statements)
+        best = min(best, time.perf_counter() - start)
+        states = Counter(site.cache.state for site in property_sites(statements))
+    return best, states
+
+
+def access_time(kind: str, cached: bool, number: int = 200_000) -> float:
+    'Nanoseconds per run of the property access in ACCESSES[kind].'
+    tokens, _ = scan(ACCESS_SETUP + ACCESSES[kind])
+    statements = Parser().parse(tokens)
+    interpreter = Interpreter(output=io.StringIO())
+    interpreter.interpret(statements[:-1])
+    instance = interpreter.globals.values[symbols.intern('o')]
+    site = [node for node in walk(statements[-1]) if isinstance(node, (Get, Set))][0]
+    site.cache.megamorphic = not cached
+    fresh = cast(LoxInstance, instance).shape
+    best = float('inf')
+    for _ in range(3):
+        if isinstance(site, Get):
+            timer = Timer(lambda: get_property(site, instance))
+        else:
+            def set_field(site: Set = site) -> None:
+                # Start from the same shape each time, so adding a field stays a
+                # transition rather than becoming an overwrite.
+                cast(LoxInstance, instance).shape = fresh
+                del cast(LoxInstance, instance).fields[3:]
+                set_property(site, instance, 1)
+            timer = Timer(set_field)
+        best = min(best, timer.timeit(number) / number * 1e9)
+    return best
+
+
+def main():
+    print(f'{"access":<10} {"uncached":>9} {"cached":>9} {"speedup":>8}')
+    for kind in ACCESSES:
+        uncached = access_time(kind, cached=False)
+        cached = access_time(kind, cached=True)
+        print(
+            f'{kind:<10} {uncached:>7.0f}ns {cached:>7.0f}ns {uncached / cached:>7.2f}x'
+        )
+    print()
+    print(f'{"program":<10} {"uncached":>9} {"cached":>9} {"speedup":>8}  cache states')
+    for name, source in PROGRAMS.items():
+        uncached, _ = best_time(source, cached=False)
+        cached, states = best_time(source, cached=True)
+        summary = ', '.join(f'{n} {state}' for state, n in sorted(states.items()))
+        print(
+            f'{name:<10} {uncached:>8.3f}s {cached:>8.3f}s '
+            f'{uncached / cached:>7.2f}x  {summary}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+'''
+Time a recursive fib, which spends most of its time calling and returning.
+
+Returns are signalled by the value execute() gives back. For comparison, the benchmark
+also runs an interpreter that unwinds returns with an exception instead.
+
+Run from the repository root with `python -m benchmarks.bench_fib [n]`.
+'''
+
+import io
+import sys
+import time
+
+from src._environment import Environment
+from src._expr import Call
+from src._interpret import Interpreter, Return
+from src._lox_callable import LoxFunction
+from src._parse import Parser
+from src._scan import scan
+from src._stmt import ReturnStmt, Stmt
+
+SOURCE = '''
+fun fib(n) {
+    if (n < 2) return n;
+    return fib(n - 2) + fib(n - 1);
+}
+print fib(%d);
+'''
+
+
+class ReturnException(Exception):
+
+    def __init__(self, value: object):
+        self.value = value
+
+
+class ExceptionInterpreter(Interpreter):
+    'Returns by raising, the way a lot of tree-walkers do it.'
+
+    def execute(self, stmt: Stmt, env: Environment) -> Return | None:
+        if isinstance(stmt, ReturnStmt):
+            value = None if stmt.value is None else self.eval_expr(stmt.value, env)
+            raise ReturnException(value)
+        return super().execute(stmt, env)
+
+    def eval_call(self, expr: Call, env: Environment) -> object:
+        callee = self.eval_expr(expr.callee, env)
+        args = [self.eval_expr(arg, env) for arg in expr.arguments]
+        function = self.check_call(expr.offset, callee, args)
+        if not isinstance(function, LoxFunction):
+            return function.call(interpreter=self, args=args)
+        try:
+            self.execute_block(
+                function.declaration.body, function.make_environment(self, args)
+            )
+        except ReturnException as ret:
+            return ret.value
+        return None
+
+
+def calls(n: int) -> int:
+    'How many times fib(n) calls fib, including the outermost call.'
+    a, b = 1, 1
+    for _ in range(n):
+        a, b = b, a + b + 1
+    return a
+
+
+def best_time(interpreter_type: type[Interpreter], n: int, repeat: int = 3) -> float:
+    tokens, _ = scan(SOURCE % n)
+    statements = Parser().parse(tokens)
+    best = float('inf')
+    for _ in range(repeat):
+        interpreter = interpreter_type(output=io.StringIO())
+        start = time.perf_counter()
+        interpreter.interpret(statements)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 22
+    print(f'fib({n}): {calls(n)} calls')
+    print(f'{"returns by":<12} {"time":>9} {"calls/s":>10}')
+    for name, interpreter_type in [
+        ('value', Interpreter),
+        ('exception', ExceptionInterpreter),
+    ]:
+        elapsed = best_time(interpreter_type, n)
+        print(f'{name:<12} {elapsed:>8.3f}s {calls(n) / elapsed:>10.0f}')
+
+
+if __name__ == '__main__':
+    main()
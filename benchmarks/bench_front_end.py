@@ -0,0 +1,87 @@
+'''
+Measure how the scanner and parser scale with program size.
+
+For each size and shape of generated program, reports tokens (and megabytes) scanned
+per second, AST nodes parsed per second, and the peak memory each phase allocated.
+Throughput that falls as programs grow points at something nonlinear.
+
+Run from the repository root with `python -m benchmarks.bench_front_end`. Pass
+`--sizes 1K,1M,100M` and `--shapes nesting,strings` to choose what to measure; the
+largest default size is 1M, since the biggest programs take minutes.
+'''
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from src._parse import Parser
+from src._scan import scan
+from src._stmt import walk
+
+from .generate import SHAPES, generate, parse_size
+
+DEFAULT_SIZES = '1K,10K,100K,1M'
+DEFAULT_SHAPES = ','.join([*SHAPES, 'mixed'])
+
+
+def measure(phase, *args):
+    '''
+    Run phase(*args) twice: once timed, and once under tracemalloc.
+
+    Returns the result, the time taken, and the peak memory allocated while running.
+    '''
+    gc.collect()
+    start = time.perf_counter()
+    result = phase(*args)
+    elapsed = time.perf_counter() - start
+    del result
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = phase(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def parse(tokens):
+    parser = Parser()
+    statements = parser.parse(tokens)
+    return statements, parser.errors
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--sizes', default=DEFAULT_SIZES)
+    arg_parser.add_argument('--shapes', default=DEFAULT_SHAPES)
+    options = arg_parser.parse_args()
+
+    print(
+        f'{"shape":<12} {"size":>6} {"tokens":>10} {"tokens/s":>10} {"MB/s":>6} '
+        f'{"scan MB":>8} '
+        f'{"nodes":>10} {"nodes/s":>10} {"parse MB":>9}'
+    )
+    for shape in options.shapes.split(','):
+        for size_text in options.sizes.split(','):
+            source = generate(parse_size(size_text), shape)
+            (tokens, _), scan_time, scan_peak = measure(scan, source)
+            try:
+                (statements, _), parse_time, parse_peak = measure(parse, tokens)
+            except RecursionError:
+                print(f'{shape:<12} {size_text:>6}  too deep to parse')
+                continue
+            nodes = sum(1 for stmt in statements for _ in walk(stmt))
+            print(
+                f'{shape:<12} {size_text:>6} {len(tokens):>10} '
+                f'{len(tokens) / scan_time:>10.0f} '
+                f'{len(source) / scan_time / 2 ** 20:>6.2f} '
+                f'{scan_peak / 2 ** 20:>8.1f} '
+                f'{nodes:>10} {nodes / parse_time:>10.0f} '
+                f'{parse_peak / 2 ** 20:>9.1f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
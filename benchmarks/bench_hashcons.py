@@ -0,0 +1,66 @@
+'''
+Measure how much hash-consing shares in generated programs, and the memory it saves.
+
+For each shape of generated program, reports how many AST nodes the parser made, what
+fraction hash-consing replaced with an identical node made earlier, and how much memory
+the parsed statements hold on to with and without it.
+
+Run from the repository root with `python -m benchmarks.bench_hashcons [size]`, where
+size is like 1M; the default is 1M.
+'''
+
+import gc
+import sys
+import tracemalloc
+
+from src._parse import Parser
+from src._scan import scan
+
+from .generate import SHAPES, generate, parse_size
+
+
+def retained(source: str, hash_cons: bool) -> tuple[int, Parser]:
+    'How many bytes the statements parsed from source hold on to.'
+    gc.collect()
+    tracemalloc.start()
+    try:
+        tokens, _ = scan(source)
+        parser = Parser(hash_cons=hash_cons)
+        statements = parser.parse(tokens)
+        # Keep the counts, but not the table or the tokens.
+        conser = parser.hash_conser
+        if conser is not None:
+            conser.table.clear()
+            conser.kept.clear()
+        del tokens
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del statements
+    return size, parser
+
+
+def main():
+    size_text = sys.argv[1] if len(sys.argv) > 1 else '1M'
+    print(
+        f'{"shape":<12} {"nodes":>9} {"shared":>7} '
+        f'{"plain MB":>9} {"shared MB":>10} {"saved":>6}'
+    )
+    for shape in [*SHAPES, 'mixed']:
+        source = generate(parse_size(size_text), shape)
+        # Intern the program's names first, so neither run is charged for them.
+        retained(source, False)
+        plain, _ = retained(source, False)
+        shared, parser = retained(source, True)
+        conser = parser.hash_conser
+        assert conser is not None
+        print(
+            f'{shape:<12} {conser.nodes:>9} {conser.ratio:>7.1%} '
+            f'{plain / 2 ** 20:>9.1f} {shared / 2 ** 20:>10.1f} '
+            f'{1 - shared / plain:>6.1%}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+'''
+Time arithmetic-heavy functions with and without type inference.
+
+Without it, every arithmetic operator and comparison checks its operands are numbers.
+The programs keep their counters in locals, which is what inference can follow.
+
+Run from the repository root with `python -m benchmarks.bench_infer`.
+'''
+
+import io
+import time
+from unittest import mock
+
+from src import _parse
+from src._interpret import Interpreter
+from src._parse import Parser
+from src._scan import scan
+
+PROGRAMS = {
+    'counter': '''
+        fun count() {
+            var i = 0;
+            while (i < 200000) { i = i + 1; }
+            return i;
+        }
+        print count();
+    ''',
+    'nested': '''
+        fun nested() {
+            var total = 0;
+            for (var i = 0; i < 300; i = i + 1) {
+                for (var j = 0; j < 300; j = j + 1) { total = total + i * j; }
+            }
+            return total;
+        }
+        print nested();
+    ''',
+    'index math': '''
+        fun indexMath() {
+            var acc = 0;
+            for (var i = 0; i < 50000; i = i + 1) {
+                acc = acc + (i * 7 - i * 3) * 2 - -i;
+            }
+            return acc;
+        }
+        print indexMath();
+    ''',
+}
+
+
+def best_time(source: str, infer: bool, repeat: int = 3) -> float:
+    tokens, _ = scan(source)
+    if infer:
+        statements = Parser().parse(tokens)
+    else:
+        with mock.patch.object(_parse, 'infer_types'):
+            statements = Parser().parse(tokens)
+    best = float('inf')
+    for _ in range(repeat):
+        interpreter = Interpreter(output=io.StringIO())
+        start = time.perf_counter()
+        interpreter.interpret(statements)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f'{"program":<12} {"checked":>9} {"inferred":>9} {"speedup":>8}')
+    for name, source in PROGRAMS.items():
+        checked = best_time(source, infer=False)
+        inferred = best_time(source, infer=True)
+        print(
+            f'{name:<12} {checked:>8.3f}s {inferred:>8.3f}s '
+            f'{checked / inferred:>7.2f}x'
+        )
+
+
+if __name__ == '__main__':
+    main()
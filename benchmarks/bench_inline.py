@@ -0,0 +1,57 @@
+'''
+Time calls to small functions, with and without inlining.
+
+Each program calls a one-line helper in a loop. With inlining off the calls go through
+the usual checks and a block for the function's body; with it on, each call site
+evaluates the helper's expression itself.
+
+Run from the repository root with `python -m benchmarks.bench_inline`.
+'''
+
+import io
+import time
+
+from src._interpret import Interpreter
+from src._optimize import INLINE_BUDGET
+from src._parse import Parser
+from src._scan import scan
+
+PROGRAMS = {
+    'square': '''
+        fun sq(x) { return x * x; }
+        var total = 0;
+        for (var i = 0; i < 100000; i = i + 1) { total = total + sq(i); }
+        print total;
+    ''',
+    'nested': '''
+        fun add(a, b) { return a + b; }
+        fun lerp(a, b, t) { return add(a, (b - a) * t); }
+        var total = 0;
+        for (var i = 0; i < 50000; i = i + 1) { total = lerp(total, i, 0.5); }
+        print total;
+    ''',
+}
+
+
+def best_time(source: str, inline_budget: int, repeat: int = 3) -> float:
+    tokens, _ = scan(source)
+    statements = Parser(inline_budget).parse(tokens)
+    best = float('inf')
+    for _ in range(repeat):
+        interpreter = Interpreter(output=io.StringIO())
+        start = time.perf_counter()
+        interpreter.interpret(statements)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f'{"program":<12} {"calls":>9} {"inlined":>9} {"speedup":>8}')
+    for name, source in PROGRAMS.items():
+        called = best_time(source, inline_budget=0)
+        inlined = best_time(source, inline_budget=INLINE_BUDGET)
+        print(f'{name:<12} {called:>8.3f}s {inlined:>8.3f}s {called / inlined:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
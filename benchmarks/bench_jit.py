@@ -0,0 +1,42 @@
+'''
+Compare the tree-walker with the tracing JIT on loop-heavy programs.
+
+Run from the repository root with `python -m benchmarks.bench_jit`.
+'''
+
+import io
+import time
+
+from src._interpret import Interpreter
+from src._jit import TracingInterpreter
+from src._parse import Parser
+from src._scan import scan
+
+from .bench_numeric import PROGRAMS
+
+
+def best_time(source: str, jit: bool, repeat: int = 3) -> float:
+    tokens, _ = scan(source)
+    statements = Parser().parse(tokens)
+    best = float('inf')
+    for _ in range(repeat):
+        if jit:
+            interpreter: Interpreter = TracingInterpreter(output=io.StringIO())
+        else:
+            interpreter = Interpreter(output=io.StringIO())
+        start = time.perf_counter()
+        interpreter.interpret(statements)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f'{"program":<12} {"walker":>9} {"jit":>9} {"speedup":>8}')
+    for name, source in PROGRAMS.items():
+        walker = best_time(source, jit=False)
+        jit = best_time(source, jit=True)
+        print(f'{name:<12} {walker:>8.3f}s {jit:>8.3f}s {walker / jit:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
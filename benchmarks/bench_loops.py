@@ -0,0 +1,79 @@
+'''
+Time loops with and without the optimizer.
+
+Without counted-loop recognition, every iteration evaluates the loop's condition and
+increment in the tree-walker. With it, the counter comes from a Python range. The last
+program's loop also recomputes an expression that doesn't change, which the optimizer
+moves out of it. The loop bodies are kept small, since that's where the difference
+shows.
+
+Run from the repository root with `python -m benchmarks.bench_loops`.
+'''
+
+import io
+import time
+from unittest import mock
+
+from src import _parse
+from src._interpret import Interpreter
+from src._parse import Parser
+from src._scan import scan
+
+PROGRAMS = {
+    'empty': '''
+        for (var i = 0; i < 300000; i = i + 1) {}
+    ''',
+    'sum': '''
+        var total = 0;
+        for (var i = 0; i < 200000; i = i + 1) { total = total + i; }
+        print total;
+    ''',
+    'nested': '''
+        var total = 0;
+        for (var i = 0; i < 400; i = i + 1) {
+            for (var j = i; j > 0; j = j - 1) { total = total + 1; }
+        }
+        print total;
+    ''',
+    'invariant': '''
+        fun scale(width, height) {
+            var w = width * 1;
+            var h = height * 1;
+            var total = 0;
+            var i = 0;
+            while (i < 100000) { total = total + (w * h - 1) / 2; i = i + 1; }
+            return total;
+        }
+        print scale(3, 4);
+    ''',
+}
+
+
+def best_time(source: str, optimize: bool, repeat: int = 3) -> float:
+    tokens, _ = scan(source)
+    if optimize:
+        statements = Parser().parse(tokens)
+    else:
+        with mock.patch.object(_parse, 'optimize', lambda stmt, functions: stmt):
+            statements = Parser().parse(tokens)
+    best = float('inf')
+    for _ in range(repeat):
+        interpreter = Interpreter(output=io.StringIO())
+        start = time.perf_counter()
+        interpreter.interpret(statements)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f'{"program":<12} {"plain":>9} {"optimized":>9} {"speedup":>8}')
+    for name, source in PROGRAMS.items():
+        plain = best_time(source, optimize=False)
+        optimized = best_time(source, optimize=True)
+        print(
+            f'{name:<12} {plain:>8.3f}s {optimized:>8.3f}s {plain / optimized:>7.2f}x'
+        )
+
+
+if __name__ == '__main__':
+    main()
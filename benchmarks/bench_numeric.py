@@ -0,0 +1,55 @@
+'''
+Compare counter-heavy loops with integral literals scanned as ints versus floats.
+
+Run from the repository root with `python -m benchmarks.bench_numeric`.
+'''
+
+import io
+import time
+
+from src._interpret import Interpreter
+from src._parse import Parser
+from src._scan import scan
+
+PROGRAMS = {
+    'counter': '''
+        var i = 0;
+        while (i < 100000) { i = i + 1; }
+    ''',
+    'nested': '''
+        var total = 0;
+        for (var i = 0; i < 300; i = i + 1) {
+            for (var j = 0; j < 300; j = j + 1) { total = total + i * j; }
+        }
+        print total;
+    ''',
+    'index math': '''
+        var acc = 0;
+        for (var i = 0; i < 50000; i = i + 1) { acc = acc + (i * 7 - i * 3) * 2; }
+        print acc;
+    ''',
+}
+
+
+def best_time(source: str, integers: bool, repeat: int = 3) -> float:
+    tokens, _ = scan(source, integers)
+    statements = Parser().parse(tokens)
+    best = float('inf')
+    for _ in range(repeat):
+        interpreter = Interpreter(output=io.StringIO())
+        start = time.perf_counter()
+        interpreter.interpret(statements)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f'{"program":<12} {"floats":>9} {"ints":>9} {"speedup":>8}')
+    for name, source in PROGRAMS.items():
+        floats = best_time(source, integers=False)
+        ints = best_time(source, integers=True)
+        print(f'{name:<12} {floats:>8.3f}s {ints:>8.3f}s {floats / ints:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+'''
+Time parsing a large generated program serially and across worker processes.
+
+Both times include scanning. The parallel time also includes starting the pool, which
+is the price a one-off compile pays. On a machine with one CPU, parsing is serial
+either way.
+
+Run from the repository root with `python -m benchmarks.bench_parallel_parse [size]`,
+where size is like 10M; the default is 10M.
+'''
+
+import sys
+import time
+
+from src._parallel_parse import parse_parallel
+from src._parse import Parser
+from src._scan import scan
+
+from .generate import generate, parse_size
+
+
+def serial(source: str):
+    tokens, _ = scan(source)
+    return Parser().parse(tokens)
+
+
+def parallel(source: str):
+    tokens, _ = scan(source)
+    statements, _ = parse_parallel(source, tokens)
+    return statements
+
+
+def timed(function, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    size_text = sys.argv[1] if len(sys.argv) > 1 else '10M'
+    source = generate(parse_size(size_text), 'functions')
+    serial_time = timed(serial, source)
+    parallel_time = timed(parallel, source)
+    print(f'{"size":>6} {"serial":>9} {"parallel":>9} {"speedup":>8}')
+    print(
+        f'{size_text:>6} {serial_time:>8.2f}s {parallel_time:>8.2f}s '
+        f'{serial_time / parallel_time:>7.2f}x'
+    )
+
+
+if __name__ == '__main__':
+    main()
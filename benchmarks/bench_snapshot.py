@@ -0,0 +1,67 @@
+'''
+Time starting an interpreter with a prelude of declarations, with and without snapshots.
+
+Each way starts an interpreter whose globals are those the prelude declares:
+- cold: scans, parses and runs the prelude.
+- rerun: runs the already compiled prelude again.
+- load: loads a snapshot of the prelude's globals from bytes.
+- warm: starts from a snapshot already in memory.
+
+Run from the repository root with `python -m benchmarks.bench_snapshot`.
+'''
+
+import time
+
+from src._interpret import Interpreter
+from src._parse import Parser
+from src._scan import scan
+from src._snapshot import Snapshot
+
+
+def prelude(functions: int) -> str:
+    lines = []
+    for n in range(functions):
+        lines.append(
+            f'fun helper{n}(a, b) {{'
+            f' var t = a * {n} + b; if (t > {n}) return t - {n}; return t + b; }}'
+        )
+        lines.append(f'var constant{n} = {n} * 2.5;')
+        lines.append(f'var label{n} = "label" + "{n}";')
+    return '\n'.join(lines)
+
+
+def best_time(start, repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        began = time.perf_counter()
+        start()
+        best = min(best, time.perf_counter() - began)
+    return best
+
+
+def main():
+    print(f'{"functions":>9} {"cold":>9} {"rerun":>9} {"load":>9} {"warm":>9}')
+    for functions in [10, 100, 1000]:
+        source = prelude(functions)
+
+        def cold():
+            tokens, _ = scan(source)
+            Interpreter().interpret(Parser().parse(tokens))
+
+        tokens, _ = scan(source)
+        statements = Parser().parse(tokens)
+        interpreter = Interpreter()
+        interpreter.interpret(statements)
+        snapshot = Snapshot.capture(interpreter)
+        data = snapshot.to_bytes()
+        times = [
+            best_time(cold),
+            best_time(lambda: Interpreter().interpret(statements)),
+            best_time(lambda: Snapshot.from_bytes(data).instantiate()),
+            best_time(snapshot.instantiate),
+        ]
+        print(f'{functions:>9}', *(f'{seconds * 1000:>7.2f}ms' for seconds in times))
+
+
+if __name__ == '__main__':
+    main()
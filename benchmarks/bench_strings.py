@@ -0,0 +1,74 @@
+'''
+Time a report built up by repeated concatenation, with and without ropes.
+
+Without ropes every `s = s + line` copies the whole report so far, so the plain runs
+grow quadratically and are skipped at the largest sizes. The JIT runs the same loop
+compiled, which leaves concatenation as most of the work.
+
+Run from the repository root with `python -m benchmarks.bench_strings [sizes...]`.
+'''
+
+import io
+import sys
+import time
+from unittest import mock
+
+from src import _strings
+from src._interpret import Interpreter
+from src._jit import TracingInterpreter
+from src._parse import Parser
+from src._scan import scan
+
+SOURCE = '''
+var report = "";
+for (var i = 0; i < %d; i = i + 1) {
+    report = report + "row of the report\n";
+}
+print report == report + "";
+'''
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+# Sizes above this take too long without ropes, or in the tree-walker.
+MAX_PLAIN = 100_000
+MAX_WALKER = 100_000
+
+
+def run_time(appends: int, ropes: bool, jit: bool) -> float:
+    tokens, _ = scan(SOURCE % appends)
+    statements = Parser().parse(tokens)
+    output = io.StringIO()
+    interpreter: Interpreter
+    if jit:
+        interpreter = TracingInterpreter(output=output)
+    else:
+        interpreter = Interpreter(output=output)
+    threshold = _strings.ROPE_THRESHOLD if ropes else float('inf')
+    with mock.patch.object(_strings, 'ROPE_THRESHOLD', threshold):
+        start = time.perf_counter()
+        interpreter.interpret(statements)
+        elapsed = time.perf_counter() - start
+    assert output.getvalue() == 'true\n'
+    return elapsed
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or DEFAULT_SIZES
+    columns = [
+        ('plain', False, False, MAX_PLAIN),
+        ('rope', True, False, MAX_WALKER),
+        ('plain jit', False, True, MAX_PLAIN),
+        ('rope jit', True, True, None),
+    ]
+    print(f'{"appends":>9}' + ''.join(f' {name:>10}' for name, *_ in columns))
+    for size in sizes:
+        row = f'{size:>9}'
+        for _, ropes, jit, limit in columns:
+            if limit is not None and size > limit:
+                row += f' {"-":>10}'
+            else:
+                row += f' {run_time(size, ropes, jit):>9.3f}s'
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+'''
+Generate synthetic Lox programs of a given size, for benchmarking the front end.
+
+Programs are made of repeated chunks of one of several shapes, picked to stress
+different parts of the scanner and parser. The same size, shape and seed always give
+the same program.
+
+Run from the repository root with `python -m benchmarks.generate SIZE [SHAPE]` to print
+a program, where SIZE is a number of bytes such as 1K or 10M.
+'''
+
+import random
+import sys
+from typing import Callable
+
+# How deeply the 'nesting' shape nests blocks. The parser recurses once per level,
+# several frames at a time, so much deeper than this runs into the recursion limit.
+NESTING_DEPTH = 40
+# How many operands the 'expressions' shape strings together in one expression.
+CHAIN_LENGTH = 200
+# How long the strings in the 'strings' shape are.
+STRING_LENGTH = 2000
+
+SIZE_SUFFIXES = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+
+
+def parse_size(text: str) -> int:
+    'Parse a size such as 512, 1K or 100M into a number of bytes.'
+    multiplier = SIZE_SUFFIXES.get(text[-1:].upper())
+    if multiplier is None:
+        return int(text)
+    return int(float(text[:-1]) * multiplier)
+
+
+def functions(rng: random.Random, n: int) -> str:
+    return (
+        f'fun f{n}(a, b, c) {{\n'
+        f'    var x = a * {rng.randint(1, 99)} + b;\n'
+        f'    if (x > c and !(b == nil)) {{ print x; }} else {{ print "small"; }}\n'
+        f'    while (x > {rng.randint(1, 9)}) {{ x = x - 1; }}\n'
+        f'}}\n'
+    )
+
+
+def expressions(rng: random.Random, n: int) -> str:
+    operators = ['+', '-', '*', '/']
+    terms = [str(rng.randint(0, 999))]
+    for _ in range(CHAIN_LENGTH - 1):
+        operand = rng.choice(['g', str(rng.randint(1, 999)), '(g - 1)', '-g'])
+        terms.append(f'{rng.choice(operators)} {operand}')
+    return f'var e{n} = {" ".join(terms)};\n'
+
+
+def nesting(rng: random.Random, n: int) -> str:
+    opening = []
+    for _ in range(NESTING_DEPTH):
+        opening.append(
+            rng.choice(['{ ', 'if (g) { ', 'while (false) { ', 'for (;;) { '])
+        )
+    return f'{"".join(opening)}print {n};{" }" * NESTING_DEPTH}\n'
+
+
+def strings(rng: random.Random, n: int) -> str:
+    letters = 'abcdefghijklmnopqrstuvwxyz '
+    text = ''.join(rng.choice(letters) for _ in range(STRING_LENGTH))
+    return f'var s{n} = "{text}";\n'
+
+
+SHAPES: dict[str, Callable[[random.Random, int], str]] = {
+    'functions': functions,
+    'expressions': expressions,
+    'nesting': nesting,
+    'strings': strings,
+}
+
+
+def generate(size: int, shape: str = 'mixed', seed: int = 0) -> str:
+    '''
+    Generate a program of at least `size` bytes (and not much more).
+
+    `shape` is one of SHAPES, or 'mixed' to cycle through all of them.
+    '''
+    rng = random.Random(seed)
+    makers = list(SHAPES.values()) if shape == 'mixed' else [SHAPES[shape]]
+    chunks = ['var g = 1;\n']
+    length = len(chunks[0])
+    n = 0
+    while length < size:
+        chunk = makers[n % len(makers)](rng, n)
+        chunks.append(chunk)
+        length += len(chunk)
+        n += 1
+    return ''.join(chunks)
+
+
+if __name__ == '__main__':
+    sys.stdout.write(generate(parse_size(sys.argv[1]), *sys.argv[2:3]))
@@ -0,0 +1,38 @@
+'''
+pylox, a Lox interpreter.
+
+Embedders should compile a script once and run it as often as they like:
+
+    program = compile(source)
+    program.run(globals={'limit': 10}, output=buffer)
+
+Formulas are single expressions, evaluated a column at a time over rows of data:
+
+    formula = compile_formula('price * quantity')
+    formula.evaluate({'price': [2, 1.5], 'quantity': [3, 2]})
+
+A prelude of declarations can be run once, and its globals snapshotted for later runs to
+start from:
+
+    prelude = compile(prelude_source)
+    snapshot = Snapshot.capture(prelude.run(), prelude.lines)
+    program.run(snapshot=snapshot)
+'''
+
+from ._budget import Budget
+from ._errors import LoxError, LoxCompileError, LoxRuntimeError, LoxBudgetError
+from ._program import compile, compile_formula, Formula, Program
+from ._snapshot import Snapshot
+
+__all__ = [
+    'Budget',
+    'compile',
+    'compile_formula',
+    'Formula',
+    'LoxBudgetError',
+    'LoxCompileError',
+    'LoxError',
+    'LoxRuntimeError',
+    'Program',
+    'Snapshot',
+]
@@ -0,0 +1,247 @@
+'An interpreter that runs as an asyncio task, so many programs can share one thread.'
+
+import asyncio
+import inspect
+import time
+from typing import Any, Awaitable, Callable, Iterable, Sequence, TextIO, cast
+
+from ._budget import Budget, ENVIRONMENT_COST
+from ._expr import (
+    Expr, Binary, Grouping, Literal, Logical, Unary, Variable, Assignment, Call, Get,
+    Set, Super
+)
+from ._stmt import (
+    Stmt, ExprStmt, IfStmt, PrintStmt, VarStmt, WhileStmt, BlockStmt, FunctionStmt,
+    ReturnStmt, ClassStmt, ForRangeStmt
+)
+from ._environment import Cell, Environment
+from ._errors import LoxRuntimeError
+from ._interpret import Interpreter, Return, assign, is_truthy, stringify
+from ._lox_callable import LoxFunction
+from ._lox_class import LoxClass, get_property, set_property
+from ._symbols import INIT, symbols
+# We use it a lot, so an alias helps.
+from ._token import TokenType as TT
+
+
+class AsyncNativeCallable:
+    '''
+    A native function backed by a coroutine function.
+
+    Calling it from Lox suspends only the calling program until the coroutine finishes.
+    '''
+
+    def __init__(self, arity: int, function: Callable[..., Awaitable[object]]):
+        self.arity = arity
+        self.function = function
+
+    def call(self, interpreter: Any, args: list[object]) -> Awaitable[object]:
+        return self.function(*args)
+
+    def __str__(self) -> str:
+        return '<native fn>'
+
+
+async def _sleep(seconds: object) -> None:
+    if not isinstance(seconds, (float, int)):
+        raise LoxRuntimeError(None, 'sleep() expects a number of seconds.')
+    await asyncio.sleep(seconds)
+
+
+sleep = AsyncNativeCallable(1, _sleep)
+
+
+class AsyncInterpreter(Interpreter):
+    '''
+    An interpreter whose programs cooperatively yield to the event loop.
+
+    Each program runs for up to `time_slice` seconds before yielding, at a loop
+    back-edge or a call boundary. Natives may return awaitables, which are awaited
+    without blocking other programs.
+    '''
+
+    def __init__(
+        self,
+        budget: Budget | None = None,
+        output: TextIO | None = None,
+        time_slice: float = 0.005,
+    ):
+        super().__init__(budget, output)
+        self.time_slice = time_slice
+        self.slice_end = 0.0
+        self.globals.define(symbols.intern('sleep'), sleep)
+
+    def define_native(
+        self,
+        name: str,
+        arity: int,
+        function: Callable[..., Awaitable[object]],
+    ) -> None:
+        self.globals.define(symbols.intern(name), AsyncNativeCallable(arity, function))
+
+    async def interpret_async(
+        self,
+        statements: Sequence[Stmt],
+    ) -> LoxRuntimeError | None:
+        self.start_run()
+        self.slice_end = time.monotonic() + self.time_slice
+        try:
+            for stmt in statements:
+                await self.execute_async(stmt, self.globals)
+        except LoxRuntimeError as exc:
+            return exc
+        else:
+            return None
+
+    async def checkpoint(self) -> None:
+        # Yield to the event loop once this program has used up its time slice.
+        if time.monotonic() >= self.slice_end:
+            await asyncio.sleep(0)
+            self.slice_end = time.monotonic() + self.time_slice
+
+    async def execute_async(self, stmt: Stmt, env: Environment) -> Return | None:
+        match stmt:
+            case ExprStmt(expr):
+                await self.eval_async(expr, env)
+            case FunctionStmt():
+                self.define_function(stmt, env)
+            case ClassStmt():
+                self.define_class(stmt, env)
+            case PrintStmt(expr):
+                result = await self.eval_async(expr, env)
+                print(stringify(result), file=self.output)
+            case VarStmt(symbol, initializer, captured):
+                if initializer is not None:
+                    value = await self.eval_async(initializer, env)
+                else:
+                    value = None
+                env.define(symbol, Cell(value) if captured else value)
+            case WhileStmt(condition, body):
+                should_loop = await self.eval_async(condition, env)
+                while should_loop:
+                    result = await self.execute_async(body, env)
+                    if result is not None:
+                        return result
+                    if self.budget is not None:
+                        self.check_budget(stmt.offset)
+                    await self.checkpoint()
+                    should_loop = await self.eval_async(condition, env)
+            case ForRangeStmt(loop=loop):
+                return await self.execute_async(loop, env)
+            case BlockStmt(statements):
+                self.alloc_bytes += ENVIRONMENT_COST
+                return await self.execute_block_async(
+                    statements, Environment(enclosing=env)
+                )
+            case IfStmt(condition, then_branch, else_branch):
+                if is_truthy(await self.eval_async(condition, env)):
+                    return await self.execute_async(then_branch, env)
+                elif else_branch is not None:
+                    return await self.execute_async(else_branch, env)
+            case ReturnStmt(value):
+                if value is None:
+                    return Return(None)
+                return Return(await self.eval_async(value, env))
+            case _:
+                raise RuntimeError
+        return None
+
+    async def execute_block_async(
+        self,
+        stmts: list[Stmt],
+        env: Environment,
+    ) -> Return | None:
+        for stmt in stmts:
+            result = await self.execute_async(stmt, env)
+            if result is not None:
+                return result
+        return None
+
+    async def eval_async(self, expr: Expr, env: Environment) -> object:
+        match expr:
+            case Literal(value):
+                return value
+            case Logical(left, operator, right):
+                left_val = await self.eval_async(left, env)
+                if operator == TT.OR:
+                    if is_truthy(left_val):
+                        return left_val
+                else:  # operator == TT.AND
+                    if not is_truthy(left_val):
+                        return left_val
+                return await self.eval_async(right, env)
+            case Grouping(inner_expr):
+                return await self.eval_async(inner_expr, env)
+            case Unary(_, right):
+                return self.apply_unary(expr, await self.eval_async(right, env))
+            case Binary(left, _, right):
+                left_val = await self.eval_async(left, env)
+                right_val = await self.eval_async(right, env)
+                return self.apply_binary(expr, left_val, right_val)
+            case Call():
+                return await self.eval_call_async(expr, env)
+            case Assignment(_, value_expr):
+                value = await self.eval_async(value_expr, env)
+                assign(expr, value, env)
+                return value
+            case Variable(symbol, offset, captured):
+                value = env.get(symbol, offset)
+                return cast(Cell, value).value if captured else value
+            case Get(target):
+                return get_property(expr, await self.eval_async(target, env))
+            case Set(target, _, value_expr):
+                target_val = await self.eval_async(target, env)
+                value = await self.eval_async(value_expr, env)
+                set_property(expr, target_val, value)
+                return value
+            case Super():
+                return self.eval_super(expr, env)
+            case _:
+                raise RuntimeError
+
+    async def eval_call_async(self, expr: Call, env: Environment) -> object:
+        callee = await self.eval_async(expr.callee, env)
+        args = [await self.eval_async(arg, env) for arg in expr.arguments]
+        function = self.check_call(expr.offset, callee, args)
+        await self.checkpoint()
+        if isinstance(function, LoxFunction):
+            return await self.call_function_async(function, args)
+        if isinstance(function, LoxClass):
+            # The initializer may call natives that return awaitables, so it can't be
+            # left to LoxClass.call.
+            instance = function.instantiate(self)
+            initializer = function.find_method(INIT)
+            if initializer is not None:
+                await self.call_function_async(initializer.bind(instance), args)
+            return instance
+        try:
+            result = function.call(interpreter=self, args=args)
+            if inspect.isawaitable(result):
+                result = await result
+        except LoxRuntimeError as exc:
+            # Natives don't know where they were called from.
+            if exc.offset is None:
+                exc.offset = expr.offset
+            raise
+        return result
+
+    async def call_function_async(
+        self,
+        function: LoxFunction,
+        args: list[object],
+    ) -> object:
+        env = function.make_environment(self, args)
+        result = await self.execute_block_async(function.declaration.body, env)
+        return function.returned(result)
+
+
+async def run_concurrently(
+    programs: Iterable[Sequence[Stmt]],
+    budget: Budget | None = None,
+    time_slice: float = 0.005,
+) -> list[LoxRuntimeError | None]:
+    '''Run each program in its own AsyncInterpreter, returning their errors in order.'''
+    return await asyncio.gather(*(
+        AsyncInterpreter(budget, time_slice=time_slice).interpret_async(statements)
+        for statements in programs
+    ))
@@ -0,0 +1,269 @@
+'''
+Batch evaluation: one expression over many rows of data, a column at a time.
+
+Formulas over tabular data evaluate the same expression for every row. Rather than walk
+the tree once per row, evaluate_batch walks it once, and each node works on whole
+columns: arithmetic, comparisons and concatenation map the interpreter's own helpers
+over the columns, or use NumPy on columns of floats when NumPy is installed.
+
+A column-at-a-time node can't raise the interpreter's errors at the right row, so it
+never tries. Each column knows the Python types in it, and a node whose operand types
+could make any row fail, or that isn't an operator, literal or variable at all, gives
+up on the whole batch. The expression is then evaluated row by row by an Interpreter,
+which gets the same results and raises the same errors as calling it once per row would.
+'''
+
+from __future__ import annotations
+
+import operator
+from typing import Any, Callable, Mapping, Sequence
+
+from ._environment import Environment
+from ._expr import Expr, Binary, Grouping, Literal, Logical, Unary, Variable
+from ._interpret import NUMERIC, Interpreter, is_truthy
+from ._numbers import MAX_EXACT_INT, negate
+from ._strings import Rope
+from ._symbols import symbols
+# We use it a lot, so an alias helps.
+from ._token import TokenType as TT
+
+try:
+    import numpy  # type: ignore[import-not-found]
+except ImportError:
+    numpy = None
+
+NUMBERS = frozenset({int, float, bool})
+FLOATS = frozenset({float})
+RESULT_NUMBERS = frozenset({int, float})
+BOOLS = frozenset({bool})
+STRS = frozenset({str})
+# Values of any other type are truthy.
+FALSY = frozenset({bool, type(None)})
+
+# What the operators that take numbers do to NumPy arrays of floats, which give the same
+# answers as the interpreter's helpers.
+ARRAY_NUMERIC = {
+    **NUMERIC,
+    TT.MINUS: operator.sub,
+    TT.STAR: operator.mul,
+    TT.PLUS: operator.add,
+}
+COMPARISONS = {TT.GREATER, TT.GREATER_EQUAL, TT.LESS, TT.LESS_EQUAL}
+
+
+class Fallback(Exception):
+    'Raised when a batch has to be evaluated row by row.'
+
+
+class Column:
+    '''
+    The values of an expression for every row.
+
+    The values are a list, a NumPy array of floats, or for a constant, the one value.
+    `types` holds the type of every value, or a superset of them.
+    '''
+    __slots__ = ('values', 'types', 'constant')
+
+    def __init__(self, values: Any, types: frozenset[type], constant: bool = False):
+        self.values = values
+        self.types = types
+        self.constant = constant
+
+    def is_array(self) -> bool:
+        return numpy is not None and isinstance(self.values, numpy.ndarray)
+
+    def as_list(self, rows: int) -> list[object]:
+        if self.constant:
+            return [self.values] * rows
+        if self.is_array():
+            return self.values.tolist()
+        return self.values
+
+
+def evaluate_batch(
+    expr: Expr,
+    columns: Mapping[str, Sequence[object]],
+) -> list[object]:
+    '''
+    Evaluate expr once for each row of columns, and return the results in row order.
+
+    columns maps variable names to sequences of values, one per row: lists, arrays from
+    the array module, or NumPy arrays. They must all be the same length. Values are
+    used as Lox values, so they should be None, bools, numbers or strings; NumPy arrays
+    are converted to lists of Python values first. Other globals, such as builtins, are
+    available as usual.
+
+    Raises LoxRuntimeError for the first row that fails, exactly as evaluating the
+    expression for each row in turn would. Numbers may come back as floats where the
+    interpreter would have made ints, but they're always the same Lox numbers.
+    '''
+    lengths = {len(column) for column in columns.values()}
+    if len(lengths) != 1:
+        raise ValueError('A batch needs at least one column, all of the same length.')
+    rows = lengths.pop()
+    prepared = {
+        symbols.intern(name): prepare(column) for name, column in columns.items()
+    }
+    try:
+        result = BatchEvaluator(prepared, rows).evaluate(expr)
+    except Fallback:
+        return evaluate_rows(expr, prepared, rows)
+    values = result.as_list(rows)
+    if any(values is column for column in columns.values()):
+        # Don't hand back one of the caller's own lists.
+        return list(values)
+    return values
+
+
+def prepare(column: Sequence[object]) -> Column:
+    if numpy is not None and isinstance(column, numpy.ndarray):
+        if column.dtype.kind == 'f':
+            return Column(column.astype(numpy.float64, copy=False), FLOATS)
+        if column.dtype.kind in 'iu' and (
+            column.size == 0 or
+            -MAX_EXACT_INT <= column.min() and column.max() <= MAX_EXACT_INT
+        ):
+            # Small enough that doubles hold them exactly, as Lox numbers would.
+            return Column(column.astype(numpy.float64), FLOATS)
+        column = column.tolist()
+    elif not isinstance(column, list):
+        column = list(column)
+    return Column(column, frozenset(map(type, column)))
+
+
+def evaluate_rows(expr: Expr, columns: dict[int, Column], rows: int) -> list[object]:
+    interpreter = Interpreter()
+    interpreter.start_run()
+    values = {symbol: column.as_list(rows) for symbol, column in columns.items()}
+    results = []
+    for row in range(rows):
+        env = Environment(enclosing=interpreter.globals)
+        for symbol, column in values.items():
+            env.define(symbol, column[row])
+        result = interpreter.eval_expr(expr, env)
+        results.append(str(result) if type(result) is Rope else result)
+    return results
+
+
+class BatchEvaluator:
+
+    def __init__(self, columns: dict[int, Column], rows: int):
+        self.columns = columns
+        self.rows = rows
+
+    def evaluate(self, expr: Expr) -> Column:
+        match expr:
+            case Literal(value):
+                return Column(value, frozenset({type(value)}), constant=True)
+            case Variable(symbol):
+                column = self.columns.get(symbol)
+                if column is None:
+                    # Builtins, or an undefined variable.
+                    raise Fallback
+                return column
+            case Grouping(inner):
+                return self.evaluate(inner)
+            case Unary(op, right):
+                return self.unary(op, self.evaluate(right))
+            case Binary(left, op, right):
+                return self.binary(op, self.evaluate(left), self.evaluate(right))
+            case Logical(left, op, right):
+                return self.logical(op, self.evaluate(left), self.evaluate(right))
+            case _:
+                raise Fallback
+
+    def unary(self, op: TT, right: Column) -> Column:
+        if op == TT.BANG:
+            if right.constant:
+                return Column(not is_truthy(right.values), BOOLS, constant=True)
+            if not right.types & FALSY:
+                return Column(False, BOOLS, constant=True)
+            return Column([not is_truthy(value) for value in right.values], BOOLS)
+        if not right.types <= NUMBERS:
+            raise Fallback
+        if right.constant:
+            return Column(negate(right.values), RESULT_NUMBERS, constant=True)
+        if right.is_array():
+            return Column(-right.values, FLOATS)
+        return Column(list(map(negate, right.values)), RESULT_NUMBERS)
+
+    def binary(self, op: TT, left: Column, right: Column) -> Column:
+        if op == TT.EQUAL_EQUAL or op == TT.BANG_EQUAL:
+            return self.equality(op, left, right)
+        if op == TT.PLUS and left.types <= STRS and right.types <= STRS:
+            return self.apply(operator.add, left, right, STRS)
+        if not (left.types <= NUMBERS and right.types <= NUMBERS):
+            raise Fallback
+        if op == TT.SLASH and self.has_zero(right):
+            # The interpreter raises for these rows.
+            raise Fallback
+        types = BOOLS if op in COMPARISONS else RESULT_NUMBERS
+        if self.arrays(left, right):
+            result = ARRAY_NUMERIC[op](left.values, right.values)
+            if op in COMPARISONS:
+                return Column(result.tolist(), BOOLS)
+            return Column(result, FLOATS)
+        return self.apply(NUMERIC[op], left, right, types)
+
+    def equality(self, op: TT, left: Column, right: Column) -> Column:
+        if self.arrays(left, right):
+            result = (left.values == right.values).tolist()
+        else:
+            equal = self.apply(operator.eq, left, right, BOOLS)
+            if equal.constant:
+                return equal if op == TT.EQUAL_EQUAL else self.unary(TT.BANG, equal)
+            result = equal.values
+        if op == TT.BANG_EQUAL:
+            result = [not value for value in result]
+        return Column(result, BOOLS)
+
+    def logical(self, op: TT, left: Column, right: Column) -> Column:
+        types = left.types | right.types
+        if not left.types & FALSY:
+            # Every row is truthy.
+            return left if op == TT.OR else right
+        if left.constant:
+            truthy = is_truthy(left.values)
+            return left if truthy == (op == TT.OR) else right
+        lefts, rights = left.as_list(self.rows), right.as_list(self.rows)
+        if op == TT.OR:
+            values = [a if is_truthy(a) else b for a, b in zip(lefts, rights)]
+        else:
+            values = [b if is_truthy(a) else a for a, b in zip(lefts, rights)]
+        return Column(values, types)
+
+    def apply(
+        self,
+        function: Callable[[Any, Any], object],
+        left: Column,
+        right: Column,
+        types: frozenset[type],
+    ) -> Column:
+        'Apply a function of two values to each row.'
+        if left.constant and right.constant:
+            return Column(function(left.values, right.values), types, constant=True)
+        return Column(
+            list(map(function, left.as_list(self.rows), right.as_list(self.rows))),
+            types,
+        )
+
+    def arrays(self, left: Column, right: Column) -> bool:
+        '''
+        Whether an operation on numbers can be done with NumPy.
+
+        That's when one operand is an array and the other is an array or a constant.
+        Otherwise the other is a list, which may hold bools or big ints that NumPy would
+        treat differently, so the array is made a list instead.
+        '''
+        return (left.is_array() or right.is_array()) and all(
+            column.is_array() or (column.constant and column.types <= RESULT_NUMBERS)
+            for column in (left, right)
+        )
+
+    def has_zero(self, column: Column) -> bool:
+        if column.constant:
+            return column.values == 0
+        if column.is_array():
+            return bool((column.values == 0).any())
+        # Finds -0.0 and False too.
+        return 0 in column.values
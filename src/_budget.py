@@ -0,0 +1,34 @@
+'Per-run execution budgets for untrusted scripts.'
+
+from dataclasses import dataclass
+
+# Rough CPython sizes, in bytes, of the objects the interpreter allocates on behalf of a
+# script. They only need to be in the right ballpark for the allocation cap to be
+# useful.
+ENVIRONMENT_COST = 300
+FUNCTION_COST = 100
+INSTANCE_COST = 100
+STRING_COST = 50
+
+
+@dataclass(frozen=True)
+class Budget:
+    '''
+    Limits on how much work a single call to Interpreter.interpret may do.
+
+    Budgets are only checked at loop back-edges and on function entry, so a run can
+    overshoot a limit by the work done in one loop iteration or one function body.
+
+    Attributes
+    ----------
+    max_steps: int | None
+        The maximum number of loop iterations plus function calls.
+    timeout: float | None
+        The maximum wall-clock time, in seconds.
+    max_alloc_bytes: int | None
+        An approximate cap on the bytes allocated for environments, functions,
+        instances and concatenated strings.
+    '''
+    max_steps: int | None = None
+    timeout: float | None = None
+    max_alloc_bytes: int | None = None
@@ -0,0 +1,188 @@
+'''
+Capture analysis: find the variables that inner functions refer to.
+
+Functions don't keep the environment they were declared in alive. Instead, each
+FunctionStmt lists the variables it captures from the functions and blocks around it,
+and declaring the function copies just those variables into its closure. To make the
+copies share updates with the original, captured variables are kept in cells, and the
+declarations and references of captured variables are marked so the interpreter knows to
+go through the cell. Every other local is stored in its environment directly.
+
+Globals are never captured. Functions look them up in the global environment when
+they're called, as they always have, so they can refer to globals declared after them.
+
+Methods capture 'this' and 'super' from a scope that wraps the class's methods, the same
+way functions capture variables. Binding a method to an instance replaces the cell that
+holds 'this'.
+'''
+
+from dataclasses import dataclass, field
+
+from ._expr import (
+    Expr, Assignment, Binary, Call, Get, Grouping, Literal, Logical, Set, Super, Unary,
+    Variable
+)
+from ._stmt import (
+    Stmt, BlockStmt, ClassStmt, ExprStmt, FunctionStmt, IfStmt, PrintStmt, ReturnStmt,
+    VarStmt, WhileStmt
+)
+from ._symbols import SUPER, THIS
+
+
+@dataclass
+class Binding:
+    # How many functions deep the variable is declared. Zero is outside any function.
+    level: int
+    # The declaration, which for a parameter is its function. 'this' and 'super' have
+    # none.
+    declaration: VarStmt | FunctionStmt | ClassStmt | None
+    param: bool = False
+    references: list[Variable | Assignment] = field(default_factory=list)
+    captured: bool = False
+
+
+def analyze_captures(stmt: Stmt) -> None:
+    '''
+    Mark the captured variables in a top-level statement.
+
+    Top-level statements are independent of one another, since anything they share is a
+    global, so each can be analyzed on its own as soon as it's parsed.
+    '''
+    CaptureAnalysis().stmt(stmt)
+
+
+class CaptureAnalysis:
+
+    def __init__(self):
+        # The scopes of the blocks and functions being analyzed, innermost last. The
+        # global scope isn't here, since globals aren't captured.
+        self.scopes: list[dict[int, Binding]] = []
+        # For each function being analyzed, innermost last, the variables it captures.
+        # The values are unused; dicts keep the symbols in a stable order.
+        self.captures: list[dict[int, None]] = []
+
+    def declare(
+        self,
+        symbol: int,
+        declaration: VarStmt | FunctionStmt | ClassStmt | None,
+        param: bool = False,
+    ) -> Binding:
+        binding = Binding(len(self.captures), declaration, param)
+        if self.scopes:
+            self.scopes[-1][symbol] = binding
+        return binding
+
+    def reference(self, symbol: int, node: Variable | Assignment | None) -> None:
+        for scope in reversed(self.scopes):
+            binding = scope.get(symbol)
+            if binding is not None:
+                break
+        else:
+            return
+        if node is not None:
+            binding.references.append(node)
+        if binding.level < len(self.captures):
+            # Every function between the declaration and here needs the variable in its
+            # closure, to be able to pass it on to the next.
+            for captures in self.captures[binding.level:]:
+                captures[symbol] = None
+            self.capture(binding)
+        if node is not None:
+            node.captured = binding.captured
+
+    def capture(self, binding: Binding) -> None:
+        binding.captured = True
+        # Earlier references were made before anyone captured the variable.
+        for node in binding.references:
+            node.captured = True
+        # Captured parameters are collected once their function has been analyzed.
+        if binding.declaration is not None and not binding.param:
+            binding.declaration.captured = True
+
+    def stmt(self, stmt: Stmt) -> None:
+        match stmt:
+            case ExprStmt(expr) | PrintStmt(expr):
+                self.expr(expr)
+            case VarStmt(symbol, initializer):
+                if initializer is not None:
+                    self.expr(initializer)
+                self.declare(symbol, stmt)
+            case FunctionStmt():
+                # Declared before the body is analyzed, so the function can call itself.
+                self.declare(stmt.symbol, stmt)
+                self.function(stmt)
+            case ClassStmt(symbol, superclass, methods):
+                self.declare(symbol, stmt)
+                level = len(self.captures)
+                if superclass is not None:
+                    self.expr(superclass)
+                    self.scopes.append({SUPER: Binding(level, None)})
+                self.scopes.append({THIS: Binding(level, None)})
+                for method in methods:
+                    self.function(method)
+                self.scopes.pop()
+                if superclass is not None:
+                    self.scopes.pop()
+            case BlockStmt(statements):
+                self.scopes.append({})
+                for inner in statements:
+                    self.stmt(inner)
+                self.scopes.pop()
+            case IfStmt(condition, then_branch, else_branch):
+                self.expr(condition)
+                self.stmt(then_branch)
+                if else_branch is not None:
+                    self.stmt(else_branch)
+            case WhileStmt(condition, body):
+                self.expr(condition)
+                self.stmt(body)
+            case ReturnStmt(value):
+                if value is not None:
+                    self.expr(value)
+            case _:
+                raise RuntimeError
+
+    def function(self, stmt: FunctionStmt) -> None:
+        self.captures.append({})
+        # The parameters and the body share a scope, as they share an environment.
+        self.scopes.append({})
+        params = [self.declare(param, stmt, param=True) for param in stmt.params]
+        for inner in stmt.body:
+            self.stmt(inner)
+        self.scopes.pop()
+        stmt.captures = tuple(self.captures.pop())
+        stmt.captured_params = tuple(
+            param for param, binding in zip(stmt.params, params) if binding.captured
+        )
+
+    def expr(self, expr: Expr) -> None:
+        match expr:
+            case Literal():
+                pass
+            case Variable(symbol):
+                self.reference(symbol, expr)
+            case Assignment(symbol, value):
+                self.expr(value)
+                self.reference(symbol, expr)
+            case Grouping(inner):
+                self.expr(inner)
+            case Unary(_, right):
+                self.expr(right)
+            case Binary(left, _, right) | Logical(left, _, right):
+                self.expr(left)
+                self.expr(right)
+            case Call(callee, arguments):
+                self.expr(callee)
+                for argument in arguments:
+                    self.expr(argument)
+            case Get(target):
+                self.expr(target)
+            case Set(target, _, value):
+                self.expr(target)
+                self.expr(value)
+            case Super():
+                # Super nodes always go through the cells, so they aren't marked.
+                self.reference(SUPER, None)
+                self.reference(THIS, None)
+            case _:
+                raise RuntimeError
@@ -1,36 +1,52 @@
 from __future__ import annotations
 
-from ._token import Token
 from ._errors import LoxRuntimeError
+from ._symbols import symbols
+
+
+class Cell:
+    '''
+    A box for a variable that closures capture.
+
+    The environment that declares the variable and the closures that capture it all hold
+    the same cell, so an assignment through any of them is seen by the others.
+    '''
+    __slots__ = ('value',)
+
+    def __init__(self, value: object):
+        self.value = value
 
 
 class Environment:
 
     def __init__(self, enclosing: Environment = None):
-        self.values: dict[str, object] = {}
+        # Variables are keyed on their interned symbol IDs, not their names.
+        self.values: dict[int, object] = {}
         self.enclosing = enclosing
 
-    def define(self, name: str, value: object) -> None:
-        self.values[name] = value
+    def define(self, symbol: int, value: object) -> None:
+        self.values[symbol] = value
 
-    def get(self, token: Token) -> object:
-        name = token.lexeme
-        if name in self.values:
+    def get(self, symbol: int, offset: int) -> object:
+        if symbol in self.values:
             # If the variable is in this environment, return its value.
-            return self.values[token.lexeme]
+            return self.values[symbol]
         elif self.enclosing is not None:
             # If this env is enclosed by another, check that one (and its parents).
-            return self.enclosing.get(token)
+            return self.enclosing.get(symbol, offset)
         else:
-            raise LoxRuntimeError(token, f"Undefined variable '{name}'.")
+            raise undefined(symbol, offset)
 
-    def assign(self, token: Token, value: object) -> None:
-        name = token.lexeme
-        if name in self.values:
+    def assign(self, symbol: int, value: object, offset: int) -> None:
+        if symbol in self.values:
             # If the variable is in this environment, update it here.
-            self.values[name] = value
+            self.values[symbol] = value
         elif self.enclosing is not None:
             # Recurse up the stack trying to find an env where the variable is defined.
-            self.enclosing.assign(token, value)
+            self.enclosing.assign(symbol, value, offset)
         else:
-            raise LoxRuntimeError(token, "Undefined variable '{name}'.")
+            raise undefined(symbol, offset)
+
+
+def undefined(symbol: int, offset: int) -> LoxRuntimeError:
+    return LoxRuntimeError(offset, f"Undefined variable '{symbols.name(symbol)}'.")
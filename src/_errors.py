@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+from typing import Sequence
+
+from ._lines import LineTable
 from ._token import Token, TokenType
 
 
@@ -8,23 +11,65 @@ class LoxError(Exception):
         self.return_code = return_code
 
 
-class LoxParseError(Exception):
+class LoxCompileError(LoxError):
+    '''Raised when a script can't be compiled, with all of its scan or parse errors.'''
+
+    def __init__(self, errors: Sequence[LoxSourceError]):
+        super().__init__(65)
+        self.errors = list(errors)
+
+    def __str__(self):
+        return '\n'.join(str(error) for error in self.errors)
+
+
+class LoxSourceError(Exception):
+    '''
+    An error at an offset in the source.
+
+    Errors only know their offset until someone with the source's LineTable calls
+    locate(), after which they report a line and column.
+    '''
+    offset: int | None
+    line: int | None = None
+    column: int | None = None
+
+    def locate(self, lines: LineTable) -> None:
+        if self.offset is not None:
+            self.line, self.column = lines.position(self.offset)
+
+    def where(self) -> str:
+        if self.line is None:
+            return f'offset {self.offset}'
+        return f'line {self.line}, column {self.column}'
+
+
+class LoxParseError(LoxSourceError):
     def __init__(self, token: Token, msg: str):
         self.token = token
         self.msg = msg
 
+    @property
+    def offset(self) -> int:  # type: ignore[override]
+        return self.token.offset
+
     def __str__(self):
         if self.token.token_type == TokenType.EOF:
             location = 'EOF'
         else:
             location = f"'{self.token.lexeme}'"
-        return f"[line {self.token.line_num}] Parse Error at {location}. {self.msg}"
+        return f"[{self.where()}] Parse Error at {location}. {self.msg}"
 
 
-class LoxRuntimeError(Exception):
-    def __init__(self, token: Token, msg: str):
-        self.token = token
+class LoxRuntimeError(LoxSourceError):
+    def __init__(self, offset: int | None, msg: str):
+        self.offset = offset
         self.msg = msg
 
     def __str__(self):
-        return f'{self.msg}\n[line {self.token.line_num}]'
+        if self.offset is None:
+            return self.msg
+        return f'{self.msg}\n[{self.where()}]'
+
+
+class LoxBudgetError(LoxRuntimeError):
+    '''Raised when a run exceeds one of the limits in its Budget.'''
@@ -1,10 +1,37 @@
-'Expression classes for the AST.'
+'''
+Expression classes for the AST.
 
-from abc import ABC, abstractmethod
-from dataclasses import dataclass, fields, is_dataclass
-from typing import Any
+Nodes don't hold on to tokens. Names are kept as symbol IDs, operators as token types,
+and nodes that can fail at run time record the source offset to report errors at.
+'''
 
-from ._token import Token, TokenType
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field, fields, is_dataclass
+from typing import Any, TYPE_CHECKING
+
+from ._shapes import PropertyCache
+from ._symbols import symbols
+from ._token import TokenType
+
+if TYPE_CHECKING:
+    from ._stmt import FunctionStmt
+
+# How to print each operator.
+OPERATORS = {
+    TokenType.BANG: '!',
+    TokenType.BANG_EQUAL: '!=',
+    TokenType.EQUAL_EQUAL: '==',
+    TokenType.GREATER: '>',
+    TokenType.GREATER_EQUAL: '>=',
+    TokenType.LESS: '<',
+    TokenType.LESS_EQUAL: '<=',
+    TokenType.MINUS: '-',
+    TokenType.PLUS: '+',
+    TokenType.SLASH: '/',
+    TokenType.STAR: '*',
+    TokenType.AND: 'and',
+    TokenType.OR: 'or',
+}
 
 
 class Expr(ABC):
@@ -23,31 +50,71 @@ class Expr(ABC):
 
 @dataclass
 class Assignment(Expr):
-    token: Token
+    symbol: int
     value: Expr
+    offset: int
+    # Whether the variable is captured by a closure, and so is kept in a cell.
+    captured: bool = False
 
     def __str__(self):
-        return f'{self.token.lexeme} = {self.value}'
+        return f'{symbols.name(self.symbol)} = {self.value}'
 
 
 @dataclass
 class Binary(Expr):
     left: Expr
-    operator: Token
+    operator: TokenType
     right: Expr
+    offset: int
+    # Whether type inference proved both operands are numbers, so they needn't be
+    # checked.
+    numeric: bool = False
 
     def __str__(self):
-        return f'({self.operator.lexeme} {self.left} {self.right})'
+        return f'({OPERATORS[self.operator]} {self.left} {self.right})'
+
+
+class Inline:
+    '''
+    What a call needs to evaluate the body of the small function it calls itself.
+
+    That's the declaration of the function, which the call checks it's still calling
+    each time, and the expression the function returns.
+    '''
+    __slots__ = ('function', 'body')
+
+    def __init__(self, function: 'FunctionStmt', body: Expr):
+        self.function = function
+        self.body = body
 
 
 @dataclass
 class Call(Expr):
     callee: Expr
-    paren: Token
     arguments: list[Expr]
+    # The offset of the closing paren.
+    offset: int
+    # Set by the optimizer if the call may be inlined. It isn't part of the expression.
+    inline: Inline | None = field(default=None, compare=False, repr=False)
+
+    def __str__(self):
+        exprs = [self.callee, *self.arguments]
+        return f'(call {" ".join(str(expr) for expr in exprs)})'
+
+
+@dataclass
+class Get(Expr):
+    target: Expr
+    name: int
+    # The offset of the property name.
+    offset: int
+    # Filled in as the program runs; it isn't part of the expression.
+    cache: PropertyCache = field(
+        default_factory=PropertyCache, compare=False, repr=False
+    )
 
     def __str__(self):
-        return '<function>'
+        return f'{self.target}.{symbols.name(self.name)}'
 
 
 @dataclass
@@ -65,6 +132,10 @@ class Literal(Expr):
     def __str__(self):
         if self.value is None:
             return "nil"
+        elif isinstance(self.value, bool):
+            return str(self.value).lower()
+        elif isinstance(self.value, str):
+            return f'"{self.value}"'
         else:
             return str(self.value)
 
@@ -72,38 +143,68 @@ class Literal(Expr):
 @dataclass
 class Logical(Expr):
     left: Expr
-    operator: Token
+    operator: TokenType
     right: Expr
 
     def __str__(self):
-        return f'({self.operator.lexeme} {self.left} {self.right})'
+        return f'({OPERATORS[self.operator]} {self.left} {self.right})'
+
+
+@dataclass
+class Set(Expr):
+    target: Expr
+    name: int
+    value: Expr
+    # The offset of the property name.
+    offset: int
+    # Filled in as the program runs; it isn't part of the expression.
+    cache: PropertyCache = field(
+        default_factory=PropertyCache, compare=False, repr=False
+    )
+
+    def __str__(self):
+        return f'{self.target}.{symbols.name(self.name)} = {self.value}'
+
+
+@dataclass
+class Super(Expr):
+    method: int
+    # The offset of the 'super' keyword.
+    offset: int
+
+    def __str__(self):
+        return f'super.{symbols.name(self.method)}'
 
 
 @dataclass
 class Unary(Expr):
-    operator: Token
+    operator: TokenType
     right: Expr
+    offset: int
+    # Whether type inference proved the operand is a number.
+    numeric: bool = False
 
     def __str__(self):
-        return f'({self.operator.lexeme} {self.right})'
+        return f'({OPERATORS[self.operator]} {self.right})'
 
 
 @dataclass
 class Variable(Expr):
-    token: Token
+    symbol: int
+    offset: int
+    # Whether the variable is captured by a closure, and so is kept in a cell.
+    captured: bool = False
 
     def __str__(self):
-        return self.token.lexeme
+        return symbols.name(self.symbol)
 
 
 if __name__ == "__main__":
     print(
         Binary(
-            Unary(
-                Token(TokenType.MINUS, '-', None, 1),
-                Literal(123),
-            ),
-            Token(TokenType.STAR, "*", None, 1),
+            Unary(TokenType.MINUS, Literal(123), 0),
+            TokenType.STAR,
             Grouping(Literal(45.56)),
+            5,
         )
     )
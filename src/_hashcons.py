@@ -0,0 +1,90 @@
+'''
+Hash-consing: share the identical subtrees of an AST, so each is kept in memory once.
+
+Generated programs repeat themselves a lot, and every copy of a literal or a statement
+made of them is otherwise a separate set of objects. HashConser keeps one node of each
+shape it has seen, and replaces the children of the nodes it's given with those, bottom
+up. Nodes are only shared if they're position-independent: nothing in them records an
+offset into the source, so nothing can tell the copies apart. Most of what's shared is
+literals, and statements like `print "done";` or `var total = 0;`.
+
+Parser does this as the last step for each top-level statement, after the passes that
+rewrite the tree in place, since shared nodes mustn't be changed afterwards.
+'''
+
+import math
+from dataclasses import fields
+from typing import TypeVar, cast
+
+from ._expr import Expr, Literal
+from ._stmt import Stmt
+
+# A node is only ever replaced by one of the same type.
+Node = TypeVar('Node', bound=Expr | Stmt)
+
+
+class HashConser:
+
+    def __init__(self):
+        # The one node kept of each shape, keyed on its type, its plain fields, and the
+        # identities of its (shared) children.
+        self.table: dict[tuple, Expr | Stmt] = {}
+        # The identities of the nodes in the table, which are the only ones that may be
+        # shared.
+        self.kept: set[int] = set()
+        # How many nodes have been looked at, and how many were replaced by a node seen
+        # before.
+        self.nodes = 0
+        self.shared = 0
+
+    @property
+    def ratio(self) -> float:
+        'The fraction of nodes that were replaced by one seen before.'
+        return self.shared / self.nodes if self.nodes else 0.0
+
+    def share(self, node: Node) -> Node:
+        'Share the subtrees of a node, and return what replaces the node itself.'
+        self.nodes += 1
+        if isinstance(node, Literal):
+            return self.keep(node, (Literal, *literal_key(node.value)))
+        independent = getattr(node, 'offset', None) is None
+        key: list[object] = [type(node)]
+        for field in fields(node):  # type: ignore[arg-type]
+            value = getattr(node, field.name)
+            if isinstance(value, (Expr, Stmt)):
+                value = self.share(value)
+                setattr(node, field.name, value)
+                independent = independent and id(value) in self.kept
+                key.append(id(value))
+            elif isinstance(value, list):
+                value[:] = [
+                    self.share(child) if isinstance(child, (Expr, Stmt)) else child
+                    for child in value
+                ]
+                independent = independent and all(
+                    id(child) in self.kept for child in value
+                )
+                key.append(tuple(id(child) for child in value))
+            elif field.compare:
+                key.append(value)
+        return self.keep(node, tuple(key)) if independent else node
+
+    def keep(self, node: Node, key: tuple) -> Node:
+        kept = cast(Node, self.table.setdefault(key, node))
+        if kept is node:
+            self.kept.add(id(node))
+        else:
+            self.shared += 1
+        return kept
+
+
+def literal_key(value: object) -> tuple[object, ...]:
+    '''
+    What tells a literal's value apart from every other.
+
+    Equal values aren't always the same Lox value: 1 == 1.0 == True in Python, and
+    0.0 == -0.0, so the type and, for floats, the sign go in too.
+    '''
+    if type(value) is float:
+        return (float, value, math.copysign(1.0, value))
+    return (type(value), value)
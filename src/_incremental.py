@@ -0,0 +1,213 @@
+'''
+An incremental front end, for re-scanning and re-parsing a file as it's edited.
+
+The source is kept as a run of top-level declarations, each with its own tokens and
+parsed statement. An edit re-scans from just before it until the scanner lines back up
+with the start of an untouched declaration, and re-parses only the declarations in
+between. Everything after that is reused, with its positions shifted in place.
+'''
+
+from dataclasses import dataclass
+
+from ._captures import analyze_captures
+from ._errors import LoxParseError
+from ._infer import infer_types
+from ._optimize import optimize, record_functions
+from ._parse import Parser
+from ._scan import LoxScanError, scan_from
+from ._stmt import Stmt, walk
+from ._token import Token, TokenType as TT
+
+
+@dataclass
+class Declaration:
+    'A top-level declaration, or the tokens skipped over after a parse error.'
+    tokens: list[Token]
+    stmt: Stmt | None
+    errors: list[LoxParseError]
+
+    @property
+    def start(self) -> int:
+        return self.tokens[0].offset
+
+    @property
+    def end(self) -> int:
+        last = self.tokens[-1]
+        return last.offset + len(last.lexeme)
+
+    @property
+    def reach(self) -> int:
+        '''
+        The end of the last token the parser looked at.
+
+        After a parse error, the parser skips forward from the start of the declaration,
+        which can leave the declaration shorter than how far it had read.
+        '''
+        if not self.errors:
+            return self.end
+        ends = [error.token.offset + len(error.token.lexeme) for error in self.errors]
+        return max([self.end, *ends])
+
+
+class IncrementalFrontEnd:
+
+    def __init__(self, source: str):
+        self.source = source
+        tokens, self.scan_errors, _ = scan_from(source, 0)
+        self.eof = Token(TT.EOF, '', None, len(source))
+        self.declarations = parse_declarations(tokens, self.eof)
+        # How many declarations were reused by the last edit; handy for testing.
+        self.reused = 0
+
+    @property
+    def statements(self) -> list[Stmt]:
+        return [decl.stmt for decl in self.declarations if decl.stmt is not None]
+
+    @property
+    def errors(self) -> list[LoxScanError | LoxParseError]:
+        parse_errors = [error for decl in self.declarations for error in decl.errors]
+        return [*self.scan_errors, *parse_errors]
+
+    def edit(self, offset: int, removed: int, inserted: str) -> None:
+        '''Replace `removed` characters at `offset` with the `inserted` text.'''
+        old_source = self.source
+        source = old_source[:offset] + inserted + old_source[offset + removed:]
+        self.source = source
+        delta = len(inserted) - removed
+        decls = self.declarations
+
+        # An unterminated string runs on to the end of the source, so a quote added
+        # anywhere after it ends it there. There's at most one, since it found no quote.
+        changed = min(
+            [
+                cast_int(error.offset) for error in self.scan_errors
+                if error.msg == 'Unterminated string.'
+            ] + [offset]
+        )
+        # The first declaration the edit could have changed the parse of.
+        first = next(
+            (i for i, decl in enumerate(decls) if decl.reach >= changed), len(decls)
+        )
+        if first > 0:
+            # Re-parse from the declaration before that too, since it may have been
+            # waiting to see whether an 'else' comes next.
+            first -= 1
+            scan_start = decls[first].start
+        else:
+            # The edit may be in a comment before the first declaration.
+            scan_start = 0
+        # If the scanner lands on the (shifted) start of a declaration that's wholly
+        # after the edit, everything from there on will scan exactly as it did before.
+        resync_points = {
+            decl.start + delta: i
+            for i, decl in enumerate(decls[first:], first)
+            if decl.start >= offset + removed and decl.start > scan_start
+        }
+        tokens, scan_errors, scan_end = scan_from(source, scan_start, resync_points)
+        resync = resync_points.get(scan_end, len(decls))
+        old_scan_end = decls[resync].start if resync < len(decls) else len(old_source)
+
+        kept_errors = [
+            error for error in self.scan_errors
+            if not scan_start <= cast_int(error.offset) < old_scan_end
+        ]
+        reused = decls[resync:]
+        self.shift(reused, kept_errors, old_scan_end, delta)
+        self.eof.offset = len(source)
+        self.scan_errors = sorted(
+            [*kept_errors, *scan_errors], key=lambda error: cast_int(error.offset)
+        )
+
+        end = reused[0].tokens[0] if reused else self.eof
+        new_decls = parse_declarations(tokens, end)
+        clean = (
+            all(not decl.errors for decl in new_decls) and
+            not (reused and reused[0].tokens[0].token_type == TT.ELSE)
+        )
+        if not clean:
+            # An error may mean a declaration now runs on into the ones we were going to
+            # reuse, so re-parse everything from here on.
+            tokens += [token for decl in reused for token in decl.tokens]
+            new_decls = parse_declarations(tokens, self.eof)
+            reused = []
+        self.declarations = [*decls[:first], *new_decls, *reused]
+        self.reused = first + len(reused)
+
+    def shift(
+        self,
+        reused: list[Declaration],
+        scan_errors: list[LoxScanError],
+        after: int,
+        delta: int,
+    ) -> None:
+        if delta == 0:
+            return
+        # A parse error's token may have been re-scanned away from the declaration it
+        # was in, so shift error tokens separately, taking care to shift each just once.
+        tokens = {
+            id(token): token
+            for decl in reused
+            for token in [*decl.tokens, *(error.token for error in decl.errors)]
+        }
+        for token in tokens.values():
+            token.offset += delta
+        for decl in reused:
+            if decl.stmt is not None:
+                for node in walk(decl.stmt):
+                    if getattr(node, 'offset', None) is not None:
+                        node.offset += delta  # type: ignore[union-attr]
+        for error in scan_errors:
+            if cast_int(error.offset) >= after:
+                error.offset = cast_int(error.offset) + delta
+
+
+def cast_int(value: int | None) -> int:
+    assert value is not None
+    return value
+
+
+def parse_declarations(tokens: list[Token], end: Token) -> list[Declaration]:
+    '''
+    Parse tokens into top-level declarations, the same way Parser.parse would.
+
+    `end` is the token that follows the last of `tokens`. It's treated as EOF, and is
+    only looked at, never included in a declaration.
+    '''
+    tokens = [*tokens, Token(TT.EOF, '', None, end.offset)]
+    parser = Parser()
+    decls = []
+    current_pos = 0
+    while tokens[current_pos].token_type != TT.EOF:
+        start_pos = current_pos
+        stmt: Stmt | None
+        try:
+            stmt, current_pos = parser.parse_declaration(tokens, current_pos)
+        except LoxParseError as exc:
+            parser.errors.append(exc)
+            current_pos = parser.synchronize(tokens, current_pos + 1)
+            stmt = None
+        else:
+            analyze_captures(stmt)
+            infer_types(stmt)
+            stmt = optimize(stmt, parser.inlinable)
+            record_functions(stmt, parser.inlinable, parser.inline_budget)
+        decls.append(Declaration(tokens[start_pos:current_pos], stmt, parser.errors))
+        parser.errors = []
+    return decls
+
+
+def diff(old: str, new: str) -> tuple[int, int, str]:
+    '''
+    Describe the change from old to new as a single edit.
+
+    Returns the offset, removed length and inserted text for IncrementalFrontEnd.edit.
+    '''
+    prefix = 0
+    limit = min(len(old), len(new))
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    return prefix, len(old) - prefix - suffix, new[prefix:len(new) - suffix]
@@ -0,0 +1,179 @@
+'''
+Type inference: find the arithmetic and comparisons whose operands must be numbers.
+
+The interpreter checks the operands of every `-`, `*`, `/`, `<` and so on, to raise a
+runtime error if they aren't numbers. Where this pass can prove they always are, it
+marks the Binary or Unary node `numeric`, and the interpreter skips the check.
+
+The pass is flow-sensitive: it follows each function body and top-level statement in
+order, knowing which local variables hold numbers at each point. A variable holds a
+number after it's declared or assigned with an expression that always gives one: a
+number literal, arithmetic, or another such variable. Branches keep only what both
+sides agree on, and a loop is followed again until what's known at its head stops
+changing.
+
+Only locals that no closure captures are followed, since nothing else can assign them.
+Globals can be assigned by any function call, and by embedders between runs, so they're
+never known to hold numbers. Top-level statements are analyzed on their own, like in
+capture analysis, which has to run first.
+'''
+
+from ._expr import (
+    Expr, Assignment, Binary, Call, Get, Grouping, Literal, Logical, Set, Super, Unary,
+    Variable
+)
+from ._stmt import (
+    Stmt, BlockStmt, ClassStmt, ExprStmt, FunctionStmt, IfStmt, PrintStmt, ReturnStmt,
+    VarStmt, WhileStmt
+)
+# We use it a lot, so an alias helps.
+from ._token import TokenType as TT
+
+# The operators that always give a number, or raise.
+ARITHMETIC = {TT.MINUS, TT.SLASH, TT.STAR}
+# The operators the interpreter checks the operands of.
+CHECKED = ARITHMETIC | {TT.PLUS, TT.GREATER, TT.GREATER_EQUAL, TT.LESS, TT.LESS_EQUAL}
+
+
+class Local:
+    'A local variable, told apart from others of the same name by identity.'
+    __slots__ = ()
+
+
+def infer_types(stmt: Stmt) -> None:
+    'Mark the operators in a top-level statement whose operands are always numbers.'
+    TypeInference().stmt(stmt)
+
+
+class TypeInference:
+
+    def __init__(self):
+        # The scopes of the blocks and functions being analyzed, innermost last.
+        # Captured variables are None, as they aren't followed.
+        self.scopes: list[dict[int, Local | None]] = []
+        # The locals known to hold numbers at the current point.
+        self.numbers: set[Local] = set()
+
+    def declare(self, symbol: int, captured: bool) -> Local | None:
+        local = None if captured or not self.scopes else Local()
+        if self.scopes:
+            self.scopes[-1][symbol] = local
+        return local
+
+    def lookup(self, symbol: int) -> Local | None:
+        for scope in reversed(self.scopes):
+            if symbol in scope:
+                return scope[symbol]
+        return None
+
+    def assign(self, local: Local | None, number: bool) -> None:
+        if local is None:
+            return
+        if number:
+            self.numbers.add(local)
+        else:
+            self.numbers.discard(local)
+
+    def stmt(self, stmt: Stmt) -> None:
+        match stmt:
+            case ExprStmt(expr) | PrintStmt(expr):
+                self.expr(expr)
+            case VarStmt(symbol, initializer, captured):
+                number = initializer is not None and self.expr(initializer)
+                self.assign(self.declare(symbol, captured), number)
+            case FunctionStmt():
+                self.declare(stmt.symbol, stmt.captured)
+                self.function(stmt)
+            case ClassStmt(symbol, superclass, methods, _, captured):
+                if superclass is not None:
+                    self.expr(superclass)
+                self.declare(symbol, captured)
+                for method in methods:
+                    self.function(method)
+            case BlockStmt(statements):
+                self.scopes.append({})
+                for inner in statements:
+                    self.stmt(inner)
+                self.numbers.difference_update(self.scopes.pop().values())
+            case IfStmt(condition, then_branch, else_branch):
+                self.expr(condition)
+                before = set(self.numbers)
+                self.stmt(then_branch)
+                after_then, self.numbers = self.numbers, before
+                if else_branch is not None:
+                    self.stmt(else_branch)
+                self.numbers &= after_then
+            case WhileStmt(condition, body):
+                while True:
+                    head = set(self.numbers)
+                    self.expr(condition)
+                    after_condition = set(self.numbers)
+                    self.stmt(body)
+                    # What's known at the head is what's known both on entry and at
+                    # the end of the body. Once that stops shrinking, the last pass
+                    # over the body marked it with what holds on every iteration.
+                    self.numbers &= head
+                    if self.numbers == head:
+                        break
+                self.numbers = after_condition
+            case ReturnStmt(value):
+                if value is not None:
+                    self.expr(value)
+            case _:
+                raise RuntimeError
+
+    def function(self, stmt: FunctionStmt) -> None:
+        outer = self.numbers
+        self.numbers = set()
+        self.scopes.append({})
+        for param in stmt.params:
+            self.declare(param, param in stmt.captured_params)
+        for inner in stmt.body:
+            self.stmt(inner)
+        self.scopes.pop()
+        self.numbers = outer
+
+    def expr(self, expr: Expr) -> bool:
+        'Analyze an expression, and return whether it always gives a number.'
+        match expr:
+            case Literal(value):
+                return type(value) in (int, float)
+            case Variable(symbol):
+                return self.lookup(symbol) in self.numbers
+            case Assignment(symbol, value):
+                number = self.expr(value)
+                self.assign(self.lookup(symbol), number)
+                return number
+            case Grouping(inner):
+                return self.expr(inner)
+            case Unary(operator, right):
+                number = self.expr(right)
+                expr.numeric = operator == TT.MINUS and number
+                return operator == TT.MINUS
+            case Binary(left, operator, right):
+                numbers = self.expr(left) & self.expr(right)
+                expr.numeric = numbers and operator in CHECKED
+                return operator in ARITHMETIC or (operator == TT.PLUS and numbers)
+            case Logical(left, _, right):
+                number = self.expr(left)
+                # The right operand doesn't always run.
+                before = set(self.numbers)
+                number &= self.expr(right)
+                self.numbers &= before
+                return number
+            case Call(callee, arguments):
+                self.expr(callee)
+                for argument in arguments:
+                    self.expr(argument)
+                return False
+            case Get(target):
+                self.expr(target)
+                return False
+            case Set(target, _, value):
+                self.expr(target)
+                self.expr(value)
+                return False
+            case Super():
+                return False
+            case _:
+                raise RuntimeError
@@ -1,197 +1,477 @@
-from typing import cast, Final
+import math
+import operator
+import time
+from typing import Any, Callable, cast, Final, Sequence, TextIO
 
 from ._expr import (
-    Expr, Binary, Grouping, Literal, Logical, Unary, Variable, Assignment, Call
+    Expr, Binary, Grouping, Inline, Literal, Logical, Unary, Variable, Assignment, Call,
+    Get, Set, Super
 )
 from ._stmt import (
-    Stmt, ExprStmt, IfStmt, PrintStmt, VarStmt, WhileStmt, BlockStmt, FunctionStmt
+    Stmt, ExprStmt, IfStmt, PrintStmt, VarStmt, WhileStmt, BlockStmt, FunctionStmt,
+    ReturnStmt, ClassStmt, ForRangeStmt
 )
-from ._environment import Environment
-from ._errors import LoxRuntimeError
-from ._token import Token
-from ._lox_callable import LoxCallableProtocol, clock, LoxFunction
+from ._budget import Budget, ENVIRONMENT_COST, FUNCTION_COST
+from ._environment import Cell, Environment
+from ._errors import LoxRuntimeError, LoxBudgetError
+from ._lox_callable import LoxCallableProtocol, ClockCallable, LoxFunction
+from ._lox_class import LoxClass, get_property, set_property, undefined_property
+from ._numbers import MAX_EXACT_INT, add, multiply, negate, subtract
+from ._parallel import ParallelMapCallable
+from ._strings import Rope, concat
+from ._symbols import INIT, SUPER, THIS, symbols
 # We use it a lot, so an alias helps.
 from ._token import TokenType as TT
 
 
+# The types a Lox string may be.
+STRINGS = (str, Rope)
+
+# What each operator that takes numbers does to them, without checking they're numbers.
+# LESS_EQUAL compares with >=, as the checked version does.
+NUMERIC: dict[TT, Callable[[Any, Any], object]] = {
+    TT.GREATER: operator.gt,
+    TT.GREATER_EQUAL: operator.ge,
+    TT.LESS: operator.lt,
+    TT.LESS_EQUAL: operator.ge,
+    TT.MINUS: subtract,
+    TT.SLASH: operator.truediv,
+    TT.STAR: multiply,
+    TT.PLUS: add,
+}
+
+
+class Return:
+    '''
+    What executing a return statement gives back.
+
+    Statements that run other statements pass it straight back up to the function call,
+    which unwraps it. Every other statement gives back None.
+    '''
+    __slots__ = ('value',)
+
+    def __init__(self, value: object):
+        self.value = value
+
+
 class Interpreter:
 
-    def __init__(self):
+    def __init__(self, budget: Budget | None = None, output: TextIO | None = None):
         self.globals: Final = Environment()
-        self.environment = self.globals
-        # Create the built-in clock function.
-        self.globals.define('clock', clock)
+        # Builtins are created per interpreter, so interpreters share no mutable state
+        # and can run on separate threads.
+        self.globals.define(symbols.intern('clock'), ClockCallable())
+        self.globals.define(symbols.intern('parallelMap'), ParallelMapCallable())
+        self.budget = budget
+        # Where print statements write to; None means whatever sys.stdout is.
+        self.output = output
+        # Usage counters for the current run, checked against the budget.
+        self.steps = 0
+        self.alloc_bytes = 0
+        self.deadline: float | None = None
 
-    def interpret(self, statements: list[Stmt]) -> LoxRuntimeError | None:
+    def interpret(self, statements: Sequence[Stmt]) -> LoxRuntimeError | None:
+        self.start_run()
         try:
             for stmt in statements:
-                self.execute(stmt)
+                self.execute(stmt, self.globals)
         except LoxRuntimeError as exc:
             return exc
         else:
             return None
 
-    def execute(self, stmt: Stmt) -> None:
+    def start_run(self) -> None:
+        # Budgets apply per run, so every call starts with fresh counters.
+        self.steps = 0
+        self.alloc_bytes = 0
+        if self.budget is not None and self.budget.timeout is not None:
+            self.deadline = time.monotonic() + self.budget.timeout
+        else:
+            self.deadline = None
+
+    # The current environment is passed down through every call rather than stored on
+    # the interpreter, so execution is re-entrant.
+    def execute(self, stmt: Stmt, env: Environment) -> Return | None:
         match stmt:
             case ExprStmt(expr):
-                self.eval_expr(expr)
+                self.eval_expr(expr, env)
             case FunctionStmt():
-                function = LoxFunction(stmt)
-                self.environment.define(stmt.name.lexeme, function)
+                self.define_function(stmt, env)
+            case ClassStmt():
+                self.define_class(stmt, env)
             case PrintStmt(expr):
-                result = self.eval_expr(expr)
-                print(stringify(result))
-            case VarStmt(token, initializer):
-                value = self.eval_expr(initializer) if initializer is not None else None
-                self.environment.define(token.lexeme, value)
+                result = self.eval_expr(expr, env)
+                print(stringify(result), file=self.output)
+            case VarStmt(symbol, initializer, captured):
+                if initializer is not None:
+                    value = self.eval_expr(initializer, env)
+                else:
+                    value = None
+                env.define(symbol, Cell(value) if captured else value)
             case WhileStmt(condition, body):
-                should_loop = self.eval_expr(condition)
+                should_loop = self.eval_expr(condition, env)
                 while should_loop:
-                    self.execute(body)
-                    should_loop = self.eval_expr(condition)
+                    result = self.execute(body, env)
+                    if result is not None:
+                        return result
+                    # Loop back-edges are one of the two places budgets are checked.
+                    if self.budget is not None:
+                        self.check_budget(stmt.offset)
+                    should_loop = self.eval_expr(condition, env)
             case BlockStmt(statements):
-                self.execute_block(statements, Environment(enclosing=self.environment))
+                self.alloc_bytes += ENVIRONMENT_COST
+                return self.execute_block(statements, Environment(enclosing=env))
             case IfStmt():
-                self.execute_if(stmt)
+                return self.execute_if(stmt, env)
+            case ForRangeStmt():
+                return self.execute_for_range(stmt, env)
+            case ReturnStmt(value):
+                return Return(None if value is None else self.eval_expr(value, env))
             case _:
                 raise RuntimeError
+        return None
 
-    def execute_block(self, stmts: list[Stmt], environment: Environment) -> None:
-        # Hold on to the current environment so we can reset after running the block.
-        previous = self.environment
-        try:
-            self.environment = environment
-            for stmt in stmts:
-                self.execute(stmt)
-        finally:
-            # It's vital to reset the current environment even if we run into an error
-            # in the block.
-            self.environment = previous
-
-    def execute_if(self, stmt: IfStmt) -> None:
-        if is_truthy(self.eval_expr(stmt.condition)):
-            self.execute(stmt.then_branch)
+    def define_function(self, stmt: FunctionStmt, env: Environment) -> None:
+        if stmt.captured:
+            # The cell goes in first, so that the function can capture itself.
+            cell = Cell(None)
+            env.define(stmt.symbol, cell)
+            cell.value = LoxFunction(stmt, capture(stmt, env))
+        else:
+            env.define(stmt.symbol, LoxFunction(stmt, capture(stmt, env)))
+        self.alloc_bytes += FUNCTION_COST
+
+    def define_class(self, stmt: ClassStmt, env: Environment) -> None:
+        superclass = None
+        if stmt.superclass is not None:
+            value = self.eval_expr(stmt.superclass, env)
+            if not isinstance(value, LoxClass):
+                raise LoxRuntimeError(
+                    stmt.superclass.offset, 'Superclass must be a class.'
+                )
+            superclass = value
+        cell = None
+        if stmt.captured:
+            cell = Cell(None)
+            env.define(stmt.symbol, cell)
+        # The methods capture 'this' and 'super' from here. 'this' is only a
+        # placeholder, replaced whenever a method is bound to an instance.
+        class_env = Environment(enclosing=env)
+        if superclass is not None:
+            class_env.define(SUPER, Cell(superclass))
+        class_env.define(THIS, Cell(None))
+        methods = {
+            method.symbol: LoxFunction(
+                method, capture(method, class_env), initializer=method.symbol == INIT
+            )
+            for method in stmt.methods
+        }
+        self.alloc_bytes += FUNCTION_COST * (1 + len(methods))
+        klass = LoxClass(stmt.symbol, superclass, methods, stmt.root)
+        if cell is not None:
+            cell.value = klass
+        else:
+            env.define(stmt.symbol, klass)
+
+    def execute_for_range(self, stmt: ForRangeStmt, env: Environment) -> Return | None:
+        loop = stmt.loop
+        condition = cast(Binary, loop.condition)
+        # The counter is declared in this environment, just before the loop.
+        start = env.values[stmt.symbol]
+        # Evaluating the bound is the only part of the condition that can fail, and it
+        # would have been evaluated next anyway.
+        bound = self.eval_expr(condition.right, env)
+        counts = counted_range(start, condition.operator, bound, stmt.step)
+        if counts is None:
+            # Run the loop as written, starting from the condition just evaluated.
+            if not self.apply_binary(condition, start, bound):
+                return None
+            result = self.execute(loop.body, env)
+            if result is not None:
+                return result
+            if self.budget is not None:
+                self.check_budget(loop.offset)
+            return self.execute(loop, env)
+        # The loop body without the increment, in a block of its own like before.
+        block = cast(BlockStmt, loop.body)
+        body = BlockStmt(block.statements[:-1], block.offset)
+        for count in counts:
+            env.values[stmt.symbol] = count
+            result = self.execute(body, env)
+            if result is not None:
+                return result
+            if self.budget is not None:
+                self.check_budget(loop.offset)
+        # Where the increment would have left the counter.
+        env.values[stmt.symbol] = counts.start + len(counts) * counts.step
+        return None
+
+    def execute_block(self, stmts: list[Stmt], env: Environment) -> Return | None:
+        for stmt in stmts:
+            result = self.execute(stmt, env)
+            if result is not None:
+                return result
+        return None
+
+    def check_budget(self, offset: int | None) -> None:
+        self.steps += 1
+        self.check_limits(offset)
+
+    def check_limits(self, offset: int | None) -> None:
+        'Raise LoxBudgetError if the run has gone over any of its limits.'
+        budget = cast(Budget, self.budget)
+        if budget.max_steps is not None and self.steps > budget.max_steps:
+            raise LoxBudgetError(offset, f'Exceeded step limit of {budget.max_steps}.')
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise LoxBudgetError(offset, f'Exceeded time limit of {budget.timeout}s.')
+        if (
+            budget.max_alloc_bytes is not None and
+            self.alloc_bytes > budget.max_alloc_bytes
+        ):
+            raise LoxBudgetError(
+                offset, f'Exceeded allocation limit of {budget.max_alloc_bytes} bytes.'
+            )
+
+    def execute_if(self, stmt: IfStmt, env: Environment) -> Return | None:
+        if is_truthy(self.eval_expr(stmt.condition, env)):
+            return self.execute(stmt.then_branch, env)
         elif stmt.else_branch is not None:
-            self.execute(stmt.else_branch)
+            return self.execute(stmt.else_branch, env)
+        return None
 
-    def eval_expr(self, expr: Expr) -> object:
+    def eval_expr(self, expr: Expr, env: Environment) -> object:
         match expr:
             case Literal(value):
                 return value
             case Logical():
-                return self.eval_logical(expr)
+                return self.eval_logical(expr, env)
             case Grouping(inner_expr):
-                return self.eval_expr(inner_expr)
+                return self.eval_expr(inner_expr, env)
             case Unary():
-                return self.eval_unary(expr)
+                return self.eval_unary(expr, env)
             case Binary():
-                return self.eval_binary(expr)
+                return self.eval_binary(expr, env)
             case Call():
-                return self.eval_call(expr)
+                return self.eval_call(expr, env)
             case Assignment():
-                return self.eval_assignment(expr)
-            case Variable(token):
+                return self.eval_assignment(expr, env)
+            case Get(target):
+                return get_property(expr, self.eval_expr(target, env))
+            case Set(target, _, value_expr):
+                target_val = self.eval_expr(target, env)
+                value = self.eval_expr(value_expr, env)
+                set_property(expr, target_val, value)
+                return value
+            case Super():
+                return self.eval_super(expr, env)
+            case Variable(symbol, offset, captured):
                 # This doesn't delegate to a function; it's simple enough to do here.
-                return self.environment.get(token)
+                value = env.get(symbol, offset)
+                return cast(Cell, value).value if captured else value
             case _:
                 raise RuntimeError
 
-    def eval_assignment(self, expr: Assignment) -> object:
-        value = self.eval_expr(expr.value)
-        self.environment.assign(expr.token, value)
+    def eval_assignment(self, expr: Assignment, env: Environment) -> object:
+        value = self.eval_expr(expr.value, env)
+        assign(expr, value, env)
         return value
 
-    def eval_logical(self, expr: Logical) -> object:
+    def eval_super(self, expr: Super, env: Environment) -> object:
+        superclass = cast(Cell, env.get(SUPER, expr.offset)).value
+        instance = cast(Cell, env.get(THIS, expr.offset)).value
+        method = cast(LoxClass, superclass).find_method(expr.method)
+        if method is None:
+            raise undefined_property(expr.offset, expr.method)
+        return method.bind(instance)
+
+    def eval_logical(self, expr: Logical, env: Environment) -> object:
         left, operator, right = expr
-        left_val = self.eval_expr(left)
+        left_val = self.eval_expr(left, env)
 
-        if operator.token_type == TT.OR:
+        if operator == TT.OR:
             if is_truthy(left_val):
                 return left_val
-        else:  # operator.token_type == TT.AND
+        else:  # operator == TT.AND
             if not is_truthy(left_val):
                 return left_val
-        return self.eval_expr(right)
+        return self.eval_expr(right, env)
 
-    def eval_unary(self, expr: Unary) -> object:
-        operator, raw_right = expr
-        right = self.eval_expr(raw_right)
+    def eval_unary(self, expr: Unary, env: Environment) -> object:
+        right = self.eval_expr(expr.right, env)
+        return self.apply_unary(expr, right)
 
-        match operator.token_type:
+    def apply_unary(self, expr: Unary, right: object) -> object:
+        if expr.numeric:
+            return negate(cast(float, right))
+        match expr.operator:
             case TT.BANG:
                 return not is_truthy(right)
             case TT.MINUS:
-                check_operands_are_numbers(operator, right)
-                return -cast(float, right)
+                check_operands_are_numbers(expr.offset, right)
+                return negate(cast(float, right))
             case _:
                 raise RuntimeError
 
-    def eval_binary(self, expr: Binary) -> object:
-        raw_left, operator, raw_right = expr
-        left = self.eval_expr(raw_left)
-        right = self.eval_expr(raw_right)
-        match operator.token_type:
+    def eval_binary(self, expr: Binary, env: Environment) -> object:
+        left = self.eval_expr(expr.left, env)
+        right = self.eval_expr(expr.right, env)
+        return self.apply_binary(expr, left, right)
+
+    def apply_binary(self, expr: Binary, left: object, right: object) -> object:
+        if expr.numeric:
+            # Type inference proved the operands are numbers, so skip the checks.
+            return NUMERIC[expr.operator](left, right)
+        offset = expr.offset
+        match expr.operator:
             case TT.BANG_EQUAL:
                 return not (left == right)
             case TT.EQUAL_EQUAL:
                 return left == right
             case TT.GREATER:
-                check_operands_are_numbers(operator, left, right)
+                check_operands_are_numbers(offset, left, right)
                 return cast(float, left) > cast(float, right)
             case TT.GREATER_EQUAL:
-                check_operands_are_numbers(operator, left, right)
+                check_operands_are_numbers(offset, left, right)
                 return cast(float, left) >= cast(float, right)
             case TT.LESS:
-                check_operands_are_numbers(operator, left, right)
+                check_operands_are_numbers(offset, left, right)
                 return cast(float, left) < cast(float, right)
             case TT.LESS_EQUAL:
-                check_operands_are_numbers(operator, left, right)
+                check_operands_are_numbers(offset, left, right)
                 return cast(float, left) >= cast(float, right)
             case TT.MINUS:
-                check_operands_are_numbers(operator, left, right)
-                return cast(float, left) - cast(float, right)
+                check_operands_are_numbers(offset, left, right)
+                return subtract(cast(float, left), cast(float, right))
             case TT.SLASH:
-                check_operands_are_numbers(operator, left, right)
+                check_operands_are_numbers(offset, left, right)
                 return cast(float, left) / cast(float, right)
             case TT.STAR:
-                check_operands_are_numbers(operator, left, right)
-                return cast(float, left) * cast(float, right)
+                check_operands_are_numbers(offset, left, right)
+                return multiply(cast(float, left), cast(float, right))
             case TT.PLUS:
                 # Trickier because we support numeric addition as well as string
                 # concatentation.
                 if isinstance(left, (float, int)) and isinstance(right, (float, int)):
-                    return cast(float, left) + cast(float, right)
-                elif isinstance(left, str) and isinstance(right, str):
-                    return cast(str, left) + cast(str, right)
+                    return add(cast(float, left), cast(float, right))
+                elif isinstance(left, STRINGS) and isinstance(right, STRINGS):
+                    return concat(self, left, right)
                 else:
                     raise LoxRuntimeError(
-                        operator, 'Operands must be two numbers or two strings'
+                        offset, 'Operands must be two numbers or two strings'
                     )
             case _:
                 raise RuntimeError
 
-    def eval_call(self, expr: Call) -> object:
-        callee = self.eval_expr(expr.callee)
-        args = [self.eval_expr(arg) for arg in expr.arguments]
+    def eval_call(self, expr: Call, env: Environment) -> object:
+        callee = self.eval_expr(expr.callee, env)
+        args = [self.eval_expr(arg, env) for arg in expr.arguments]
+        inline = expr.inline
+        if (
+            inline is not None and
+            type(callee) is LoxFunction and
+            callee.declaration is inline.function
+        ):
+            return self.call_inline(expr, inline, args)
+        function = self.check_call(expr.offset, callee, args)
+        try:
+            return function.call(interpreter=self, args=args)
+        except LoxRuntimeError as exc:
+            # Natives don't know where they were called from.
+            if exc.offset is None:
+                exc.offset = expr.offset
+            raise
+
+    def call_inline(self, expr: Call, inline: Inline, args: list[object]) -> object:
+        '''
+        Evaluate the expression an inlined function returns, in place of calling it.
+
+        The optimizer has checked the arguments match its parameters, and a top-level
+        function has nothing in its closure, so this is all a call would do.
+        '''
+        if self.budget is not None:
+            self.check_budget(expr.offset)
+        return self.eval_expr(inline.body, self.inline_environment(inline, args))
+
+    def inline_environment(self, inline: Inline, args: list[object]) -> Environment:
+        'The environment an inlined function\'s expression is evaluated in.'
+        env = Environment(self.globals)
+        self.alloc_bytes += ENVIRONMENT_COST
+        env.values.update(zip(inline.function.params, args))
+        return env
+
+    def check_call(
+        self,
+        offset: int,
+        callee: object,
+        args: list[object],
+    ) -> LoxCallableProtocol:
         if isinstance(callee, LoxCallableProtocol):
             function: LoxCallableProtocol = callee
         else:
-            raise LoxRuntimeError(expr.paren, "Can only call functions and classes.")
+            raise LoxRuntimeError(offset, "Can only call functions and classes.")
         if function.arity != len(args):
             raise LoxRuntimeError(
-                expr.paren,
+                offset,
                 f"Expected {function.arity} arguments but got {len(args)}.",
             )
-        return callee.call(interpreter=self, args=args)
+        # Function entry is the other place budgets are checked.
+        if self.budget is not None:
+            self.check_budget(offset)
+        return function
 
 
-def check_operands_are_numbers(operator: Token, *operands: object) -> None:
+def counted_range(
+    start: object,
+    comparison: TT,
+    bound: object,
+    step: int,
+) -> range | None:
+    '''
+    The values a counted loop's counter takes, or None if they aren't a range.
+
+    That's when the counter starts as an int, and the bound is an int or a finite
+    float, all within the range in which ints and doubles agree.
+    '''
+    if type(start) is not int or type(bound) not in (int, float):
+        return None
+    bound = cast(float, bound)
+    if not math.isfinite(bound):
+        return None
+    if comparison == TT.LESS:
+        stop = math.ceil(bound)
+    elif comparison == TT.GREATER:
+        stop = math.floor(bound)
+    else:
+        # GREATER_EQUAL, or LESS_EQUAL, which compares with >= too.
+        stop = math.ceil(bound) - 1
+    counts = range(start, stop, step)
+    end = start + len(counts) * step
+    if not -MAX_EXACT_INT <= min(start, end) <= max(start, end) <= MAX_EXACT_INT:
+        return None
+    return counts
+
+
+def check_operands_are_numbers(offset: int, *operands: object) -> None:
     if not all(isinstance(op, (float, int)) for op in operands):
         if len(operands) > 1:
             msg = 'Operands must be numbers.'
         else:
             msg = 'Operand must be a number.'
-        raise LoxRuntimeError(operator, msg)
+        raise LoxRuntimeError(offset, msg)
+
+
+def capture(stmt: FunctionStmt, env: Environment) -> dict[int, Cell]:
+    'Collect the cells of the variables a function captures, for its closure.'
+    return {
+        symbol: cast(Cell, env.get(symbol, stmt.offset)) for symbol in stmt.captures
+    }
+
+
+def assign(expr: Assignment, value: object, env: Environment) -> None:
+    if expr.captured:
+        cast(Cell, env.get(expr.symbol, expr.offset)).value = value
+    else:
+        env.assign(expr.symbol, value, expr.offset)
 
 
 def is_truthy(thing: object) -> bool:
@@ -214,4 +494,7 @@ def stringify(thing: object) -> str:
         if text.endswith('.0'):
             text = text[:-2]
         return text
+    if isinstance(thing, list):
+        # Lists only come back from natives such as parallelMap.
+        return '[' + ', '.join(stringify(item) for item in thing) + ']'
     return str(thing)
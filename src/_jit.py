@@ -0,0 +1,627 @@
+'''
+A tracing JIT for hot while loops.
+
+TracingInterpreter counts each while loop's iterations and, while a loop is warming up,
+records the operand types every operator in it sees. Once a loop is hot and its types
+have stopped changing, LoopCompiler translates the loop into a Python function with
+those types baked in, and the rest of the loop runs in that function.
+
+Every specialized operation is guarded by a type check. When a guard fails, the
+operation falls back to the interpreter's own, and at the end of that iteration the
+compiled function hands the loop back to the tree-walker, which traces it again and may
+recompile it for the wider set of types.
+
+Only loops that stay inside their own body are compiled: loops that call functions,
+declare them or return from them, or that use variables closures capture, always run in
+the tree-walker.
+'''
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Callable, TextIO
+
+from ._budget import Budget, ENVIRONMENT_COST
+from ._environment import Environment
+from ._expr import (
+    Expr, Binary, Grouping, Inline, Literal, Logical, Unary, Variable, Assignment, Call
+)
+from ._interpret import STRINGS, Interpreter, Return, stringify
+from ._lox_callable import LoxCallableProtocol, LoxFunction
+from ._numbers import MAX_EXACT_INT, add, multiply, negate, subtract
+from ._stmt import (
+    Stmt, ExprStmt, IfStmt, PrintStmt, VarStmt, WhileStmt, BlockStmt, FunctionStmt,
+    ReturnStmt, ClassStmt, ForRangeStmt
+)
+from ._strings import concat
+# We use it a lot, so an alias helps.
+from ._token import TokenType as TT
+
+# How many iterations a loop runs in the tree-walker before it's worth compiling.
+HOT_ITERATIONS = 50
+# How many of those iterations must have turned up no new operand types.
+STABLE_ITERATIONS = 20
+# How many times a loop may be compiled before it's left to the tree-walker for good.
+MAX_COMPILES = 3
+# How many calls make a function hot, when deciding what a profile says to compile.
+HOT_CALLS = 20
+
+# The Python operator for each comparison. LESS_EQUAL has to agree with apply_binary,
+# which compares with >=.
+COMPARISONS = {
+    TT.GREATER: '>',
+    TT.GREATER_EQUAL: '>=',
+    TT.LESS: '<',
+    TT.LESS_EQUAL: '>=',
+}
+
+# Everything generated code refers to besides the nodes it was compiled from.
+HELPERS = {
+    'add': add,
+    'subtract': subtract,
+    'multiply': multiply,
+    'negate': negate,
+    'stringify': stringify,
+    'concat': concat,
+    'NUMBERS': (int, float),
+    'STRINGS': STRINGS,
+    # The repr()s of floats that aren't finite, like a literal too big for one.
+    'inf': math.inf,
+    'nan': math.nan,
+}
+
+
+class NotCompilable(Exception):
+    'Raised for loops the JIT doesn\'t handle.'
+
+
+@dataclass
+class CompiledLoop:
+    function: Callable[..., bool]
+    # The outer variables the loop uses. The function takes the `values` dict of the
+    # environment each one is defined in, in this order.
+    free: list[int]
+    source: str
+
+
+@dataclass
+class LoopTrace:
+    'What a TracingInterpreter knows about one while loop.'
+    stmt: WhileStmt
+    iterations: int = 0
+    # The iteration at which the loop last saw a new operand type.
+    stable_since: int = 0
+    feedback_version: int = -1
+    compiles: int = 0
+    compiled: CompiledLoop | None = None
+    # Set for loops that can't be compiled, or that keep being deoptimized.
+    given_up: bool = False
+    # Set for loops a profile says are hot, to compile them before their first
+    # iteration rather than after warming up.
+    eager: bool = False
+
+
+class TracingInterpreter(Interpreter):
+    '''
+    An interpreter that compiles hot while loops to Python functions.
+
+    If `log` is given, a note is written to it whenever a loop is compiled (along with
+    the generated source), deoptimized, or given up on.
+    '''
+
+    def __init__(
+        self,
+        budget: Budget | None = None,
+        output: TextIO | None = None,
+        log: TextIO | None = None,
+    ):
+        super().__init__(budget, output)
+        self.log = log
+        # Keyed on id(stmt); each trace keeps its statement alive so ids aren't reused.
+        self.traces: dict[int, LoopTrace] = {}
+        # The operand types each operator has seen, keyed on id(node).
+        self.feedback: dict[int, set[tuple[type, ...]]] = {}
+        # Bumped whenever an operator sees a new combination of types.
+        self.feedback_version = 0
+        # How many loops are being traced right now; feedback is only recorded then.
+        self.tracing = 0
+        # How many times each Lox function has been called, keyed on id(declaration).
+        self.calls: dict[int, int] = {}
+
+    def execute(self, stmt: Stmt, env: Environment) -> Return | None:
+        if isinstance(stmt, WhileStmt):
+            return self.execute_while(stmt, env)
+        if isinstance(stmt, ForRangeStmt):
+            # Counted loops are traced and compiled like any other.
+            return self.execute_while(stmt.loop, env)
+        return super().execute(stmt, env)
+
+    def execute_while(self, stmt: WhileStmt, env: Environment) -> Return | None:
+        trace = self.traces.get(id(stmt))
+        if trace is None or trace.stmt is not stmt:
+            trace = self.traces[id(stmt)] = LoopTrace(stmt)
+        if trace.eager and trace.compiles == 0 and not trace.given_up:
+            self.compile(trace)
+        should_loop = self.eval_expr(stmt.condition, env)
+        while should_loop:
+            compiled = trace.compiled
+            holders = None if compiled is None else resolve(compiled.free, env)
+            if compiled is not None and holders is not None:
+                if compiled.function(self, self.budget is not None, *holders):
+                    return None
+                # A guard failed. The iteration it failed in has finished, so carry on
+                # in the tree-walker from the next one.
+                self.deoptimize(trace)
+                should_loop = self.eval_expr(stmt.condition, env)
+            else:
+                result, should_loop = self.trace_iteration(trace, env)
+                if result is not None:
+                    return result
+        return None
+
+    def trace_iteration(
+        self,
+        trace: LoopTrace,
+        env: Environment,
+    ) -> tuple[Return | None, object]:
+        '''
+        Run one iteration in the tree-walker, and return whether to loop again.
+
+        If the body returned from the enclosing function, return that instead.
+        '''
+        stmt = trace.stmt
+        self.tracing += 1
+        try:
+            result = self.execute(stmt.body, env)
+            if result is not None:
+                return result, False
+            if self.budget is not None:
+                self.check_budget(stmt.offset)
+            should_loop = self.eval_expr(stmt.condition, env)
+        finally:
+            self.tracing -= 1
+        trace.iterations += 1
+        if trace.feedback_version != self.feedback_version:
+            trace.feedback_version = self.feedback_version
+            trace.stable_since = trace.iterations
+        if (
+            not trace.given_up and
+            trace.iterations >= HOT_ITERATIONS and
+            trace.iterations - trace.stable_since >= STABLE_ITERATIONS
+        ):
+            self.compile(trace)
+        return None, should_loop
+
+    def compile(self, trace: LoopTrace) -> None:
+        try:
+            trace.compiled = LoopCompiler(self.feedback).compile(trace.stmt)
+        except NotCompilable as exc:
+            trace.given_up = True
+            self.note(f'not compiling loop at offset {trace.stmt.offset}: {exc}')
+            return
+        trace.compiles += 1
+        self.note(
+            f'compiled loop at offset {trace.stmt.offset}\n{trace.compiled.source}'
+        )
+
+    def deoptimize(self, trace: LoopTrace) -> None:
+        trace.compiled = None
+        trace.stable_since = trace.iterations
+        if trace.compiles >= MAX_COMPILES:
+            trace.given_up = True
+        self.note(f'deoptimized loop at offset {trace.stmt.offset}')
+
+    def note(self, message: str) -> None:
+        if self.log is not None:
+            print(f'[jit] {message}', file=self.log)
+
+    def apply_unary(self, expr: Unary, right: object) -> object:
+        if self.tracing:
+            self.record(expr, (type(right),))
+        return super().apply_unary(expr, right)
+
+    def apply_binary(self, expr: Binary, left: object, right: object) -> object:
+        if self.tracing:
+            self.record(expr, (type(left), type(right)))
+        return super().apply_binary(expr, left, right)
+
+    def check_call(
+        self,
+        offset: int,
+        callee: object,
+        args: list[object],
+    ) -> LoxCallableProtocol:
+        function = super().check_call(offset, callee, args)
+        if isinstance(function, LoxFunction):
+            key = id(function.declaration)
+            self.calls[key] = self.calls.get(key, 0) + 1
+        return function
+
+    def call_inline(self, expr: Call, inline: Inline, args: list[object]) -> object:
+        # Count inlined calls too, so profiles still see which functions are hot.
+        key = id(inline.function)
+        self.calls[key] = self.calls.get(key, 0) + 1
+        return super().call_inline(expr, inline, args)
+
+    def record(self, expr: Expr, types: tuple[type, ...]) -> None:
+        seen = self.feedback.setdefault(id(expr), set())
+        if types not in seen:
+            seen.add(types)
+            self.feedback_version += 1
+
+
+def resolve(free: list[int], env: Environment) -> list[dict[int, object]] | None:
+    '''
+    Find the values dict each of the `free` variables lives in.
+
+    Returns None if any of them isn't defined, in which case the tree-walker should run
+    the loop so that it reports the error.
+    '''
+    holders = []
+    for symbol in free:
+        scope: Environment | None = env
+        while scope is not None and symbol not in scope.values:
+            scope = scope.enclosing
+        if scope is None:
+            return None
+        holders.append(scope.values)
+    return holders
+
+
+class LoopCompiler:
+    '''
+    Translates a while loop into the source of a Python function, and compiles it.
+
+    The function picks up after the loop's condition has been found true, and runs
+    iterations until the condition is false, returning True, or until an iteration in
+    which a type guard failed, returning False.
+
+    Outer variables are copied into Python locals on entry and written back on the way
+    out, and variables declared inside the loop are plain Python locals, since nothing
+    outside the loop can see them while it runs.
+    '''
+
+    def __init__(self, feedback: dict[int, set[tuple[type, ...]]]):
+        self.feedback = feedback
+        self.lines: list[str] = []
+        self.depth = 0
+        self.n_names = 0
+        # Nodes the generated code passes to the interpreter's slow paths.
+        self.constants: list[Expr] = []
+        # Outer variables, and the Python local each is kept in.
+        self.free: dict[int, str] = {}
+        self.assigned: set[int] = set()
+        # Variables declared in the loop's blocks, innermost block last.
+        self.scopes: list[dict[int, str]] = []
+
+    def compile(self, stmt: WhileStmt) -> CompiledLoop:
+        # Inside def make, def loop, try and while.
+        self.depth = 4
+        self.stmt(stmt.body)
+        self.emit('if checked:')
+        self.emit(f'    interp.check_budget({stmt.offset})')
+        self.emit('if miss:')
+        self.emit('    return False')
+        condition = self.expr(stmt.condition)
+        self.emit(f'if not {condition}:')
+        self.emit('    return True')
+        body = self.lines
+
+        name = f'loop_{stmt.offset}'
+        holders = [f'h{i}' for i in range(len(self.free))]
+        constants = [f'k{i}' for i in range(len(self.constants))]
+        self.lines = []
+        self.depth = 0
+        self.emit(f'def make({", ".join([*HELPERS, *constants])}):')
+        self.emit(f'    def {name}(interp, checked, {", ".join(holders)}):')
+        self.depth = 2
+        for holder, (symbol, local) in zip(holders, self.free.items()):
+            self.emit(f'{local} = {holder}[{symbol}]')
+        self.emit('miss = False')
+        self.emit('try:')
+        self.emit('    while True:')
+        self.lines += body
+        self.emit('finally:')
+        write_backs = [
+            f'    {holder}[{symbol}] = {local}'
+            for holder, (symbol, local) in zip(holders, self.free.items())
+            if symbol in self.assigned
+        ]
+        for line in write_backs or ['    pass']:
+            self.emit(line)
+        self.depth = 1
+        self.emit(f'return {name}')
+        source = '\n'.join(self.lines)
+
+        namespace: dict[str, object] = {}
+        exec(compile(source, f'<{name}>', 'exec'), namespace)
+        function = namespace['make'](*HELPERS.values(), *self.constants)  # type: ignore
+        return CompiledLoop(function, list(self.free), source)
+
+    def emit(self, line: str) -> None:
+        self.lines.append('    ' * self.depth + line)
+
+    def new_name(self, prefix: str) -> str:
+        self.n_names += 1
+        return f'{prefix}{self.n_names}'
+
+    def constant(self, node: Expr) -> str:
+        self.constants.append(node)
+        return f'k{len(self.constants) - 1}'
+
+    def lookup(self, symbol: int) -> str:
+        for scope in reversed(self.scopes):
+            if symbol in scope:
+                return scope[symbol]
+        if symbol not in self.free:
+            self.free[symbol] = f'x{len(self.free)}'
+        return self.free[symbol]
+
+    def stmt(self, stmt: Stmt) -> None:
+        match stmt:
+            case ExprStmt(expr):
+                self.expr(expr)
+            case PrintStmt(expr):
+                value = self.expr(expr)
+                self.emit(f'print(stringify({value}), file=interp.output)')
+            case VarStmt(captured=True):
+                raise NotCompilable('it declares a captured variable')
+            case VarStmt(symbol, initializer):
+                value = 'None' if initializer is None else self.expr(initializer)
+                local = self.new_name('v')
+                self.emit(f'{local} = {value}')
+                self.scopes[-1][symbol] = local
+            case BlockStmt(statements):
+                self.emit(f'interp.alloc_bytes += {ENVIRONMENT_COST}')
+                self.scopes.append({})
+                for inner in statements:
+                    self.stmt(inner)
+                self.scopes.pop()
+            case IfStmt(condition, then_branch, else_branch):
+                self.emit(f'if {self.truthy(condition)}:')
+                self.branch(then_branch)
+                if else_branch is not None:
+                    self.emit('else:')
+                    self.branch(else_branch)
+            case WhileStmt(condition, body, offset):
+                self.emit('while True:')
+                self.depth += 1
+                value = self.expr(condition)
+                self.emit(f'if not {value}:')
+                self.emit('    break')
+                self.stmt(body)
+                self.emit('if checked:')
+                self.emit(f'    interp.check_budget({offset})')
+                self.depth -= 1
+            case ForRangeStmt(loop=loop):
+                self.stmt(loop)
+            case FunctionStmt():
+                raise NotCompilable('it declares a function')
+            case ClassStmt():
+                raise NotCompilable('it declares a class')
+            case ReturnStmt():
+                raise NotCompilable('it returns from a function')
+            case _:
+                raise NotCompilable(f'it contains a {type(stmt).__name__}')
+
+    def branch(self, stmt: Stmt) -> None:
+        self.depth += 1
+        n_lines = len(self.lines)
+        self.stmt(stmt)
+        if len(self.lines) == n_lines:
+            self.emit('pass')
+        self.depth -= 1
+
+    def truthy(self, expr: Expr) -> str:
+        'Emit code that evaluates an expression, and return a test of its truthiness.'
+        value = self.expr(expr)
+        if is_boolean(expr):
+            return value
+        return f'not ({value} is None or {value} is False)'
+
+    def expr(self, expr: Expr) -> str:
+        '''
+        Emit code that evaluates an expression, and return a Python expression for its
+        value. The expression is cheap and has no side effects, so it can be repeated.
+        '''
+        match expr:
+            case Literal(value):
+                return repr(value)
+            case Grouping(inner):
+                return self.expr(inner)
+            case Variable(captured=True) | Assignment(captured=True):
+                raise NotCompilable('it uses a captured variable')
+            case Variable(symbol, _):
+                return self.lookup(symbol)
+            case Assignment(symbol, value_expr, _):
+                value = self.expr(value_expr)
+                local = self.lookup(symbol)
+                if local in self.free.values():
+                    self.assigned.add(symbol)
+                self.emit(f'{local} = {value}')
+                return local
+            case Logical(left, operator, right):
+                result = self.new_name('t')
+                self.emit(f'{result} = {self.expr(left)}')
+                if is_boolean(left):
+                    truthy = result
+                else:
+                    truthy = f'not ({result} is None or {result} is False)'
+                if operator == TT.OR:
+                    self.emit(f'if not {truthy}:')
+                else:
+                    self.emit(f'if {truthy}:')
+                self.depth += 1
+                self.emit(f'{result} = {self.expr(right)}')
+                self.depth -= 1
+                return result
+            case Unary(_, right, _):
+                return self.unary(expr, self.expr(right))
+            case Binary(left, operator, right):
+                left_value = self.expr(left)
+                if assigns(right):
+                    # Evaluating the right side may change the variable on the left, so
+                    # take a copy of it first.
+                    copy = self.new_name('t')
+                    self.emit(f'{copy} = {left_value}')
+                    left_value = copy
+                return self.binary(expr, left_value, self.expr(right))
+            case Call():
+                raise NotCompilable('it calls a function')
+            case _:
+                raise NotCompilable(f'it contains a {type(expr).__name__}')
+
+    def unary(self, expr: Unary, value: str) -> str:
+        result = self.new_name('t')
+        if expr.operator == TT.BANG:
+            self.emit(f'{result} = {value} is None or {value} is False')
+            return result
+        kind = operand_kind(self.feedback.get(id(expr)))
+        fast = {
+            'int': f'-{value} if {value} != 0 else -0.0',
+            'float': f'-{value}',
+            'number': f'negate({value})',
+        }.get(kind or '')
+        lines = None if fast is None else [f'{result} = {fast}']
+        self.guarded(expr, kind, lines, [(expr.right, value)], result)
+        return result
+
+    def binary(self, expr: Binary, left: str, right: str) -> str:
+        operator = expr.operator
+        if operator == TT.EQUAL_EQUAL:
+            return f'({left} == {right})'
+        if operator == TT.BANG_EQUAL:
+            return f'({left} != {right})'
+        result = self.new_name('t')
+        kind = operand_kind(self.feedback.get(id(expr)))
+        fast: list[str] | None = None
+        if kind == 'string' and operator == TT.PLUS:
+            fast = [f'{result} = concat(interp, {left}, {right})']
+        elif kind in ('int', 'float', 'number'):
+            if operator in COMPARISONS:
+                fast = [f'{result} = {left} {COMPARISONS[operator]} {right}']
+            elif operator == TT.SLASH:
+                fast = [f'{result} = {left} / {right}']
+            elif kind == 'float':
+                symbol = {TT.PLUS: '+', TT.MINUS: '-', TT.STAR: '*'}[operator]
+                fast = [f'{result} = {left} {symbol} {right}']
+            elif kind == 'number':
+                helper = {TT.PLUS: 'add', TT.MINUS: 'subtract', TT.STAR: 'multiply'}
+                fast = [f'{result} = {helper[operator]}({left}, {right})']
+            elif operator == TT.STAR:
+                fast = [
+                    f'{result} = {left} * {right}',
+                    # Zero times a negative number is negative zero in doubles.
+                    f'if {result} == 0 and ({left} < 0 or {right} < 0):',
+                    f'    {result} = -0.0',
+                    f'elif not {-MAX_EXACT_INT} <= {result} <= {MAX_EXACT_INT}:',
+                    f'    {result} = float({result})',
+                ]
+            else:
+                symbol = {TT.PLUS: '+', TT.MINUS: '-'}[operator]
+                fast = [
+                    f'{result} = {left} {symbol} {right}',
+                    f'if not {-MAX_EXACT_INT} <= {result} <= {MAX_EXACT_INT}:',
+                    f'    {result} = float({result})',
+                ]
+        operands = [(expr.left, left), (expr.right, right)]
+        self.guarded(expr, kind, fast, operands, result)
+        return result
+
+    def guarded(
+        self,
+        expr: Unary | Binary,
+        kind: str | None,
+        fast: list[str] | None,
+        operands: list[tuple[Expr, str]],
+        result: str,
+    ) -> None:
+        'Emit a fast path under a type guard, falling back to the interpreter.'
+        method = 'apply_unary' if isinstance(expr, Unary) else 'apply_binary'
+        values = ', '.join(value for _, value in operands)
+        slow = f'{result} = interp.{method}({self.constant(expr)}, {values})'
+        if fast is None or kind is None:
+            # No stable types to specialize on, so always take the slow path.
+            self.emit(slow)
+            return
+        checks = []
+        for node, value in operands:
+            if kind == 'number' and expr.numeric:
+                # Type inference proved it's a number.
+                continue
+            if isinstance(node, Literal):
+                # Literals don't need checking.
+                literal_kind = type(node.value).__name__
+                if literal_kind == kind or (
+                    kind == 'number' and literal_kind in ('int', 'float')
+                ) or (kind == 'string' and literal_kind == 'str'):
+                    continue
+            if kind == 'number':
+                checks.append(f'type({value}) in NUMBERS')
+            elif kind == 'string':
+                checks.append(f'type({value}) in STRINGS')
+            else:
+                checks.append(f'type({value}) is {kind}')
+        if not checks:
+            for line in fast:
+                self.emit(line)
+            return
+        self.emit(f'if {" and ".join(checks)}:')
+        for line in fast:
+            self.emit('    ' + line)
+        self.emit('else:')
+        self.emit('    ' + slow)
+        self.emit('    miss = True')
+
+
+def operand_kind(seen: set[tuple[type, ...]] | None) -> str | None:
+    '''
+    What to specialize an operator for, given the operand types it has seen.
+
+    Returns 'int' or 'float' if every operand has been that type, 'number' if they've
+    all been ints or floats, 'string' if they've all been strs or ropes, and None
+    otherwise.
+    '''
+    if not seen:
+        return None
+    types = {operand for types in seen for operand in types}
+    if len(types) == 1:
+        kind = next(iter(types))
+        if kind in (int, float):
+            return kind.__name__
+    if types <= {int, float}:
+        return 'number'
+    if types <= set(STRINGS):
+        return 'string'
+    return None
+
+
+def is_boolean(expr: Expr) -> bool:
+    'Whether an expression always evaluates to true or false.'
+    match expr:
+        case Literal(value):
+            return isinstance(value, bool)
+        case Grouping(inner):
+            return is_boolean(inner)
+        case Unary(operator, _, _):
+            return operator == TT.BANG
+        case Binary(_, operator, _, _):
+            return operator in (*COMPARISONS, TT.EQUAL_EQUAL, TT.BANG_EQUAL)
+        case _:
+            return False
+
+
+def assigns(expr: Expr) -> bool:
+    'Whether evaluating an expression may assign to a variable.'
+    match expr:
+        case Assignment():
+            return True
+        case Binary(left, _, right) | Logical(left, _, right):
+            return assigns(left) or assigns(right)
+        case Unary(_, right):
+            return assigns(right)
+        case Grouping(inner):
+            return assigns(inner)
+        case _:
+            return False
@@ -0,0 +1,30 @@
+'''
+Line and column lookup for source offsets.
+
+Tokens and AST nodes only record the offset at which they start. Lines and columns are
+worked out from those offsets when they're needed, which is only when reporting an
+error, using a sorted table of where the newlines are.
+'''
+
+import bisect
+import re
+
+
+class LineTable:
+
+    def __init__(self, source: str):
+        self.newlines = [match.start() for match in re.finditer('\n', source)]
+
+    @classmethod
+    def from_newlines(cls, newlines: list[int]) -> 'LineTable':
+        'A table for a source whose newlines are at the given offsets.'
+        lines = cls('')
+        lines.newlines = newlines
+        return lines
+
+    def position(self, offset: int) -> tuple[int, int]:
+        'The 1-based line and column of an offset.'
+        # The number of newlines before the offset gives the line.
+        index = bisect.bisect_left(self.newlines, offset)
+        line_start = self.newlines[index - 1] + 1 if index > 0 else 0
+        return index + 1, offset - line_start + 1
@@ -1,10 +1,12 @@
 import time
 from typing import Any, Protocol, runtime_checkable, TYPE_CHECKING
 
-from ._environment import Environment
+from ._budget import ENVIRONMENT_COST
+from ._environment import Cell, Environment
+from ._symbols import THIS, symbols
 
 if TYPE_CHECKING:
-    from ._interpret import Interpreter
+    from ._interpret import Interpreter, Return
     from ._stmt import FunctionStmt
 
 
@@ -28,21 +30,50 @@ class ClockCallable:
         return '<native fn>'
 
 
-clock = ClockCallable()
-
-
 class LoxFunction:
 
-    def __init__(self, declaration: 'FunctionStmt'):
+    def __init__(
+        self,
+        declaration: 'FunctionStmt',
+        closure: dict[int, Cell] | None = None,
+        initializer: bool = False,
+    ):
         self.declaration = declaration
         self.arity = len(self.declaration.params)
+        # The cells of the variables the function captures, keyed on their symbols.
+        self.closure = closure if closure is not None else {}
+        # Whether this is a class's init method, which always returns the instance.
+        self.initializer = initializer
+
+    def bind(self, instance: object) -> 'LoxFunction':
+        'The method, with `this` bound to the instance.'
+        closure = {**self.closure, THIS: Cell(instance)}
+        return LoxFunction(self.declaration, closure, self.initializer)
 
     def call(self, interpreter: 'Interpreter', args: list[object]) -> object:
+        env = self.make_environment(interpreter, args)
+        return self.returned(interpreter.execute_block(self.declaration.body, env))
+
+    def returned(self, result: 'Return | None') -> object:
+        'What a call gives back, given what executing the body did.'
+        if self.initializer:
+            return self.closure[THIS].value
+        return None if result is None else result.value
+
+    def make_environment(
+        self,
+        interpreter: 'Interpreter',
+        args: list[object],
+    ) -> Environment:
         env = Environment(interpreter.globals)
+        interpreter.alloc_bytes += ENVIRONMENT_COST
+        # Captured variables are copied in flat, so the function never needs the
+        # environments it was declared in.
+        env.values.update(self.closure)
+        captured = self.declaration.captured_params
         for i, param in enumerate(self.declaration.params):
-            env.define(param.lexeme, args[i])
-        interpreter.execute_block(self.declaration.body, env)
-        return None
+            env.define(param, Cell(args[i]) if param in captured else args[i])
+        return env
 
     def __str__(self) -> str:
-        return f'<fn {self.declaration.name.lexeme}>'
+        return f'<fn {symbols.name(self.declaration.symbol)}>'
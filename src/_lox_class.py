@@ -0,0 +1,123 @@
+'Classes and instances, and property access on them.'
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, cast
+
+from ._budget import INSTANCE_COST
+from ._errors import LoxRuntimeError
+from ._lox_callable import LoxFunction
+from ._shapes import Shape
+from ._symbols import INIT, symbols
+
+if TYPE_CHECKING:
+    from ._expr import Get, Set
+    from ._interpret import Interpreter
+
+
+class LoxClass:
+
+    def __init__(
+        self,
+        symbol: int,
+        superclass: LoxClass | None,
+        methods: dict[int, LoxFunction],
+        root: Shape,
+    ):
+        self.symbol = symbol
+        self.superclass = superclass
+        self.methods = methods
+        # The shape of a new instance, which has no fields yet. It's the declaration's.
+        self.root = root
+        # What find_method found for each name, inherited or not. Methods never change.
+        self.resolved: dict[int, LoxFunction | None] = {}
+        initializer = self.find_method(INIT)
+        self.arity = 0 if initializer is None else initializer.arity
+
+    def find_method(self, symbol: int) -> LoxFunction | None:
+        try:
+            return self.resolved[symbol]
+        except KeyError:
+            pass
+        method = None
+        klass: LoxClass | None = self
+        while klass is not None and method is None:
+            method = klass.methods.get(symbol)
+            klass = klass.superclass
+        self.resolved[symbol] = method
+        return method
+
+    def instantiate(self, interpreter: Interpreter) -> LoxInstance:
+        interpreter.alloc_bytes += INSTANCE_COST
+        return LoxInstance(self, self.root)
+
+    def call(self, interpreter: Interpreter, args: list[object]) -> object:
+        instance = self.instantiate(interpreter)
+        initializer = self.find_method(INIT)
+        if initializer is not None:
+            initializer.bind(instance).call(interpreter, args)
+        return instance
+
+    def __str__(self) -> str:
+        return symbols.name(self.symbol)
+
+
+class LoxInstance:
+
+    __slots__ = ('klass', 'shape', 'fields')
+
+    def __init__(self, klass: LoxClass, shape: Shape):
+        self.klass = klass
+        self.shape = shape
+        # Indexed by the slots in the shape.
+        self.fields: list[object] = []
+
+    def __str__(self) -> str:
+        return f'{self.klass} instance'
+
+
+def get_property(expr: Get, target: object) -> object:
+    if type(target) is not LoxInstance:
+        raise LoxRuntimeError(expr.offset, 'Only instances have properties.')
+    shape = target.shape
+    cache = expr.cache
+    entry = cache.first
+    if entry is None or entry[0] is not shape:
+        entry = cache.lookup(shape)
+        if entry is None:
+            entry = (shape, shape.slots.get(expr.name), None)
+            cache.remember(entry)
+    slot = entry[1]
+    if slot is not None:
+        return target.fields[slot]
+    method = target.klass.find_method(expr.name)
+    if method is None:
+        raise undefined_property(expr.offset, expr.name)
+    return method.bind(target)
+
+
+def set_property(expr: Set, target: object, value: object) -> None:
+    if type(target) is not LoxInstance:
+        raise LoxRuntimeError(expr.offset, 'Only instances have fields.')
+    shape = target.shape
+    cache = expr.cache
+    entry = cache.first
+    if entry is None or entry[0] is not shape:
+        entry = cache.lookup(shape)
+        if entry is None:
+            slot = shape.slots.get(expr.name)
+            if slot is None:
+                entry = (shape, len(shape.slots), shape.add(expr.name))
+            else:
+                entry = (shape, slot, None)
+            cache.remember(entry)
+    _, slot, next_shape = entry
+    if next_shape is None:
+        target.fields[cast(int, slot)] = value
+    else:
+        target.shape = next_shape
+        target.fields.append(value)
+
+
+def undefined_property(offset: int, symbol: int) -> LoxRuntimeError:
+    return LoxRuntimeError(offset, f"Undefined property '{symbols.name(symbol)}'.")
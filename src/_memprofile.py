@@ -0,0 +1,183 @@
+'''
+A memory profiler that attributes allocations to the Lox code that made them.
+
+MemoryProfiler runs a script with tracemalloc switched on, and measures the memory
+taken by each environment, concatenated string and function object the script creates.
+Each allocation is charged to a site: the Lox function running at the time, the offset
+of the node that allocated, and what kind of object it was.
+
+For each site it keeps the number of allocations, their cumulative size, and the peak:
+the most memory the whole run had in use at the moment of one of the site's
+allocations. The sites with the highest peak are the ones that were allocating when
+memory was at its highest.
+'''
+
+from __future__ import annotations
+
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Sequence, TextIO
+
+from ._budget import Budget, ENVIRONMENT_COST
+from ._environment import Environment
+from ._errors import LoxRuntimeError
+from ._expr import Binary, Call, Inline
+from ._interpret import STRINGS, Interpreter, Return
+from ._lines import LineTable
+from ._lox_callable import LoxCallableProtocol, LoxFunction
+from ._stmt import Stmt, BlockStmt, FunctionStmt
+from ._symbols import symbols
+# We use it a lot, so an alias helps.
+from ._token import TokenType as TT
+
+# What allocations made outside any function are charged to.
+TOP_LEVEL = '<script>'
+
+
+@dataclass
+class AllocationSite:
+    function: str
+    offset: int | None
+    kind: str
+    count: int = 0
+    total_bytes: int = 0
+    peak_bytes: int = 0
+
+
+class MemoryProfiler(Interpreter):
+
+    def __init__(self, budget: Budget | None = None, output: TextIO | None = None):
+        super().__init__(budget, output)
+        self.sites: dict[tuple[str, int | None, str], AllocationSite] = {}
+        # The names of the Lox functions being run, innermost last.
+        self.functions = [TOP_LEVEL]
+        # The most memory traced during the last run.
+        self.peak_bytes = 0
+        # The offset of the function being called and the memory traced before it
+        # made its environment, until it has.
+        self.entering: tuple[int, int] | None = None
+
+    def interpret(self, statements: Sequence[Stmt]) -> LoxRuntimeError | None:
+        # Leave tracemalloc as we found it, in case someone else is using it.
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        try:
+            return super().interpret(statements)
+        finally:
+            self.peak_bytes = tracemalloc.get_traced_memory()[1]
+            if started:
+                tracemalloc.stop()
+
+    def charge(self, kind: str, offset: int | None, before: int) -> None:
+        'Charge the memory allocated since `before` to the current site.'
+        current = tracemalloc.get_traced_memory()[0]
+        key = (self.functions[-1], offset, kind)
+        site = self.sites.get(key)
+        if site is None:
+            site = self.sites[key] = AllocationSite(*key)
+        site.count += 1
+        site.total_bytes += max(0, current - before)
+        site.peak_bytes = max(site.peak_bytes, current)
+
+    def execute(self, stmt: Stmt, env: Environment) -> Return | None:
+        match stmt:
+            case BlockStmt(statements, offset):
+                self.alloc_bytes += ENVIRONMENT_COST
+                before = tracemalloc.get_traced_memory()[0]
+                block_env = Environment(enclosing=env)
+                self.charge('environment', offset, before)
+                return self.execute_block(statements, block_env)
+            case _:
+                return super().execute(stmt, env)
+
+    def define_function(self, stmt: FunctionStmt, env: Environment) -> None:
+        before = tracemalloc.get_traced_memory()[0]
+        super().define_function(stmt, env)
+        self.charge('function', stmt.offset, before)
+
+    def apply_binary(self, expr: Binary, left: object, right: object) -> object:
+        if expr.operator != TT.PLUS or not isinstance(left, STRINGS):
+            return super().apply_binary(expr, left, right)
+        before = tracemalloc.get_traced_memory()[0]
+        result = super().apply_binary(expr, left, right)
+        self.charge('string', expr.offset, before)
+        return result
+
+    def eval_call(self, expr: Call, env: Environment) -> object:
+        # check_call says which function is running, and it runs until the call ends.
+        depth = len(self.functions)
+        try:
+            return super().eval_call(expr, env)
+        finally:
+            del self.functions[depth:]
+            self.entering = None
+
+    def check_call(
+        self,
+        offset: int,
+        callee: object,
+        args: list[object],
+    ) -> LoxCallableProtocol:
+        function = super().check_call(offset, callee, args)
+        if isinstance(function, LoxFunction):
+            declaration = function.declaration
+            self.functions.append(symbols.name(declaration.symbol))
+            # The function makes its environment next, and then runs its body.
+            self.entering = (declaration.offset, tracemalloc.get_traced_memory()[0])
+        return function
+
+    def execute_block(self, stmts: list[Stmt], env: Environment) -> Return | None:
+        if self.entering is not None:
+            offset, before = self.entering
+            self.entering = None
+            self.charge('environment', offset, before)
+        return super().execute_block(stmts, env)
+
+    def call_inline(self, expr: Call, inline: Inline, args: list[object]) -> object:
+        self.functions.append(symbols.name(inline.function.symbol))
+        try:
+            return super().call_inline(expr, inline, args)
+        finally:
+            self.functions.pop()
+
+    def inline_environment(self, inline: Inline, args: list[object]) -> Environment:
+        before = tracemalloc.get_traced_memory()[0]
+        env = super().inline_environment(inline, args)
+        self.charge('environment', inline.function.offset, before)
+        return env
+
+    def top_sites(self, n: int | None = None) -> list[AllocationSite]:
+        'The sites that allocated the most, biggest first.'
+        ranked = sorted(self.sites.values(), key=lambda site: -site.total_bytes)
+        return ranked if n is None else ranked[:n]
+
+    def report(self, lines: LineTable, n: int = 10) -> str:
+        rows = [
+            f'peak traced memory: {self.peak_bytes} bytes',
+            f'{"allocated":>12} {"count":>8} {"peak":>12}  {"kind":<12} where',
+        ]
+        for site in self.top_sites(n):
+            rows.append(
+                f'{site.total_bytes:>12} {site.count:>8} {site.peak_bytes:>12}  '
+                f'{site.kind:<12} {site.function}, {where(site, lines)}'
+            )
+        return '\n'.join(rows)
+
+    def dump(self, lines: LineTable) -> dict[str, object]:
+        'The whole profile, as plain data for writing out as JSON.'
+        sites = []
+        for site in self.top_sites():
+            line, column = (None, None) if site.offset is None else (
+                lines.position(site.offset)
+            )
+            sites.append({**asdict(site), 'line': line, 'column': column})
+        return {'peak_bytes': self.peak_bytes, 'sites': sites}
+
+
+def where(site: AllocationSite, lines: LineTable) -> str:
+    if site.offset is None:
+        return 'unknown position'
+    line, column = lines.position(site.offset)
+    return f'line {line}, column {column}'
@@ -0,0 +1,49 @@
+'''
+Lox numbers, which may be stored as Python ints.
+
+Lox numbers are doubles, but loop counters and indices are nearly always whole numbers,
+and Python ints are cheaper to work with than floats. Integral literals are scanned as
+ints, and arithmetic on ints stays in ints, as long as the result is one a double would
+have held exactly. These helpers fall back to floats wherever the answer would otherwise
+differ from doing the same arithmetic on doubles.
+'''
+
+# Every integer of at most this magnitude is exactly representable as a double.
+MAX_EXACT_INT = 2 ** 53
+
+
+def parse_number(text: str, integers: bool = True) -> float | int:
+    if integers and '.' not in text:
+        value = int(text)
+        if value <= MAX_EXACT_INT:
+            return value
+    return float(text)
+
+
+def add(left: float | int, right: float | int) -> float | int:
+    return _exact(left + right)
+
+
+def subtract(left: float | int, right: float | int) -> float | int:
+    return _exact(left - right)
+
+
+def multiply(left: float | int, right: float | int) -> float | int:
+    result = left * right
+    if result == 0 and type(result) is int and (left < 0 or right < 0):
+        # With doubles, zero times a negative number is negative zero.
+        return -0.0
+    return _exact(result)
+
+
+def negate(right: float | int) -> float | int:
+    if right == 0 and type(right) is int:
+        return -0.0
+    return -right
+
+
+def _exact(result: float | int) -> float | int:
+    if type(result) is int and not -MAX_EXACT_INT <= result <= MAX_EXACT_INT:
+        # Past this point a double would have rounded, so round the same way.
+        return float(result)
+    return result
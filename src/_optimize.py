@@ -0,0 +1,439 @@
+'''
+Optimizations that rewrite the AST after it's parsed and analyzed.
+
+Counted loops: a for loop like `for (var i = 0; i < n; i = i + 1) body` is desugared to
+a VarStmt followed by a WhileStmt, whose every iteration evaluates the condition and the
+increment in the tree-walker. When the loop only ever changes i by adding a constant
+step, and its bound can't change while it runs, the WhileStmt is replaced by a
+ForRangeStmt, which the interpreter drives from a Python range instead. It checks at
+run time that i and the bound are numbers that make a range, and runs the loop as
+written when they aren't, so the program behaves exactly as before. That includes the
+value i is left with.
+
+Constant folding and dead code: operators whose operands are all literals are worked
+out ahead of time, as long as doing so can't raise or allocate a string. An if whose
+condition folds to a literal is replaced by the branch that would run, and a while whose
+condition folds to a falsy literal is dropped, as are statements after a return. A local
+variable that's never read or assigned again is dropped too, if its initializer is safe:
+an expression that can't raise or have side effects.
+
+Loop-invariant code motion: a safe expression in a loop that only reads locals the loop
+can't assign is evaluated once, before the loop, into a temporary the loop reads
+instead. Temporaries have names starting with `$`, which no Lox variable can have.
+
+Inlining: a top-level function whose body just returns a small expression, and that
+doesn't call itself, has calls to it after its declaration marked with that expression.
+The interpreter evaluates it in place of calling the function, skipping the call's
+checks and its block. Lox functions are global variables that any code can assign, so
+each call first checks that it's still calling the same declaration, and makes an
+ordinary call if not.
+
+Like capture analysis and type inference, this works on one top-level statement at a
+time, and relies on both having run.
+'''
+
+from typing import AbstractSet
+
+from ._expr import (
+    Expr, Assignment, Binary, Call, Get, Grouping, Inline, Literal, Logical, Set, Unary,
+    Variable
+)
+from ._interpret import NUMERIC, is_truthy
+from ._numbers import negate
+from ._stmt import (
+    Stmt, BlockStmt, ClassStmt, ExprStmt, ForRangeStmt, FunctionStmt, IfStmt, PrintStmt,
+    ReturnStmt, VarStmt, WhileStmt, walk
+)
+from ._symbols import symbols
+# We use it a lot, so an alias helps.
+from ._token import TokenType as TT
+
+# The comparisons a counted loop may test its variable with, and whether each counts up
+# (True) or down. LESS_EQUAL compares with >=, like the interpreter does.
+DIRECTIONS = {
+    TT.LESS: True,
+    TT.GREATER: False,
+    TT.GREATER_EQUAL: False,
+    TT.LESS_EQUAL: False,
+}
+# The nodes a loop's bound may be made of, none of which have side effects.
+PURE = (Literal, Variable, Grouping, Unary, Binary)
+# The operators that are safe on any operands.
+EQUALITY = {TT.BANG_EQUAL, TT.EQUAL_EQUAL}
+# The nodes that declare a variable.
+DECLARATIONS = (VarStmt, FunctionStmt, ClassStmt)
+# The most nodes the expression a function returns may have for it to be inlined.
+INLINE_BUDGET = 12
+
+
+def optimize(stmt: Stmt, functions: dict[int, Inline | None] | None = None) -> Stmt:
+    '''
+    Optimize a top-level statement, and return what replaces it.
+
+    `functions` has the top-level functions declared so far that calls may be inlined
+    to, keyed on their names, as recorded by record_functions.
+    '''
+    return Optimizer(functions).nested(stmt)
+
+
+def record_functions(
+    stmt: Stmt,
+    functions: dict[int, Inline | None],
+    budget: int = INLINE_BUDGET,
+) -> None:
+    '''
+    Record which functions a top-level statement declares that calls may be inlined to.
+
+    Names that are declared again, or assigned anywhere, are recorded as None, so calls
+    after that aren't inlined.
+    '''
+    for node in walk(stmt):
+        if isinstance(node, Assignment) and node.symbol in functions:
+            functions[node.symbol] = None
+    match stmt:
+        case FunctionStmt(symbol, _, [ReturnStmt(value)]) if (
+            value is not None and symbol not in functions
+        ):
+            nodes = list(walk(value))
+            recursive = any(
+                isinstance(node, Variable) and node.symbol == symbol for node in nodes
+            )
+            functions[symbol] = (
+                None if recursive or len(nodes) > budget else Inline(stmt, value)
+            )
+        case FunctionStmt(symbol) | VarStmt(symbol) | ClassStmt(symbol):
+            functions[symbol] = None
+
+
+class Optimizer:
+
+    def __init__(self, functions: dict[int, Inline | None] | None = None):
+        self.functions = functions if functions is not None else {}
+        # For the variables of the blocks and functions being optimized, innermost
+        # last, whether each is captured.
+        self.scopes: list[dict[int, bool]] = []
+        # How many temporaries have been made for loop-invariant expressions.
+        self.temporaries = 0
+        # The ids of the VarStmts that can be dropped if nothing reads them.
+        self.removable: set[int] = set()
+
+    def declare(self, symbol: int, captured: bool) -> None:
+        if self.scopes:
+            self.scopes[-1][symbol] = captured
+
+    def is_local(self, symbol: int) -> bool:
+        'Whether a variable is a local that only the code around it can assign.'
+        for scope in reversed(self.scopes):
+            if symbol in scope:
+                return not scope[symbol]
+        return False
+
+    def stmt(self, stmt: Stmt) -> Stmt | None:
+        'Optimize a statement, and return what replaces it, or None to drop it.'
+        match stmt:
+            case ExprStmt(expr) | PrintStmt(expr):
+                stmt.expression = self.fold(expr)
+            case VarStmt(symbol, initializer, captured):
+                if initializer is not None:
+                    stmt.initializer = initializer = self.fold(initializer)
+                if self.scopes and not captured and (
+                    initializer is None or self.safe(initializer)
+                ):
+                    self.removable.add(id(stmt))
+                self.declare(symbol, captured)
+            case FunctionStmt():
+                self.declare(stmt.symbol, stmt.captured)
+                self.function(stmt)
+            case ClassStmt(symbol, _, methods, _, captured):
+                self.declare(symbol, captured)
+                for method in methods:
+                    self.function(method)
+            case BlockStmt(statements):
+                self.scopes.append({})
+                stmt.statements = self.statements(statements)
+                self.scopes.pop()
+            case IfStmt(condition, then_branch, else_branch):
+                stmt.condition = condition = self.fold(condition)
+                if isinstance(condition, Literal):
+                    branch = then_branch if is_truthy(condition.value) else else_branch
+                    return None if branch is None else self.stmt(branch)
+                stmt.then_branch = self.nested(then_branch)
+                if else_branch is not None:
+                    stmt.else_branch = self.nested(else_branch)
+            case WhileStmt(condition, body):
+                stmt.condition = condition = self.fold(condition)
+                # Like the interpreter, test the condition's Python truthiness.
+                if isinstance(condition, Literal) and not condition.value:
+                    return None
+                stmt.body = self.nested(body)
+            case ReturnStmt(value):
+                if value is not None:
+                    stmt.value = self.fold(value)
+        return stmt
+
+    def nested(self, stmt: Stmt) -> Stmt:
+        'Optimize a statement that has to stay, like the body of a loop.'
+        optimized = self.stmt(stmt)
+        return BlockStmt([]) if optimized is None else optimized
+
+    def function(self, stmt: FunctionStmt) -> None:
+        self.scopes.append({})
+        for param in stmt.params:
+            self.declare(param, param in stmt.captured_params)
+        stmt.body = self.statements(stmt.body)
+        self.scopes.pop()
+
+    def statements(self, statements: list[Stmt]) -> list[Stmt]:
+        optimized: list[Stmt] = []
+        for stmt in statements:
+            replacement = self.stmt(stmt)
+            if replacement is None:
+                continue
+            if isinstance(replacement, WhileStmt):
+                temporaries = self.hoist(replacement)
+                optimized.extend(temporaries)
+                index = len(optimized) - len(temporaries) - 1
+                counter = optimized[index] if index >= 0 else None
+                if isinstance(counter, VarStmt):
+                    counted = self.counted_loop(counter, replacement)
+                    if counted is not None:
+                        replacement = counted
+            optimized.append(replacement)
+            if isinstance(replacement, ReturnStmt):
+                # Nothing after it can run.
+                break
+        return self.unused(optimized)
+
+    def unused(self, statements: list[Stmt]) -> list[Stmt]:
+        'Drop the removable variables no later statement uses.'
+        used: set[int] = set()
+        kept: list[Stmt] = []
+        for stmt in reversed(statements):
+            if (
+                isinstance(stmt, VarStmt) and
+                id(stmt) in self.removable and
+                stmt.symbol not in used
+            ):
+                continue
+            kept.append(stmt)
+            used.update(
+                node.symbol
+                for node in walk(stmt)
+                if isinstance(node, (Variable, Assignment))
+            )
+        kept.reverse()
+        return kept
+
+    def fold(self, expr: Expr) -> Expr:
+        'Fold the constants in an expression, and return what replaces it.'
+        match expr:
+            case Assignment(_, value):
+                expr.value = self.fold(value)
+            case Binary(left, operator, right):
+                expr.left = left = self.fold(left)
+                expr.right = right = self.fold(right)
+                if isinstance(left, Literal) and isinstance(right, Literal):
+                    a, b = left.value, right.value
+                    if operator in EQUALITY:
+                        return Literal((a == b) == (operator == TT.EQUAL_EQUAL))
+                    if (
+                        operator in NUMERIC and
+                        type(a) in (int, float) and
+                        type(b) in (int, float) and
+                        not (operator == TT.SLASH and b == 0)
+                    ):
+                        return Literal(NUMERIC[operator](a, b))
+            case Call(callee, arguments):
+                expr.callee = callee = self.fold(callee)
+                expr.arguments = [self.fold(argument) for argument in arguments]
+                if isinstance(callee, Variable) and not any(
+                    callee.symbol in scope for scope in self.scopes
+                ):
+                    inline = self.functions.get(callee.symbol)
+                    if inline is not None and (
+                        len(inline.function.params) == len(arguments)
+                    ):
+                        expr.inline = inline
+            case Get(target):
+                expr.target = self.fold(target)
+            case Grouping(inner):
+                expr.expression = inner = self.fold(inner)
+                if isinstance(inner, Literal):
+                    return inner
+            case Logical(left, operator, right):
+                expr.left = left = self.fold(left)
+                expr.right = self.fold(right)
+                if isinstance(left, Literal):
+                    if is_truthy(left.value) == (operator == TT.OR):
+                        return left
+                    return expr.right
+            case Set(target, _, value):
+                expr.target = self.fold(target)
+                expr.value = self.fold(value)
+            case Unary(operator, right):
+                expr.right = right = self.fold(right)
+                if isinstance(right, Literal):
+                    if operator == TT.BANG:
+                        return Literal(not is_truthy(right.value))
+                    if type(right.value) in (int, float):
+                        return Literal(negate(right.value))
+        return expr
+
+    def safe(self, expr: Expr, variant: AbstractSet[int] = frozenset()) -> bool:
+        'Whether an expression can\'t raise, have side effects, or read variant locals.'
+        match expr:
+            case Literal():
+                return True
+            case Variable(symbol):
+                return self.is_local(symbol) and symbol not in variant
+            case Grouping(inner):
+                return self.safe(inner, variant)
+            case Unary(operator, right):
+                return (
+                    (operator == TT.BANG or expr.numeric) and self.safe(right, variant)
+                )
+            case Binary(left, operator, right):
+                if operator == TT.SLASH and not (
+                    isinstance(right, Literal) and right.value != 0
+                ):
+                    return False
+                return (
+                    (operator in EQUALITY or expr.numeric) and
+                    self.safe(left, variant) and
+                    self.safe(right, variant)
+                )
+            case Logical(left, _, right):
+                return self.safe(left, variant) and self.safe(right, variant)
+        return False
+
+    def hoist(self, loop: WhileStmt) -> list[VarStmt]:
+        '''
+        Move the loop-invariant expressions out of a loop.
+
+        Return the declarations of the temporaries that hold them, to go before it.
+        '''
+        if not self.scopes:
+            # The temporaries would be globals.
+            return []
+        # The variables the loop may change, including any it declares, which may
+        # shadow the ones around it.
+        variant = {
+            node.symbol
+            for node in walk(loop)
+            if isinstance(node, (Assignment, *DECLARATIONS))
+        }
+        temporaries: list[VarStmt] = []
+
+        def invariant(expr: Expr) -> Expr:
+            if not isinstance(expr, (Literal, Variable)) and self.safe(expr, variant):
+                symbol = symbols.intern(f'${self.temporaries}')
+                self.temporaries += 1
+                self.declare(symbol, False)
+                temporaries.append(VarStmt(symbol, expr))
+                return Variable(symbol, loop.offset or 0)
+            match expr:
+                case Assignment(_, value):
+                    expr.value = invariant(value)
+                case Binary(left, _, right) | Logical(left, _, right):
+                    expr.left = invariant(left)
+                    expr.right = invariant(right)
+                case Call(callee, arguments):
+                    expr.callee = invariant(callee)
+                    expr.arguments = [invariant(argument) for argument in arguments]
+                case Get(target):
+                    expr.target = invariant(target)
+                case Grouping(inner):
+                    expr.expression = invariant(inner)
+                case Set(target, _, value):
+                    expr.target = invariant(target)
+                    expr.value = invariant(value)
+                case Unary(_, right):
+                    expr.right = invariant(right)
+            return expr
+
+        def visit(stmt: Stmt) -> None:
+            match stmt:
+                case ExprStmt(expr) | PrintStmt(expr):
+                    stmt.expression = invariant(expr)
+                case VarStmt(_, initializer) if initializer is not None:
+                    stmt.initializer = invariant(initializer)
+                case ReturnStmt(value) if value is not None:
+                    stmt.value = invariant(value)
+                case BlockStmt(statements):
+                    for inner in statements:
+                        visit(inner)
+                case IfStmt(condition, then_branch, else_branch):
+                    stmt.condition = invariant(condition)
+                    visit(then_branch)
+                    if else_branch is not None:
+                        visit(else_branch)
+                case WhileStmt(condition, body):
+                    stmt.condition = invariant(condition)
+                    visit(body)
+                case ForRangeStmt(loop=inner):
+                    visit(inner)
+                # Functions run later, and can't be hoisted out of.
+
+        visit(loop)
+        return temporaries
+
+    def counted_loop(self, var: VarStmt, loop: WhileStmt) -> ForRangeStmt | None:
+        'Recognize a loop that counts the variable just declared before it.'
+        symbol = var.symbol
+        if var.captured:
+            return None
+        match loop.condition:
+            case Binary(Variable(counter), operator, bound) if counter == symbol:
+                up = DIRECTIONS.get(operator)
+            case _:
+                return None
+        if up is None or not isinstance(loop.body, BlockStmt):
+            return None
+        if not loop.body.statements:
+            return None
+        step = increment(symbol, loop.body.statements[-1])
+        if step is None or step == 0 or (step > 0) != up:
+            return None
+        body = loop.body.statements[:-1]
+        writes = {
+            node.symbol
+            for stmt in body
+            for node in walk(stmt)
+            if isinstance(node, Assignment)
+        }
+        calls = any(
+            isinstance(node, Call) for stmt in body for node in walk(stmt)
+        )
+        for node in walk(bound):
+            if not isinstance(node, PURE):
+                return None
+            if isinstance(node, Variable) and (
+                node.symbol == symbol or
+                node.symbol in writes or
+                # Calls can assign globals and captured variables.
+                calls and not self.is_local(node.symbol)
+            ):
+                return None
+        if symbol in writes:
+            return None
+        # A declaration of the counter in the body's own block would make the increment
+        # update that instead. Ones in nested blocks go out of scope before it.
+        declarations = (VarStmt, FunctionStmt, ClassStmt)
+        if any(
+            isinstance(stmt, declarations) and stmt.symbol == symbol for stmt in body
+        ):
+            return None
+        return ForRangeStmt(symbol, step, loop)
+
+
+def increment(symbol: int, stmt: Stmt) -> int | None:
+    'The step of `i = i + step` or `i = i - step`, with step a whole number literal.'
+    match stmt:
+        case ExprStmt(
+            Assignment(target, Binary(Variable(source), operator, Literal(step)))
+        ) if target == source == symbol and type(step) is int:
+            if operator == TT.PLUS:
+                return step
+            if operator == TT.MINUS:
+                return -step
+    return None
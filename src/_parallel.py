@@ -0,0 +1,196 @@
+'''
+The parallelMap native, which fans calls to a Lox function out over worker processes.
+
+Workers receive copies of the global variables that hold functions (closures and all),
+nil, bools, numbers and strings, and define them in a fresh interpreter for each task.
+That means only functions whose results depend on nothing but their arguments, the
+variables they capture and those globals give the same answers in parallel as they
+would serially. Globals holding classes, instances or natives aren't sent, so reading
+one in a worker is an undefined variable error. Assignments a worker makes to captured
+or global variables are not seen by the parent.
+
+Each chunk of calls runs under what's left of the caller's Budget, and the work every
+chunk did is added to the caller's counters in order, so a budget limits parallel work
+as it would serial work. What a worker prints is collected, and written to the caller's
+output in order once the chunk is done.
+
+Every interpreter shares one process pool, which is started on first use and shut down
+when Python exits.
+'''
+
+import atexit
+import io
+import math
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from ._budget import Budget
+from ._errors import LoxBudgetError, LoxRuntimeError
+from ._lox_callable import LoxFunction
+from ._strings import Rope
+from ._symbols import symbols
+
+if TYPE_CHECKING:
+    from ._interpret import Interpreter
+
+# How many chunks to cut the work into per worker, to even out uneven call costs.
+CHUNKS_PER_WORKER = 4
+# How many worker processes the shared pool has.
+MAX_WORKERS = os.cpu_count() or 1
+
+# The global values that are sent to workers.
+SHIPPED = (LoxFunction, type(None), bool, int, float, str, Rope)
+
+_executor: Executor | None = None
+_executor_lock = threading.Lock()
+
+
+def shared_executor() -> Executor:
+    'The process pool every parallelMap runs on, started on first use.'
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(MAX_WORKERS)
+            atexit.register(_executor.shutdown)
+        return _executor
+
+
+@dataclass
+class ChunkResult:
+    '''
+    What a worker sends back for a chunk.
+
+    Errors are passed back as plain data because LoxRuntimeError can't be pickled.
+    '''
+    results: list[object]
+    # Everything the calls printed.
+    output: str
+    # The steps taken and bytes allocated, to add to the caller's counters.
+    steps: int
+    alloc_bytes: int
+    # The offset and message of the first runtime error, if there was one, and whether
+    # it was a budget error.
+    error: tuple[int | None, str] | None = None
+    over_budget: bool = False
+
+
+def _run_chunk(
+    names: list[str],
+    values: dict[int, object],
+    function: LoxFunction,
+    inputs: list[float],
+    budget: Budget | None,
+    usage: tuple[int, int, float | None],
+) -> ChunkResult:
+    '''
+    Call the function on each input, in a worker process.
+
+    `values` are the parent's global functions and plain values, keyed on their symbols.
+    Functions refer to names by the parent's symbol IDs, so the worker first brings its
+    symbol table into line with the parent's `names`.
+
+    The calls run under the caller's budget, starting from the caller's `usage`: the
+    steps it had taken, the bytes it had allocated, and its deadline, if it has one, as
+    a time.time().
+    '''
+    symbols.extend(names)
+    # Imported here to avoid a circular import; the interpreter defines this native.
+    from ._interpret import Interpreter
+    # A fresh interpreter, so nothing an earlier task defined is left over.
+    output = io.StringIO()
+    interpreter = Interpreter(budget, output)
+    interpreter.globals.values.update(values)
+    steps, alloc_bytes, deadline = usage
+    interpreter.steps, interpreter.alloc_bytes = steps, alloc_bytes
+    if deadline is not None:
+        interpreter.deadline = time.monotonic() + deadline - time.time()
+
+    chunk = ChunkResult([], '', 0, 0)
+    for value in inputs:
+        try:
+            chunk.results.append(function.call(interpreter, [value]))
+        except LoxRuntimeError as exc:
+            chunk.error = (exc.offset, exc.msg)
+            chunk.over_budget = isinstance(exc, LoxBudgetError)
+            break
+    chunk.output = output.getvalue()
+    chunk.steps = interpreter.steps - steps
+    chunk.alloc_bytes = interpreter.alloc_bytes - alloc_bytes
+    return chunk
+
+
+class ParallelMapCallable:
+    '''
+    parallelMap(fn, start, end) calls fn(i) for each i from start up to (but not
+    including) end across a process pool, and returns the results in order.
+    '''
+
+    def __init__(self):
+        self.arity = 3
+
+    def call(self, interpreter: 'Interpreter', args: list[object]) -> object:
+        function, start, end = args
+        if not isinstance(function, LoxFunction) or function.arity != 1:
+            raise LoxRuntimeError(
+                None, 'parallelMap() expects a function of one argument.'
+            )
+        if not isinstance(start, (float, int)) or not isinstance(end, (float, int)):
+            raise LoxRuntimeError(None, 'parallelMap() expects numeric bounds.')
+
+        inputs = [start + i for i in range(max(0, math.ceil(end - start)))]
+        if not inputs:
+            return []
+        chunk_size = math.ceil(len(inputs) / (MAX_WORKERS * CHUNKS_PER_WORKER))
+        chunks = [
+            inputs[i:i + chunk_size] for i in range(0, len(inputs), chunk_size)
+        ]
+        # Ship the globals, so the mapped function can call its helpers and read
+        # settings. The builtins are left out, since every interpreter has its own.
+        values: dict[int, object] = {
+            symbol: value
+            for symbol, value in interpreter.globals.values.items()
+            if isinstance(value, SHIPPED)
+        }
+        # Monotonic clocks can't be compared across processes, so the deadline goes as
+        # a wall-clock time.
+        deadline = interpreter.deadline
+        if deadline is not None:
+            deadline = time.time() + deadline - time.monotonic()
+        usage = (interpreter.steps, interpreter.alloc_bytes, deadline)
+
+        executor = shared_executor()
+        names = symbols.names[:]
+        futures = [
+            executor.submit(
+                _run_chunk, names, values, function, chunk, interpreter.budget, usage
+            )
+            for chunk in chunks
+        ]
+        results: list[object] = []
+        try:
+            # Chunks are handled in order, so output, counters and the first error are
+            # what a serial loop would have had.
+            for future in futures:
+                chunk = future.result()
+                results.extend(chunk.results)
+                print(chunk.output, end='', file=interpreter.output)
+                interpreter.steps += chunk.steps
+                interpreter.alloc_bytes += chunk.alloc_bytes
+                if chunk.error is not None:
+                    if chunk.over_budget:
+                        raise LoxBudgetError(*chunk.error)
+                    raise LoxRuntimeError(*chunk.error)
+                if interpreter.budget is not None:
+                    interpreter.check_limits(None)
+        finally:
+            # Once one chunk fails, the ones that haven't started needn't.
+            for future in futures:
+                future.cancel()
+        return results
+
+    def __str__(self) -> str:
+        return '<native fn>'
@@ -0,0 +1,122 @@
+'''
+A parallel front end, for parsing very large scripts across worker processes.
+
+The source is scanned as usual, and the tokens are cut into chunks at the boundaries of
+top-level declarations: after a `;` or `}` outside any braces or parentheses, unless an
+`else` follows. Each worker re-scans its chunk's slice of the source, parses it the
+same way Parser.parse would, and sends the statements back in the compact form from
+_serialize. The statements are stitched back together in order.
+
+A parse error can throw the parser's recovery out of step with the chunk boundaries, so
+from the first chunk with an error onwards, the tokens are parsed again here, in one go,
+to report exactly the errors a serial parse would, in source order.
+
+Calls aren't inlined across chunks, and inlining doesn't survive serialization, so
+calls in parallel-parsed programs are never inlined.
+'''
+
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+from ._errors import LoxParseError
+from ._parse import Parser
+from ._scan import scan
+from ._serialize import dump_statements, load_statements
+from ._stmt import Stmt
+from ._token import Token, TokenType as TT
+
+# Chunks smaller than this aren't worth sending to a worker.
+MIN_CHUNK_TOKENS = 20_000
+# How many chunks to cut the tokens into per worker, to even out uneven chunks.
+CHUNKS_PER_WORKER = 2
+
+OPENING = {TT.LEFT_BRACE, TT.LEFT_PAREN}
+CLOSING = {TT.RIGHT_BRACE, TT.RIGHT_PAREN}
+
+
+def split_points(tokens: list[Token]) -> list[int]:
+    'The indexes of the tokens that start a top-level declaration, after the first.'
+    points = []
+    depth = 0
+    for index, token in enumerate(tokens[:-1]):
+        token_type = token.token_type
+        if token_type in OPENING:
+            depth += 1
+        elif token_type in CLOSING:
+            depth -= 1
+        if (
+            depth == 0 and
+            token_type in (TT.SEMICOLON, TT.RIGHT_BRACE) and
+            tokens[index + 1].token_type not in (TT.ELSE, TT.EOF)
+        ):
+            points.append(index + 1)
+    return points
+
+
+def chunk_starts(tokens: list[Token], chunks: int) -> list[int]:
+    'The indexes of the tokens to start each chunk at, for about `chunks` chunks.'
+    size = max(MIN_CHUNK_TOKENS, len(tokens) // chunks)
+    starts = [0]
+    for point in split_points(tokens):
+        if point - starts[-1] >= size:
+            starts.append(point)
+    return starts
+
+
+def _parse_chunk(source: str, base: int) -> bytes | None:
+    '''
+    Parse a slice of the source that starts at offset `base`, in a worker process.
+
+    Returns the serialized statements, or None if there was a parse error. Scan errors
+    are left to the scan of the whole source.
+    '''
+    tokens, _ = scan(source)
+    for token in tokens:
+        token.offset += base
+    parser = Parser()
+    statements = parser.parse(tokens)
+    if parser.errors:
+        return None
+    return dump_statements(statements)
+
+
+def parse_parallel(
+    source: str,
+    tokens: list[Token],
+    executor: Executor | None = None,
+    max_workers: int | None = None,
+) -> tuple[list[Stmt], list[LoxParseError]]:
+    '''
+    Parse the tokens scanned from source across worker processes.
+
+    Returns the statements and the parse errors, the same as Parser.parse and its
+    errors would. Runs the work on `executor` if one is given, or else on a process pool
+    of `max_workers` (by default, one per CPU) that's shut down afterwards. With only
+    one worker, or too few tokens to split, it parses serially instead.
+    '''
+    workers = max_workers or os.cpu_count() or 1
+    starts = chunk_starts(tokens, workers * CHUNKS_PER_WORKER)
+    if len(starts) == 1 or (executor is None and workers == 1):
+        parser = Parser()
+        return parser.parse(tokens), parser.errors
+    offsets = [tokens[start].offset for start in starts]
+    ends = [*offsets[1:], len(source)]
+    slices = [source[offset:end] for offset, end in zip(offsets, ends)]
+
+    own_executor = executor is None
+    if executor is None:
+        executor = ProcessPoolExecutor(workers)
+    try:
+        chunks = list(executor.map(_parse_chunk, slices, offsets))
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    statements: list[Stmt] = []
+    for start, chunk in zip(starts, chunks):
+        if chunk is None:
+            parser = Parser()
+            statements.extend(parser.parse(tokens[start:]))
+            return statements, parser.errors
+        statements.extend(load_statements(chunk))
+    return statements, []
@@ -1,19 +1,38 @@
+from ._captures import analyze_captures
+from ._hashcons import HashConser
+from ._infer import infer_types
+from ._optimize import INLINE_BUDGET, optimize, record_functions
 from ._token import Token
 from ._expr import (
-    Expr, Binary, Grouping, Literal, Logical, Unary, Variable, Assignment, Call
+    Expr, Binary, Grouping, Inline, Literal, Logical, Unary, Variable, Assignment, Call,
+    Get, Set, Super
 )
 from ._stmt import (
-    Stmt, ExprStmt, IfStmt, PrintStmt, WhileStmt, VarStmt, BlockStmt, FunctionStmt
+    Stmt, ExprStmt, IfStmt, PrintStmt, WhileStmt, VarStmt, BlockStmt, FunctionStmt,
+    ReturnStmt, ClassStmt
 )
 from ._errors import LoxParseError
+from ._symbols import INIT, THIS
 # We're going to use this a lot so an alias helps.
 from ._token import TokenType as TT
 
 
 class Parser:
 
-    def __init__(self):
+    def __init__(self, inline_budget: int = INLINE_BUDGET, hash_cons: bool = False):
         self.errors: list[LoxParseError] = []
+        # How big a function's returned expression may be for calls to it to be
+        # inlined, and the top-level functions parsed so far that they may be.
+        self.inline_budget = inline_budget
+        self.inlinable: dict[int, Inline | None] = {}
+        # With hash_cons, identical subtrees are shared, and this counts how many.
+        self.hash_conser = HashConser() if hash_cons else None
+        # The kinds of the functions being parsed, innermost last, to catch misplaced
+        # returns.
+        self.functions: list[str] = []
+        # For each class being parsed, innermost last, whether it has a superclass, to
+        # catch misplaced uses of 'this' and 'super'.
+        self.classes: list[bool] = []
 
     def parse(
         self,
@@ -28,6 +47,12 @@ class Parser:
                 self.errors.append(exc)
                 current_pos = self.synchronize(tokens, current_pos+1)
             else:
+                analyze_captures(stmt)
+                infer_types(stmt)
+                stmt = optimize(stmt, self.inlinable)
+                record_functions(stmt, self.inlinable, self.inline_budget)
+                if self.hash_conser is not None:
+                    stmt = self.hash_conser.share(stmt)
                 stmts.append(stmt)
         return stmts
 
@@ -36,7 +61,11 @@ class Parser:
         tokens: list[Token],
         current_pos: int,
     ) -> tuple[Stmt, int]:
-        if tokens[current_pos].token_type == TT.FUN:
+        if tokens[current_pos].token_type == TT.CLASS:
+            # Consume the CLASS token.
+            current_pos += 1
+            return self.parse_class(tokens, current_pos)
+        elif tokens[current_pos].token_type == TT.FUN:
             # Consume the FUN token.
             current_pos += 1
             return self.parse_function('function', tokens, current_pos)
@@ -47,6 +76,55 @@ class Parser:
         else:
             return self.parse_stmt(tokens, current_pos)
 
+    def parse_class(
+        self,
+        tokens: list[Token],
+        current_pos: int,
+    ) -> tuple[Stmt, int]:
+        name, current_pos = self.consume(
+            tokens,
+            current_pos,
+            TT.IDENTIFIER,
+            "Expect class name.",
+        )
+        superclass = None
+        if tokens[current_pos].token_type == TT.LESS:
+            # Consume the LESS token.
+            current_pos += 1
+            token, current_pos = self.consume(
+                tokens,
+                current_pos,
+                TT.IDENTIFIER,
+                "Expect superclass name.",
+            )
+            superclass = Variable(cast_symbol(token), token.offset)
+            if superclass.symbol == name.symbol:
+                self.errors.append(
+                    LoxParseError(token, "A class can't inherit from itself.")
+                )
+        _, current_pos = self.consume(
+            tokens,
+            current_pos,
+            TT.LEFT_BRACE,
+            "Expect '{' before class body.",
+        )
+        methods: list[FunctionStmt] = []
+        self.classes.append(superclass is not None)
+        try:
+            while tokens[current_pos].token_type not in (TT.RIGHT_BRACE, TT.EOF):
+                method, current_pos = self.parse_function('method', tokens, current_pos)
+                methods.append(method)
+        finally:
+            self.classes.pop()
+        _, current_pos = self.consume(
+            tokens,
+            current_pos,
+            TT.RIGHT_BRACE,
+            "Expect '}' after class body.",
+        )
+        stmt = ClassStmt(cast_symbol(name), superclass, methods, name.offset)
+        return stmt, current_pos
+
     def parse_var_declaration(
         self,
         tokens: list[Token],
@@ -69,13 +147,14 @@ class Parser:
             TT.SEMICOLON,
             "Expect ';' after variable declaration.",
         )
-        return VarStmt(name_token, initializer), current_pos
+        return VarStmt(cast_symbol(name_token), initializer), current_pos
 
     def parse_while_stmt(
         self,
         tokens: list[Token],
         current_pos: int,
     ) -> tuple[WhileStmt, int]:
+        keyword = tokens[current_pos - 1]
         _, current_pos = self.consume(
             tokens,
             current_pos,
@@ -90,7 +169,7 @@ class Parser:
             "Expect ')' after while condition.",
         )
         body, current_pos = self.parse_stmt(tokens, current_pos)
-        return WhileStmt(condition, body), current_pos
+        return WhileStmt(condition, body, keyword.offset), current_pos
 
     def parse_stmt(
         self,
@@ -105,6 +184,10 @@ class Parser:
             # Consume the PRINT token.
             current_pos += 1
             return self.parse_print_stmt(tokens, current_pos)
+        elif tokens[current_pos].token_type == TT.RETURN:
+            # Consume the RETURN token.
+            current_pos += 1
+            return self.parse_return_stmt(tokens, current_pos)
         elif tokens[current_pos].token_type == TT.WHILE:
             # Consume the left brace token.
             current_pos += 1
@@ -112,8 +195,9 @@ class Parser:
         elif tokens[current_pos].token_type == TT.LEFT_BRACE:
             # Consume the left brace token.
             current_pos += 1
+            brace = tokens[current_pos - 1]
             block, current_pos = self.parse_block(tokens, current_pos)
-            return BlockStmt(block), current_pos
+            return BlockStmt(block, brace.offset), current_pos
         elif tokens[current_pos].token_type == TT.FOR:
             # Consume the for token.
             current_pos += 1
@@ -126,6 +210,7 @@ class Parser:
         tokens: list[Token],
         current_pos: int,
     ) -> tuple[Stmt, int]:
+        keyword = tokens[current_pos - 1]
         _, current_pos = self.consume(
             tokens,
             current_pos,
@@ -168,13 +253,13 @@ class Parser:
 
         # Desugar
         if increment:
-            body = BlockStmt([body, ExprStmt(increment)])
+            body = BlockStmt([body, ExprStmt(increment)], keyword.offset)
         if condition is not None:
-            body = WhileStmt(condition, body)
+            body = WhileStmt(condition, body, keyword.offset)
         else:
-            body = WhileStmt(Literal(True), body)
+            body = WhileStmt(Literal(True), body, keyword.offset)
         if initializer:
-            body = BlockStmt([initializer, body])
+            body = BlockStmt([initializer, body], keyword.offset)
         return body, current_pos
 
     def parse_if_stmt(
@@ -203,6 +288,32 @@ class Parser:
             else_stmt, current_pos = self.parse_stmt(tokens, current_pos)
         return IfStmt(condition, then_stmt, else_stmt), current_pos
 
+    def parse_return_stmt(
+        self,
+        tokens: list[Token],
+        current_pos: int,
+    ) -> tuple[ReturnStmt, int]:
+        keyword = tokens[current_pos - 1]
+        if not self.functions:
+            # Like an invalid assignment target, this is reported but not raised.
+            self.errors.append(
+                LoxParseError(keyword, "Can't return from top-level code.")
+            )
+        value = None
+        if tokens[current_pos].token_type != TT.SEMICOLON:
+            if self.functions and self.functions[-1] == 'initializer':
+                self.errors.append(
+                    LoxParseError(keyword, "Can't return a value from an initializer.")
+                )
+            value, current_pos = self.parse_expression(tokens, current_pos)
+        _, current_pos = self.consume(
+            tokens,
+            current_pos,
+            TT.SEMICOLON,
+            "Expect ';' after return value.",
+        )
+        return ReturnStmt(value, keyword.offset), current_pos
+
     def parse_expr_stmt(
         self,
         tokens: list[Token],
@@ -222,7 +333,7 @@ class Parser:
         kind: str,
         tokens: list[Token],
         current_pos: int,
-    ) -> tuple[Stmt, int]:
+    ) -> tuple[FunctionStmt, int]:
         name, current_pos = self.consume(
             tokens,
             current_pos,
@@ -235,7 +346,7 @@ class Parser:
             TT.LEFT_PAREN,
             f"Expect '(' after {kind} name.",
         )
-        params: list[Token] = []
+        params: list[int] = []
         if tokens[current_pos].token_type != TT.RIGHT_PAREN:
             token, current_pos = self.consume(
                 tokens,
@@ -243,7 +354,7 @@ class Parser:
                 TT.IDENTIFIER,
                 "Expect parameter name.",
             )
-            params.append(token)
+            params.append(cast_symbol(token))
             while tokens[current_pos].token_type == TT.COMMA:
                 current_pos += 1
                 token, current_pos = self.consume(
@@ -252,7 +363,7 @@ class Parser:
                     TT.IDENTIFIER,
                     "Expect parameter name.",
                 )
-                params.append(token)
+                params.append(cast_symbol(token))
         _, current_pos = self.consume(
             tokens,
             current_pos,
@@ -265,8 +376,14 @@ class Parser:
             TT.LEFT_BRACE,
             "Expect '{' before " + kind + " body.",
         )
-        body, current_pos = self.parse_block(tokens, current_pos)
-        return FunctionStmt(name, params, body), current_pos
+        self.functions.append(
+            'initializer' if kind == 'method' and name.symbol == INIT else kind
+        )
+        try:
+            body, current_pos = self.parse_block(tokens, current_pos)
+        finally:
+            self.functions.pop()
+        return FunctionStmt(cast_symbol(name), params, body, name.offset), current_pos
 
     def parse_block(
         self,
@@ -320,8 +437,10 @@ class Parser:
             current_pos += 1
             value, current_pos = self.parse_assignment(tokens, current_pos)
             # Only certain things are valid l-values.
-            if isinstance(expr, Variable):
-                return Assignment(expr.token, value), current_pos
+            if isinstance(expr, Variable) and expr.symbol != THIS:
+                return Assignment(expr.symbol, value, expr.offset), current_pos
+            elif isinstance(expr, Get):
+                return Set(expr.target, expr.name, value, expr.offset), current_pos
             else:
                 # Note that we don't *raise* errors in parsing, halting immediately;
                 # instead we finish parsing everything and display all the errors we
@@ -344,7 +463,7 @@ class Parser:
             operator = tokens[current_pos]
             current_pos += 1
             right, current_pos = self.parse_and(tokens, current_pos)
-            expr = Logical(expr, operator, right)
+            expr = Logical(expr, operator.token_type, right)
         return expr, current_pos
 
     def parse_and(
@@ -357,7 +476,7 @@ class Parser:
             operator = tokens[current_pos]
             current_pos += 1
             right, current_pos = self.parse_equality(tokens, current_pos)
-            expr = Logical(expr, operator, right)
+            expr = Logical(expr, operator.token_type, right)
         return expr, current_pos
 
     def parse_equality(
@@ -370,7 +489,7 @@ class Parser:
             operator = tokens[current_pos]
             current_pos += 1
             right, current_pos = self.parse_comparison(tokens, current_pos)
-            expr = Binary(expr, operator, right)
+            expr = Binary(expr, operator.token_type, right, operator.offset)
         return expr, current_pos
 
     def parse_comparison(
@@ -384,7 +503,7 @@ class Parser:
             operator = tokens[current_pos]
             current_pos += 1
             right, current_pos = self.parse_term(tokens, current_pos)
-            expr = Binary(expr, operator, right)
+            expr = Binary(expr, operator.token_type, right, operator.offset)
         return expr, current_pos
 
     def parse_term(
@@ -397,7 +516,7 @@ class Parser:
             operator = tokens[current_pos]
             current_pos += 1
             right, current_pos = self.parse_factor(tokens, current_pos)
-            expr = Binary(expr, operator, right)
+            expr = Binary(expr, operator.token_type, right, operator.offset)
         return expr, current_pos
 
     def parse_factor(
@@ -410,7 +529,7 @@ class Parser:
             operator = tokens[current_pos]
             current_pos += 1
             right, current_pos = self.parse_unary(tokens, current_pos)
-            expr = Binary(expr, operator, right)
+            expr = Binary(expr, operator.token_type, right, operator.offset)
         return expr, current_pos
 
     def parse_unary(
@@ -422,7 +541,7 @@ class Parser:
             operator = tokens[current_pos]
             current_pos += 1
             right, current_pos = self.parse_unary(tokens, current_pos)
-            return Unary(operator, right), current_pos
+            return Unary(operator.token_type, right, operator.offset), current_pos
         else:
             return self.parse_call(tokens, current_pos)
 
@@ -436,6 +555,15 @@ class Parser:
             if tokens[current_pos].token_type == TT.LEFT_PAREN:
                 current_pos += 1
                 expr, current_pos = self.finish_parsing_call(expr, tokens, current_pos)
+            elif tokens[current_pos].token_type == TT.DOT:
+                current_pos += 1
+                name, current_pos = self.consume(
+                    tokens,
+                    current_pos,
+                    TT.IDENTIFIER,
+                    "Expect property name after '.'.",
+                )
+                expr = Get(expr, cast_symbol(name), name.offset)
             else:
                 break
         return expr, current_pos
@@ -464,7 +592,7 @@ class Parser:
             TT.RIGHT_PAREN,
             "Expect ')' after arguments."
         )
-        expr = Call(callee, paren, args)
+        expr = Call(callee, args, paren.offset)
         return expr, current_pos
 
     def parse_primary(
@@ -480,7 +608,33 @@ class Parser:
         elif token.token_type == TT.NIL:
             return (Literal(None), current_pos + 1)
         elif token.token_type == TT.IDENTIFIER:
-            return (Variable(tokens[current_pos]), current_pos + 1)
+            return (Variable(cast_symbol(token), token.offset), current_pos + 1)
+        elif token.token_type == TT.THIS:
+            if not self.classes:
+                self.errors.append(
+                    LoxParseError(token, "Can't use 'this' outside of a class.")
+                )
+            # 'this' is looked up like any other variable; methods capture it.
+            return (Variable(THIS, token.offset), current_pos + 1)
+        elif token.token_type == TT.SUPER:
+            if not self.classes:
+                self.errors.append(
+                    LoxParseError(token, "Can't use 'super' outside of a class.")
+                )
+            elif not self.classes[-1]:
+                self.errors.append(LoxParseError(
+                    token, "Can't use 'super' in a class with no superclass."
+                ))
+            _, current_pos = self.consume(
+                tokens, current_pos + 1, TT.DOT, "Expect '.' after 'super'."
+            )
+            method, current_pos = self.consume(
+                tokens,
+                current_pos,
+                TT.IDENTIFIER,
+                "Expect superclass method name.",
+            )
+            return Super(cast_symbol(method), token.offset), current_pos
         elif token.token_type in (TT.NUMBER, TT.STRING):
             return (Literal(token.literal), current_pos + 1)
         elif token.token_type == TT.LEFT_PAREN:
@@ -529,3 +683,9 @@ class Parser:
                 return current_pos
             current_pos += 1
         return current_pos
+
+
+def cast_symbol(token: Token) -> int:
+    'The symbol ID of an identifier token.'
+    assert token.symbol is not None
+    return token.symbol
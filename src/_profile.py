@@ -0,0 +1,175 @@
+'''
+Profiles of what a script did on earlier runs, for the JIT to start from.
+
+A TracingInterpreter learns which operand types each operator sees, which loops are hot
+and which functions are called often, but only after warming up. A Profile saves that
+knowledge to a file, keyed on a hash of the script's source and the offsets of its
+nodes, so that a later run of the same script can seed the interpreter with it: its
+operators start out specialized, and its hot loops are compiled on first entry.
+'''
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Sequence
+
+from ._expr import Binary, Unary
+from ._jit import HOT_CALLS, HOT_ITERATIONS, LoopTrace, TracingInterpreter
+from ._stmt import FunctionStmt, Stmt, WhileStmt, walk
+from ._strings import Rope
+
+# Bumped whenever the file format changes; profiles in other formats are ignored.
+PROFILE_VERSION = 1
+
+# How operand types are written to profiles. Types not listed here are written as
+# 'other', which is enough to stop an operator being specialized.
+TYPE_NAMES = {
+    int: 'int',
+    float: 'float',
+    str: 'str',
+    Rope: 'rope',
+    bool: 'bool',
+    type(None): 'nil',
+}
+NAMED_TYPES = {name: type_ for type_, name in TYPE_NAMES.items()}
+
+
+@dataclass
+class SourceProfile:
+    'What was seen across runs of one source, keyed on node offsets.'
+    # The operand type names each operator has seen.
+    types: dict[int, set[tuple[str, ...]]] = field(default_factory=dict)
+    # How many iterations each loop ran in the tree-walker.
+    loops: dict[int, int] = field(default_factory=dict)
+    # How many times each function was called.
+    calls: dict[int, int] = field(default_factory=dict)
+
+
+class Profile:
+
+    def __init__(self, sources: dict[str, SourceProfile] | None = None):
+        # Keyed on source_key(source).
+        self.sources = sources if sources is not None else {}
+
+    @classmethod
+    def load(cls, path: str) -> Profile:
+        '''
+        Read a profile, or start an empty one if there is none, or it's out of date, or
+        it's not one, like a file cut short by a full disk.
+        '''
+        try:
+            with open(path, 'rt') as f:
+                data = json.load(f)
+            if data.get('version') != PROFILE_VERSION:
+                return cls()
+            sources = {
+                key: SourceProfile(
+                    types={
+                        int(offset): {tuple(types) for types in seen}
+                        for offset, seen in source['types'].items()
+                    },
+                    loops={int(offset): n for offset, n in source['loops'].items()},
+                    calls={int(offset): n for offset, n in source['calls'].items()},
+                )
+                for key, source in data['sources'].items()
+            }
+        except (FileNotFoundError, ValueError, TypeError, KeyError, AttributeError):
+            # A profile is only ever a head start, so carry on without one.
+            return cls()
+        return cls(sources)
+
+    def save(self, path: str) -> None:
+        data = {
+            'version': PROFILE_VERSION,
+            'sources': {
+                key: {
+                    'types': {
+                        offset: sorted(seen) for offset, seen in source.types.items()
+                    },
+                    'loops': source.loops,
+                    'calls': source.calls,
+                }
+                for key, source in self.sources.items()
+            },
+        }
+        # Write to the side and rename, so an interrupted run can't leave half a file.
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'wt') as f:
+            json.dump(data, f)
+        os.replace(temp_path, path)
+
+    def record(
+        self,
+        source: str,
+        statements: Sequence[Stmt],
+        interpreter: TracingInterpreter,
+    ) -> None:
+        'Add what the interpreter saw while running the statements to the profile.'
+        profile = self.sources.setdefault(source_key(source), SourceProfile())
+        for node in nodes(statements):
+            match node:
+                case Binary() | Unary():
+                    seen = interpreter.feedback.get(id(node))
+                    if seen:
+                        names = {
+                            tuple(TYPE_NAMES.get(type_, 'other') for type_ in types)
+                            for types in seen
+                        }
+                        profile.types.setdefault(node.offset, set()).update(names)
+                case WhileStmt(offset=int(offset)):
+                    trace = interpreter.traces.get(id(node))
+                    if trace is not None and trace.stmt is node:
+                        profile.loops[offset] = (
+                            profile.loops.get(offset, 0) + trace.iterations
+                        )
+                case FunctionStmt(offset=offset):
+                    calls = interpreter.calls.get(id(node), 0)
+                    if calls:
+                        profile.calls[offset] = profile.calls.get(offset, 0) + calls
+
+    def apply(
+        self,
+        source: str,
+        statements: Sequence[Stmt],
+        interpreter: TracingInterpreter,
+    ) -> None:
+        '''
+        Seed the interpreter with what the profile knows about the statements.
+
+        Operators get the types they saw before. Loops that were hot, and loops in
+        functions that were called often, are compiled as soon as they're reached.
+        '''
+        profile = self.sources.get(source_key(source))
+        if profile is None:
+            return
+        for node in nodes(statements):
+            match node:
+                case Binary() | Unary() if node.offset in profile.types:
+                    interpreter.feedback[id(node)] = {
+                        tuple(NAMED_TYPES.get(name, object) for name in names)
+                        for names in profile.types[node.offset]
+                    }
+                case WhileStmt(offset=int(offset)):
+                    if profile.loops.get(offset, 0) >= HOT_ITERATIONS:
+                        eager(interpreter, node)
+                case FunctionStmt(offset=offset):
+                    if profile.calls.get(offset, 0) >= HOT_CALLS:
+                        for inner in nodes(node.body):
+                            if isinstance(inner, WhileStmt):
+                                eager(interpreter, inner)
+
+
+def source_key(source: str) -> str:
+    return hashlib.blake2b(source.encode(), digest_size=16).hexdigest()
+
+
+def nodes(statements: Sequence[Stmt]):
+    for stmt in statements:
+        yield from walk(stmt)
+
+
+def eager(interpreter: TracingInterpreter, stmt: WhileStmt) -> None:
+    interpreter.traces[id(stmt)] = LoopTrace(stmt, eager=True)
@@ -0,0 +1,162 @@
+'The embedding API: compile a script once, then run it many times.'
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Mapping, Sequence, TextIO
+
+from ._batch import evaluate_batch
+from ._budget import Budget
+from ._errors import LoxCompileError, LoxParseError, LoxRuntimeError
+from ._expr import Expr
+from ._interpret import Interpreter
+from ._lines import LineTable
+from ._parallel_parse import parse_parallel
+from ._parse import Parser
+from ._scan import scan
+from ._snapshot import Snapshot
+from ._stmt import Stmt
+from ._symbols import symbols
+from ._token import TokenType
+
+# How many compiled programs to keep around, keyed by a hash of their source and whether
+# they were parsed in parallel, which parses them differently.
+CACHE_SIZE = 256
+
+_cache: OrderedDict[tuple[bytes, bool], 'Program'] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Program:
+    '''
+    A compiled script.
+
+    A program can be run any number of times, including from several threads at once.
+    Each run gets an interpreter of its own. The only thing runs leave on the shared
+    statements is the property accesses' inline caches, which record field layouts that
+    are the same on every run, and hold nothing from any one run.
+    '''
+    statements: tuple[Stmt, ...]
+    # For turning the offsets in errors into lines and columns.
+    lines: LineTable
+
+    def run(
+        self,
+        globals: Mapping[str, object] | None = None,
+        output: TextIO | None = None,
+        budget: Budget | None = None,
+        snapshot: Snapshot | None = None,
+    ) -> Interpreter:
+        '''
+        Run the program in a fresh interpreter and return the interpreter.
+
+        The interpreter starts out with the globals of `snapshot`, if one is given, so a
+        prelude captured with Snapshot.capture needn't be run again. Errors in its
+        functions are located in the prelude's source. `globals` are
+        defined as global variables before the program runs. Values are used as-is, so
+        they should already be Lox values: None, bools, numbers, strings or callables.
+        Raises LoxRuntimeError if the program fails.
+        '''
+        if snapshot is None:
+            interpreter = Interpreter(budget, output)
+        else:
+            interpreter = snapshot.instantiate(budget, output)
+        if globals:
+            for name, value in globals.items():
+                interpreter.globals.define(symbols.intern(name), value)
+        runtime_error = interpreter.interpret(self.statements)
+        if runtime_error is not None:
+            if snapshot is None or not snapshot.locate(runtime_error):
+                runtime_error.locate(self.lines)
+            raise runtime_error
+        return interpreter
+
+
+def compile(source: str, parallel: bool = False) -> Program:
+    '''
+    Scan and parse source into a Program, reusing a cached one for the same source.
+
+    With `parallel`, large sources are parsed across a pool of worker processes, which
+    only pays off for scripts of many megabytes. Raises LoxCompileError if the source
+    has scan or parse errors.
+    '''
+    key = (hashlib.blake2b(source.encode(), digest_size=16).digest(), parallel)
+    with _cache_lock:
+        program = _cache.get(key)
+        if program is not None:
+            _cache.move_to_end(key)
+            return program
+
+    lines = LineTable(source)
+    tokens, scan_errors = scan(source)
+    if scan_errors:
+        raise located(LoxCompileError(scan_errors), lines)
+    if parallel:
+        statements, parse_errors = parse_parallel(source, tokens)
+    else:
+        parser = Parser()
+        statements, parse_errors = parser.parse(tokens), parser.errors
+    if parse_errors:
+        raise located(LoxCompileError(parse_errors), lines)
+    program = Program(tuple(statements), lines)
+
+    with _cache_lock:
+        _cache[key] = program
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return program
+
+
+@dataclass(frozen=True)
+class Formula:
+    '''
+    A compiled expression, for evaluating over rows of data.
+
+    Formulas hold no run-time state, so they can be shared the same way.
+    '''
+    expression: Expr
+    lines: LineTable
+
+    def evaluate(self, columns: Mapping[str, Sequence[object]]) -> list[object]:
+        '''
+        Evaluate the formula for every row of columns, and return the results.
+
+        `columns` maps variable names to equal-length lists, arrays or NumPy arrays of
+        Lox values. Raises LoxRuntimeError for the first row that fails.
+        '''
+        try:
+            return evaluate_batch(self.expression, columns)
+        except LoxRuntimeError as exc:
+            exc.locate(self.lines)
+            raise
+
+
+def compile_formula(source: str) -> Formula:
+    '''
+    Scan and parse source, a single expression with no trailing semicolon, into a
+    Formula.
+
+    Raises LoxCompileError if the source has scan or parse errors.
+    '''
+    lines = LineTable(source)
+    tokens, scan_errors = scan(source)
+    if scan_errors:
+        raise located(LoxCompileError(scan_errors), lines)
+    parser = Parser()
+    try:
+        expression, current_pos = parser.parse_expression(tokens, 0)
+        if tokens[current_pos].token_type != TokenType.EOF:
+            raise LoxParseError(tokens[current_pos], 'Expect end of formula.')
+    except LoxParseError as exc:
+        parser.errors.append(exc)
+    if parser.errors:
+        raise located(LoxCompileError(parser.errors), lines)
+    return Formula(expression, lines)
+
+
+def located(exc: LoxCompileError, lines: LineTable) -> LoxCompileError:
+    for error in exc.errors:
+        error.locate(lines)
+    return exc
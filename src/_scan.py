@@ -1,47 +1,84 @@
-from typing import Any
+from typing import Any, Container
 
+from ._errors import LoxSourceError
+from ._numbers import parse_number
+from ._symbols import symbols
 from ._token import Token, TokenType, keyword_map
 
 
-class LoxScanError(Exception):
-    def __init__(self, msg: str, line_num: int | None = None):
+class LoxScanError(LoxSourceError):
+    def __init__(self, msg: str, offset: int | None = None):
         self.msg = msg
-        self.line_num = line_num
+        self.offset = offset
 
     def __str__(self):
-        return f'[line {self.line_num}] Scan Error: {self.msg}'
+        return f'[{self.where()}] Scan Error: {self.msg}'
 
 
-def scan(source: str) -> tuple[list[Token], list[LoxScanError]]:
-    line_num = 1
-    current_pos = 0
+def scan(
+    source: str,
+    integers: bool = True,
+) -> tuple[list[Token], list[LoxScanError]]:
+    '''
+    Scan source into tokens.
+
+    Integral number literals become ints, unless `integers` is False, in which case
+    every number is a float.
+    '''
+    tokens, errors, _ = scan_from(source, 0, integers=integers)
+    eof_token = Token(TokenType.EOF, '', None, len(source))
+    tokens.append(eof_token)
+    return tokens, errors
+
+
+def scan_from(
+    source: str,
+    start_pos: int,
+    stop_positions: Container[int] = (),
+    integers: bool = True,
+) -> tuple[list[Token], list[LoxScanError], int]:
+    '''
+    Scan from partway through the source, without adding an EOF token.
+
+    Scanning stops at the end of the source, or at the first token boundary after
+    start_pos that's in stop_positions.
+
+    Returns
+    -------
+    tokens: list[Token]
+        The tokens found.
+    errors: list[LoxScanError]
+        Any errors found.
+    end_position: int
+        The position at which scanning stopped.
+    '''
+    current_pos = start_pos
     tokens = []
     errors = []
     while current_pos < len(source):
         try:
-            (next_token, next_pos, n_newlines) = _scan_token(source, current_pos)
+            next_token, next_pos = _scan_token(source, current_pos, integers)
         except LoxScanError as exc:
-            # The scan function doesn't know the line number so we have to provide it.
-            exc.line_num = line_num
+            # The scan function doesn't know the position so we have to provide it.
+            exc.offset = current_pos
             errors.append(exc)
-            if source[current_pos] == '\n':
-                line_num += 1
             # Advance to the next token and keep going, to find all errors in one go.
-            current_pos += 1
-            continue
-        if next_token is not None:
-            next_token.line_num = line_num
-            tokens.append(next_token)
-        line_num += n_newlines
+            next_pos = current_pos + 1
+        else:
+            if next_token is not None:
+                tokens.append(next_token)
         # Restart processing starting at the end of the token we found.
         current_pos = next_pos
+        if current_pos in stop_positions:
+            break
+    return tokens, errors, current_pos
 
-    eof_token = Token(TokenType.EOF, '', None, line_num)
-    tokens.append(eof_token)
-    return tokens, errors
 
-
-def _scan_token(source: str, start_pos: int) -> tuple[Token | None, int, int]:
+def _scan_token(
+    source: str,
+    start_pos: int,
+    integers: bool = True,
+) -> tuple[Token | None, int]:
     '''
     Scan the next token.
 
@@ -51,15 +88,12 @@ def _scan_token(source: str, start_pos: int) -> tuple[Token | None, int, int]:
         The next token found.
     next_position: int
         The position from which scanning should resume
-    n_newlines: int
-        The number of newlines found in the process of scanning this token.
     '''
     # We need to track not only where we started, but how far into the string we are.
     current_pos = start_pos
     token_type: TokenType | None = None
     token_value: Any = None
-
-    n_newlines = 0
+    symbol: int | None = None
 
     # Shift to get the next character.
     c = source[current_pos]
@@ -117,15 +151,10 @@ def _scan_token(source: str, start_pos: int) -> tuple[Token | None, int, int]:
             token_type = None
         else:
             token_type = TokenType.SLASH
-    elif c in (' ', '\r', '\t'):
+    elif c in (' ', '\r', '\t', '\n'):
         token_type = None
-    elif c == '\n':
-        # Return early, signaling that we need to increment the line counter.
-        return (None, current_pos, 1)
     elif c == '"':
         while current_pos < len(source) and source[current_pos] != '"':
-            if source[current_pos] == '\n':
-                n_newlines += 1
             current_pos += 1
         if current_pos == len(source):
             raise LoxScanError('Unterminated string.')
@@ -145,7 +174,7 @@ def _scan_token(source: str, start_pos: int) -> tuple[Token | None, int, int]:
                     while current_pos < len(source) and source[current_pos].isdigit():
                         current_pos += 1
             token_type = TokenType.NUMBER
-            token_value = float(source[start_pos:current_pos])
+            token_value = parse_number(source[start_pos:current_pos], integers)
         elif c.isalpha():
             # Identifiers and keywords.
             while (
@@ -155,11 +184,18 @@ def _scan_token(source: str, start_pos: int) -> tuple[Token | None, int, int]:
                 current_pos += 1
             text = source[start_pos:current_pos]
             token_type = keyword_map.get(text, TokenType.IDENTIFIER)
+            if token_type == TokenType.IDENTIFIER:
+                symbol = symbols.intern(text)
         else:
             raise LoxScanError('Unexpected character.')
 
-    if token_type is not None:
-        token = Token(token_type, source[start_pos:current_pos], token_value, None)
+    if symbol is not None:
+        # Every occurrence of a name shares the one interned string.
+        token = Token(
+            TokenType.IDENTIFIER, symbols.name(symbol), None, start_pos, symbol
+        )
+    elif token_type is not None:
+        token = Token(token_type, source[start_pos:current_pos], token_value, start_pos)
     else:
         token = None
-    return (token, current_pos, n_newlines)
+    return (token, current_pos)
@@ -0,0 +1,110 @@
+'''
+A compact serialized form of the AST, for sending statements between processes.
+
+Each node becomes a tuple of a code for its type and its fields in order, with child
+nodes as nested tuples and lists of them as lists, which marshal turns into bytes much
+faster than pickle turns dataclasses. Fields that aren't part of the expression, like
+property caches, are left out and start afresh when the node is rebuilt.
+
+Symbol IDs are only meaningful in the process that interned them, so names are written
+as indexes into a list of the names used, and interned again when the AST is loaded.
+'''
+
+import marshal
+from dataclasses import fields
+from typing import Any, Sequence, cast
+
+from ._expr import (
+    Expr, Assignment, Binary, Call, Get, Grouping, Literal, Logical, Set, Super, Unary,
+    Variable
+)
+from ._stmt import (
+    Stmt, BlockStmt, ClassStmt, ExprStmt, ForRangeStmt, FunctionStmt, IfStmt, PrintStmt,
+    ReturnStmt, VarStmt, WhileStmt
+)
+from ._symbols import symbols
+from ._token import TokenType
+
+# The node types, in the order of their codes. New types go on the end. They're all
+# dataclasses, which mypy can't see through the Expr and Stmt base classes.
+NODE_TYPES: list[type[Any]] = [
+    Assignment, Binary, Call, Get, Grouping, Literal, Logical, Set, Super, Unary,
+    Variable, BlockStmt, ClassStmt, ExprStmt, ForRangeStmt, FunctionStmt, IfStmt,
+    PrintStmt, ReturnStmt, VarStmt, WhileStmt,
+]
+CODES = {node_type: code for code, node_type in enumerate(NODE_TYPES)}
+# The fields that hold a symbol, or a list or tuple of them.
+SYMBOL_FIELDS = {'symbol', 'name', 'method', 'params', 'captured_params', 'captures'}
+# The names of each type's fields that are written, which come before any that aren't,
+# so a node can be rebuilt from them positionally.
+FIELDS = {
+    node_type: [field.name for field in fields(node_type) if field.compare]
+    for node_type in NODE_TYPES
+}
+
+
+def dump_statements(statements: Sequence[Stmt]) -> bytes:
+    'Serialize statements to bytes, for load_statements to rebuild.'
+    encoder = Encoder()
+    encoded = [encoder.node(stmt) for stmt in statements]
+    return marshal.dumps((list(encoder.names), encoded))
+
+
+def load_statements(data: bytes) -> list[Stmt]:
+    'Rebuild the statements dump_statements serialized, in this process.'
+    names, encoded = marshal.loads(data)
+    decoder = Decoder([symbols.intern(name) for name in names])
+    return [cast(Stmt, decoder.node(stmt)) for stmt in encoded]
+
+
+class Encoder:
+
+    def __init__(self):
+        # The index of each symbol written so far, keyed on its name.
+        self.names: dict[str, int] = {}
+
+    def symbol(self, symbol: int) -> int:
+        return self.names.setdefault(symbols.name(symbol), len(self.names))
+
+    def node(self, node: Expr | Stmt) -> tuple:
+        values: list[object] = [CODES[type(node)]]
+        for name in FIELDS[type(node)]:
+            value = getattr(node, name)
+            if name in SYMBOL_FIELDS:
+                if isinstance(value, int):
+                    value = self.symbol(value)
+                else:
+                    value = type(value)(self.symbol(symbol) for symbol in value)
+            elif isinstance(value, (Expr, Stmt)):
+                value = self.node(value)
+            elif isinstance(value, list):
+                value = [self.node(child) for child in value]
+            elif isinstance(value, TokenType):
+                value = value.value
+            values.append(value)
+        return tuple(values)
+
+
+class Decoder:
+
+    def __init__(self, symbols: list[int]):
+        # This process's symbol for each index the encoder gave a name.
+        self.symbols = symbols
+
+    def node(self, encoded: tuple) -> Expr | Stmt:
+        node_type = NODE_TYPES[encoded[0]]
+        args = []
+        for name, value in zip(FIELDS[node_type], encoded[1:]):
+            if name in SYMBOL_FIELDS:
+                if isinstance(value, int):
+                    value = self.symbols[value]
+                else:
+                    value = type(value)(self.symbols[index] for index in value)
+            elif name == 'operator':
+                value = TokenType(value)
+            elif isinstance(value, tuple):
+                value = self.node(value)
+            elif isinstance(value, list):
+                value = [self.node(child) for child in value]
+            args.append(value)
+        return node_type(*args)
@@ -0,0 +1,100 @@
+'''
+Hidden-class shapes for instances, and the inline caches that rely on them.
+
+An instance keeps its fields in a plain list, in the order they were added. Its shape
+maps each field's symbol to its index in that list. Instances of a class that got the
+same fields in the same order share a shape: adding a field moves an instance along a
+transition to the next shape, which is created the first time any instance takes it.
+
+The root shape, of an instance with no fields yet, belongs to the class declaration
+rather than to the class, so every run of a program, and every class a declaration in a
+function body makes, shares the same shapes. Shapes say nothing about classes and hold
+no references to them, so an instance keeps its class separately.
+
+Every property access in the AST carries an inline cache of the shapes it has seen and
+what it found for each, so an access to an instance whose shape was seen before skips
+the lookup. A shape determines the instance's fields, which is all an entry records,
+so entries stay valid forever, and stay warm from one run of a program to the next. A
+site that sees more than MAX_SHAPES shapes is megamorphic, and gives up on caching.
+
+Caches live on AST nodes, which programs run on several threads share. Each entry is
+stored as one tuple, entries are only ever added, and they're always checked against
+the shape, so a race costs at worst a duplicate.
+'''
+
+from __future__ import annotations
+
+# How many shapes a property access caches before it's treated as megamorphic.
+MAX_SHAPES = 4
+
+
+class Shape:
+
+    __slots__ = ('slots', 'transitions')
+
+    def __init__(self, slots: dict[int, int] | None = None):
+        # Field symbol -> index into an instance's field list.
+        self.slots = slots if slots is not None else {}
+        # Field symbol -> the shape an instance moves to when it adds that field.
+        self.transitions: dict[int, Shape] = {}
+
+    def add(self, symbol: int) -> Shape:
+        shape = self.transitions.get(symbol)
+        if shape is None:
+            shape = self.transitions.setdefault(
+                symbol, Shape({**self.slots, symbol: len(self.slots)})
+            )
+        return shape
+
+
+# A cache entry: a shape, the field's slot, and for a set, the shape an instance moves
+# to by adding the field.
+Entry = tuple[Shape, int | None, Shape | None]
+
+
+class PropertyCache:
+    '''
+    What a property access found for each shape it has seen.
+
+    For a get, that's the field's slot, or None if instances of the shape don't have the
+    field, in which case it's a method. For a set, it's the field's slot, and the shape
+    the instance moves to by adding the field, or None if the field is already there.
+
+    The first entry is kept in an attribute of its own, so the common monomorphic case
+    is one identity check.
+    '''
+
+    __slots__ = ('first', 'others', 'megamorphic')
+
+    def __init__(self):
+        self.first: Entry | None = None
+        # Entries for any further shapes.
+        self.others: list[Entry] = []
+        self.megamorphic = False
+
+    @property
+    def state(self) -> str:
+        if self.megamorphic:
+            return 'megamorphic'
+        if self.first is None:
+            return 'uninitialized'
+        return 'polymorphic' if self.others else 'monomorphic'
+
+    def lookup(self, shape: Shape) -> Entry | None:
+        'The entry for a shape other than the first, if there is one.'
+        for entry in self.others:
+            if entry[0] is shape:
+                return entry
+        return None
+
+    def remember(self, entry: Entry) -> None:
+        if self.megamorphic:
+            return
+        if self.first is None:
+            self.first = entry
+        elif len(self.others) + 1 < MAX_SHAPES:
+            self.others.append(entry)
+        else:
+            self.megamorphic = True
+            self.first = None
+            self.others = []
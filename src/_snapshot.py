@@ -0,0 +1,202 @@
+'''
+Snapshots of an interpreter's globals, for starting new interpreters warm.
+
+A script that runs a long prelude of `fun` and `var` declarations before doing anything
+else can run the prelude once, capture the globals it leaves behind, and start every
+later interpreter from the snapshot rather than scanning, parsing and running the
+prelude again.
+
+Snapshots hold functions and plain values: nil, bools, numbers and strings. None of
+those can change once made, so every interpreter started from a snapshot shares them,
+and gets a globals dict of its own to assign to. Functions with anything in their
+closure, classes, instances and natives can't be captured, other than the builtins
+themselves, which every interpreter defines afresh.
+
+The functions run alongside programs compiled from other sources, so errors in them
+have to be told apart from errors in the program. A snapshot keeps copies of the
+functions' declarations whose offsets are stored bitwise inverted, which makes them
+negative, and keeps the prelude's LineTable to locate errors at those offsets with.
+Calls in the copies aren't inlined.
+
+Snapshots can also be written out as bytes, with the functions' declarations in the
+compact form from _serialize, and loaded again in another process.
+'''
+
+from __future__ import annotations
+
+import marshal
+import os
+from typing import TextIO
+
+from ._budget import Budget
+from ._errors import LoxRuntimeError
+from ._interpret import Interpreter
+from ._lines import LineTable
+from ._lox_callable import ClockCallable, LoxFunction
+from ._parallel import ParallelMapCallable
+from ._serialize import Decoder, Encoder
+from ._stmt import FunctionStmt, walk
+from ._strings import Rope
+from ._symbols import symbols
+
+# Bumped whenever the format of a serialized snapshot changes.
+SNAPSHOT_VERSION = 1
+
+# The values a snapshot holds as they are.
+PLAIN = (type(None), bool, int, float, str)
+# The natives every interpreter defines for itself, keyed on their symbols.
+BUILTINS = {
+    symbols.intern('clock'): ClockCallable,
+    symbols.intern('parallelMap'): ParallelMapCallable,
+}
+
+
+class Snapshot:
+
+    def __init__(self, values: dict[int, object], lines: LineTable | None = None):
+        # The global functions and plain values, keyed on their symbols. The functions'
+        # declarations have inverted offsets.
+        self.values = values
+        # For locating errors in the functions, if the prelude's source is known.
+        self.lines = lines
+
+    @classmethod
+    def capture(
+        cls,
+        interpreter: Interpreter,
+        lines: LineTable | None = None,
+    ) -> Snapshot:
+        '''
+        Snapshot an interpreter's globals.
+
+        `lines` is the LineTable of the source the functions were compiled from, like a
+        Program's, for locating errors in them. Without it, those errors are left
+        unlocated. Raises ValueError if a global holds something a snapshot can't.
+        '''
+        # Functions that share a declaration, like a function and an alias of it, share
+        # a copy.
+        copies: dict[int, LoxFunction] = {}
+        values: dict[int, object] = {}
+        for symbol, value in interpreter.globals.values.items():
+            if type(value) is BUILTINS.get(symbol):
+                continue
+            if isinstance(value, Rope):
+                value = str(value)
+            elif isinstance(value, LoxFunction):
+                if value.closure or value.initializer:
+                    raise ValueError(
+                        f"Can't snapshot {symbols.name(symbol)}, which is a closure."
+                    )
+                declaration = value.declaration
+                if id(declaration) not in copies:
+                    copies[id(declaration)] = LoxFunction(inverted_copy(declaration))
+                value = copies[id(declaration)]
+            elif not isinstance(value, PLAIN):
+                raise ValueError(f"Can't snapshot {symbols.name(symbol)}: {value}.")
+            values[symbol] = value
+        return cls(values, lines)
+
+    def instantiate(
+        self,
+        budget: Budget | None = None,
+        output: TextIO | None = None,
+    ) -> Interpreter:
+        '''
+        Make a new interpreter whose globals start out as the snapshot's.
+
+        Errors raised in the snapshot's functions have negative offsets, for locate().
+        '''
+        interpreter = Interpreter(budget, output)
+        interpreter.globals.values.update(self.values)
+        return interpreter
+
+    def locate(self, error: LoxRuntimeError) -> bool:
+        '''
+        Locate an error raised in the snapshot's functions, and say whether it was one.
+
+        The error's offset is turned back into one into the prelude's source.
+        '''
+        if error.offset is None or error.offset >= 0:
+            return False
+        error.offset = ~error.offset
+        if self.lines is not None:
+            error.locate(self.lines)
+        return True
+
+    def to_bytes(self) -> bytes:
+        encoder = Encoder()
+        # Functions that share a declaration are written once.
+        declarations: dict[int, int] = {}
+        encoded_declarations: list[tuple] = []
+        # Each global is its symbol's index, whether it's a function, and either the
+        # index of the function's declaration or the value.
+        entries: list[tuple[int, bool, object]] = []
+        for symbol, value in self.values.items():
+            index = encoder.symbol(symbol)
+            if isinstance(value, LoxFunction):
+                declaration = value.declaration
+                if id(declaration) not in declarations:
+                    declarations[id(declaration)] = len(encoded_declarations)
+                    encoded_declarations.append(encoder.node(declaration))
+                entries.append((index, True, declarations[id(declaration)]))
+            else:
+                entries.append((index, False, value))
+        newlines = None if self.lines is None else self.lines.newlines
+        return marshal.dumps((
+            SNAPSHOT_VERSION, list(encoder.names), encoded_declarations, entries,
+            newlines,
+        ))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Snapshot:
+        'Load a snapshot to_bytes wrote. Raises ValueError if it\'s not one.'
+        try:
+            version, names, encoded_declarations, entries, newlines = (
+                marshal.loads(data)
+            )
+            if version == SNAPSHOT_VERSION:
+                decoder = Decoder([symbols.intern(name) for name in names])
+                declared = [
+                    LoxFunction(cast_function(decoder.node(declaration)))
+                    for declaration in encoded_declarations
+                ]
+                values = {
+                    decoder.symbols[index]: declared[value] if function else value
+                    for index, function, value in entries
+                }
+                lines = None if newlines is None else LineTable.from_newlines(newlines)
+        except (EOFError, TypeError, ValueError, IndexError, KeyError):
+            raise ValueError('Not a snapshot.') from None
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f'Snapshot version {version} is not {SNAPSHOT_VERSION}.')
+        return cls(values, lines)
+
+    def save(self, path: str) -> None:
+        # Write to the side and rename, so an interrupted run can't leave half a file.
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(self.to_bytes())
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Snapshot:
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+def inverted_copy(declaration: FunctionStmt) -> FunctionStmt:
+    'A copy of a function declaration, with its offsets inverted.'
+    encoder = Encoder()
+    encoded = encoder.node(declaration)
+    copy = Decoder([symbols.intern(name) for name in encoder.names]).node(encoded)
+    for node in walk(copy):
+        offset = getattr(node, 'offset', None)
+        if offset is not None:
+            setattr(node, 'offset', ~offset)
+    return cast_function(copy)
+
+
+def cast_function(node: object) -> FunctionStmt:
+    if not isinstance(node, FunctionStmt):
+        raise ValueError('Not a snapshot.')
+    return node
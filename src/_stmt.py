@@ -1,27 +1,92 @@
-'Statement classes for the AST.'
+'''
+Statement classes for the AST.
 
-from abc import ABC
-from dataclasses import dataclass
-from typing import Optional
+Statements print as nested lists, like expressions do, with the statements inside them
+on lines of their own.
+'''
 
-from ._token import Token
-from ._expr import Expr
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field, fields
+from typing import Iterable, Iterator, Optional
+
+from ._expr import Expr, Variable
+from ._shapes import Shape
+from ._symbols import symbols
 
 
 class Stmt(ABC):
-    ...
+
+    @abstractmethod
+    def __str__(self):
+        ...
+
+
+@dataclass
+class ClassStmt(Stmt):
+    symbol: int
+    superclass: Variable | None
+    methods: list['FunctionStmt']
+    # The offset of the class's name.
+    offset: int
+    # Whether the class's name is captured by a function, so it's kept in a cell.
+    captured: bool = False
+    # The shape of a new instance of the class, shared by every class this declaration
+    # makes. It isn't part of the statement.
+    root: Shape = field(default_factory=Shape, compare=False, repr=False)
+
+    def __str__(self):
+        head = f'(class {symbols.name(self.symbol)}'
+        if self.superclass is not None:
+            head += f' < {self.superclass}'
+        return nested(head, self.methods)
 
 
 @dataclass
 class ExprStmt(Stmt):
     expression: Expr
 
+    def __str__(self):
+        return f'(expr {self.expression})'
+
+
+@dataclass
+class ForRangeStmt(Stmt):
+    '''
+    A counted loop, recognized by the optimizer in place of a WhileStmt.
+
+    The loop is `while (i < bound) { ...; i = i + step; }`, or the same counting down
+    with `>` or `>=`, where i is the variable `symbol`, which nothing else in the loop
+    assigns, and the bound doesn't change while it runs. The loop is kept as it was, to
+    run as written when i or the bound turn out not to make a range.
+    '''
+    symbol: int
+    step: int
+    loop: 'WhileStmt'
+
+    def __str__(self):
+        head = f'(for-range {symbols.name(self.symbol)} {self.step}'
+        return nested(head, [self.loop])
+
 
 @dataclass
 class FunctionStmt(Stmt):
-    name: Token
-    params: list[Token]
+    symbol: int
+    params: list[int]
     body: list[Stmt]
+    # The offset of the function's name.
+    offset: int
+    # The rest is filled in by capture analysis. Whether the function's own name is
+    # captured by an inner function, and so kept in a cell.
+    captured: bool = False
+    # The parameters captured by inner functions.
+    captured_params: tuple[int, ...] = ()
+    # The variables of enclosing functions and blocks this function uses, which are
+    # copied into its closure when it's declared.
+    captures: tuple[int, ...] = ()
+
+    def __str__(self):
+        params = ' '.join(symbols.name(param) for param in self.params)
+        return nested(f'(fun {symbols.name(self.symbol)} ({params})', self.body)
 
 
 @dataclass
@@ -30,24 +95,78 @@ class IfStmt(Stmt):
     then_branch: Stmt
     else_branch: Stmt | None = None
 
+    def __str__(self):
+        branches = [self.then_branch]
+        if self.else_branch is not None:
+            branches.append(self.else_branch)
+        return nested(f'(if {self.condition}', branches)
+
 
 @dataclass
 class PrintStmt(Stmt):
     expression: Expr
 
+    def __str__(self):
+        return f'(print {self.expression})'
+
 
 @dataclass
 class BlockStmt(Stmt):
     statements: list[Stmt]
+    # The offset of the opening brace, or of the 'for' a block was desugared from.
+    offset: int | None = None
+
+    def __str__(self):
+        return nested('(block', self.statements)
+
+
+@dataclass
+class ReturnStmt(Stmt):
+    value: Expr | None
+    # The offset of the 'return' keyword.
+    offset: int
+
+    def __str__(self):
+        return '(return)' if self.value is None else f'(return {self.value})'
 
 
 @dataclass
 class VarStmt(Stmt):
-    token: Token
+    symbol: int
     initializer: Optional[Expr]
+    # Whether an inner function captures the variable, so it's kept in a cell.
+    captured: bool = False
+
+    def __str__(self):
+        if self.initializer is None:
+            return f'(var {symbols.name(self.symbol)})'
+        return f'(var {symbols.name(self.symbol)} {self.initializer})'
 
 
 @dataclass
 class WhileStmt(Stmt):
     condition: Expr
     body: Stmt
+    # The offset of the 'while' or 'for' keyword, to report where a budget ran out.
+    offset: int | None = None
+
+    def __str__(self):
+        return nested(f'(while {self.condition}', [self.body])
+
+
+def nested(head: str, statements: Iterable[Stmt]) -> str:
+    'Show a statement that has others inside it, on indented lines of their own.'
+    lines = [head]
+    for stmt in statements:
+        lines.extend('  ' + line for line in str(stmt).splitlines())
+    return '\n'.join(lines) + ')'
+
+
+def walk(node: Expr | Stmt) -> Iterator[Expr | Stmt]:
+    'Yield a node and every node under it.'
+    yield node
+    for node_field in fields(node):  # type: ignore[arg-type]
+        value = getattr(node, node_field.name)
+        for child in value if isinstance(value, list) else [value]:
+            if isinstance(child, (Expr, Stmt)):
+                yield from walk(child)
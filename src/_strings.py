@@ -0,0 +1,88 @@
+'''
+Ropes: Lox strings built up by concatenation.
+
+Python strings are immutable, so `s = s + t` in a loop copies everything built so far on
+every iteration, which is quadratic in time and allocation. Once a concatenation's
+result is at least ROPE_THRESHOLD characters long, it's a Rope instead: a list of the
+parts, joined only when the string is printed, compared or hashed.
+
+Appending to a rope adds to its parts list in place, and returns a new rope that sees
+one more part than the old one. The old rope still sees only its own parts, so strings
+stay immutable as far as Lox can tell. If the list has already been extended by an
+append to the same rope, the new rope copies its parts first, like a slice would.
+
+Ropes are only ever made by concatenation, and Lox code can't tell a rope from a str.
+'''
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from ._budget import STRING_COST
+
+if TYPE_CHECKING:
+    from ._interpret import Interpreter
+
+# Concatenations shorter than this make plain strings, which are cheap to copy.
+ROPE_THRESHOLD = 128
+
+
+class Rope:
+
+    __slots__ = ('parts', 'count', 'length', 'flat')
+
+    def __init__(self, parts: list[str], count: int, length: int):
+        # Only the first `count` parts are this rope's; later ones belong to ropes made
+        # by appending to it.
+        self.parts = parts
+        self.count = count
+        self.length = length
+        # The joined string, once something has needed it.
+        self.flat: str | None = None
+
+    def append(self, text: str) -> Rope:
+        if self.count == len(self.parts):
+            parts = self.parts
+        else:
+            parts = self.parts[:self.count]
+        parts.append(text)
+        return Rope(parts, self.count + 1, self.length + len(text))
+
+    def __str__(self) -> str:
+        if self.flat is None:
+            parts = self.parts
+            if self.count < len(parts):
+                parts = parts[:self.count]
+            self.flat = ''.join(parts)
+            # Later appends start from the joined string, so this rope lets go of a list
+            # that may be long.
+            self.parts = [self.flat]
+            self.count = 1
+        return self.flat
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (str, Rope)):
+            return str(self) == str(other)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    def __repr__(self) -> str:
+        return f'Rope({str(self)!r})'
+
+
+def concat(interpreter: Interpreter, left: str | Rope, right: str | Rope) -> str | Rope:
+    'Concatenate two Lox strings, charging the interpreter for what it allocates.'
+    text = str(right) if isinstance(right, Rope) else right
+    if isinstance(left, Rope):
+        interpreter.alloc_bytes += STRING_COST + len(text)
+        return left.append(text)
+    length = len(left) + len(text)
+    interpreter.alloc_bytes += STRING_COST + length
+    if length < ROPE_THRESHOLD:
+        return left + text
+    return Rope([left, text], 2, length)
@@ -0,0 +1,58 @@
+'''
+Interned identifier names.
+
+Each distinct identifier gets one shared string and a small integer ID when it's first
+scanned. Environments are keyed on the IDs, and every occurrence of a name in a file
+shares one string rather than holding its own slice of the source.
+'''
+
+import threading
+
+
+class SymbolTable:
+
+    def __init__(self):
+        self.ids: dict[str, int] = {}
+        self.names: list[str] = []
+        # Lookups are lock-free; only adding a new name needs the lock, so that
+        # interpreters on different threads can scan at the same time.
+        self.lock = threading.Lock()
+
+    def intern(self, name: str) -> int:
+        symbol = self.ids.get(name)
+        if symbol is None:
+            with self.lock:
+                symbol = self.ids.get(name)
+                if symbol is None:
+                    symbol = len(self.names)
+                    self.names.append(name)
+                    self.ids[name] = symbol
+        return symbol
+
+    def name(self, symbol: int) -> str:
+        return self.names[symbol]
+
+    def extend(self, names: list[str]) -> None:
+        '''
+        Catch up with another process's table, which this one must be a prefix of.
+
+        Symbol IDs in an AST are only meaningful alongside the table that made them, so
+        a process that's sent an AST has to have the sender's table too.
+        '''
+        with self.lock:
+            assert self.names == names[:len(self.names)], 'Symbol tables have diverged.'
+            for name in names[len(self.names):]:
+                self.ids[name] = len(self.names)
+                self.names.append(name)
+
+
+# IDs have to agree between the scanner and every interpreter, so there's one table per
+# process. It only ever grows, by one entry per distinct name.
+symbols = SymbolTable()
+
+# Names the interpreter itself looks up. They're interned before any source is scanned,
+# so they have the same IDs in every process. 'this' and 'super' are keywords, so no
+# user variable can clash with them.
+THIS = symbols.intern('this')
+SUPER = symbols.intern('super')
+INIT = symbols.intern('init')
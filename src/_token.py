@@ -20,7 +20,10 @@ class Token:
     token_type: TokenType
     lexeme: str
     literal: Optional[str]
-    line_num: Optional[int]
+    # Where the token starts in the source. Lines and columns come from a LineTable.
+    offset: int
+    # The interned ID of an identifier's name.
+    symbol: Optional[int] = None
 
     def __str__(self) -> str:
         return f'{self.token_type} {self.lexeme} {self.literal}'
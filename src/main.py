@@ -1,34 +1,226 @@
+import argparse
+import json
+import os
 import sys
+import time
+from typing import Sequence
 
-from ._scan import scan
-from ._parse import Parser
+from ._budget import Budget
+from ._incremental import IncrementalFrontEnd, diff
 from ._interpret import Interpreter
-from ._errors import LoxError
+from ._jit import TracingInterpreter
+from ._errors import LoxError, LoxBudgetError, LoxCompileError
+from ._lines import LineTable
+from ._memprofile import MemoryProfiler
+from ._profile import Profile
+from ._program import compile
+from ._stmt import Stmt
 
 
-def main(args: list[str]):
-    if len(args) > 2:
-        print("Usage: pylox [script]")
+class ArgumentParser(argparse.ArgumentParser):
+
+    def error(self, message: str):
+        # Usage errors get the same exit code as always, rather than argparse's 2.
+        self.print_usage()
+        print(message)
         sys.exit(64)
-    elif len(args) == 2:
-        run_file(args[1])
+
+
+def main(args: list[str]):
+    arg_parser = ArgumentParser(prog='pylox')
+    arg_parser.add_argument('script', nargs='?')
+    arg_parser.add_argument(
+        '--watch', action='store_true', help='Re-run the script whenever it changes.'
+    )
+    arg_parser.add_argument(
+        '--jit', action='store_true', help='Compile hot loops to Python functions.'
+    )
+    arg_parser.add_argument(
+        '--jit-log',
+        action='store_true',
+        help='Like --jit, and report what gets compiled on stderr.',
+    )
+    arg_parser.add_argument(
+        '--profile',
+        metavar='PATH',
+        help='Start the JIT from the profile at PATH, and update it after the run.',
+    )
+    arg_parser.add_argument(
+        '--memprofile',
+        metavar='PATH',
+        help='Report which Lox code allocated the most memory, and dump it to PATH.',
+    )
+    arg_parser.add_argument(
+        '--memprofile-top',
+        type=int,
+        default=10,
+        metavar='N',
+        help='How many allocation sites to report with --memprofile.',
+    )
+    arg_parser.add_argument(
+        '--dump-ast',
+        action='store_true',
+        help='Print the script as it is after optimization, instead of running it.',
+    )
+    arg_parser.add_argument(
+        '--max-steps', type=int, help='Stop after this many loop iterations and calls.'
+    )
+    arg_parser.add_argument(
+        '--timeout', type=float, help='Stop after this many seconds.'
+    )
+    arg_parser.add_argument(
+        '--max-alloc-bytes', type=int, help='Stop after allocating about this much.'
+    )
+    options = arg_parser.parse_args(args[1:])
+
+    budget = None
+    if any(
+        limit is not None
+        for limit in (options.max_steps, options.timeout, options.max_alloc_bytes)
+    ):
+        budget = Budget(options.max_steps, options.timeout, options.max_alloc_bytes)
+
+    if options.profile is not None and (options.script is None or options.watch):
+        arg_parser.error('--profile only works when running a script once.')
+    if options.memprofile is not None:
+        if options.script is None or options.watch:
+            arg_parser.error('--memprofile only works when running a script once.')
+        if options.jit or options.jit_log or options.profile is not None:
+            arg_parser.error("--memprofile can't be combined with the JIT.")
+
+    if options.dump_ast and (options.script is None or options.watch):
+        arg_parser.error('--dump-ast only works with a script, run once.')
+
+    jit = options.jit or options.jit_log or options.profile is not None
+    if options.dump_ast:
+        dump_file(options.script)
+    elif options.memprofile is not None:
+        memprofile_file(
+            options.script, options.memprofile, options.memprofile_top, budget
+        )
+    elif options.script is not None and options.watch:
+        watch_file(options.script, budget, jit, options.jit_log)
+    elif options.script is not None:
+        run_file(options.script, budget, jit, options.jit_log, options.profile)
     else:
-        run_prompt()
+        run_prompt(budget, jit, options.jit_log)
+
+
+def make_interpreter(
+    budget: Budget | None = None,
+    jit: bool = False,
+    jit_log: bool = False,
+) -> Interpreter:
+    if jit:
+        return TracingInterpreter(budget, log=sys.stderr if jit_log else None)
+    return Interpreter(budget)
+
+
+def run_file(
+    filename: str,
+    budget: Budget | None = None,
+    jit: bool = False,
+    jit_log: bool = False,
+    profile_path: str | None = None,
+):
+    with open(filename, 'rt') as f:
+        contents = f.read()
+    interpreter = make_interpreter(budget, jit, jit_log)
+    profile = None if profile_path is None else Profile.load(profile_path)
+    try:
+        run(contents, interpreter, profile)
+    except LoxError as exc:
+        sys.exit(exc.return_code)
+    finally:
+        if profile_path is not None and profile is not None:
+            profile.save(profile_path)
+
+
+def dump_file(filename: str):
+    with open(filename, 'rt') as f:
+        contents = f.read()
+    try:
+        program = compile(contents)
+    except LoxCompileError as exc:
+        for error in exc.errors:
+            report(error)
+        sys.exit(exc.return_code)
+    for stmt in program.statements:
+        print(stmt)
 
 
-def run_file(filename: str):
+def memprofile_file(
+    filename: str,
+    dump_path: str,
+    top: int = 10,
+    budget: Budget | None = None,
+):
     with open(filename, 'rt') as f:
         contents = f.read()
-    interpreter = Interpreter()
+    profiler = MemoryProfiler(budget)
     try:
-        run(contents, interpreter)
+        run(contents, profiler)
     except LoxError as exc:
         sys.exit(exc.return_code)
+    finally:
+        lines = LineTable(contents)
+        print(profiler.report(lines, top), file=sys.stderr)
+        with open(dump_path, 'wt') as f:
+            json.dump(profiler.dump(lines), f, indent=2)
+
+
+def watch_file(
+    filename: str,
+    budget: Budget | None = None,
+    jit: bool = False,
+    jit_log: bool = False,
+    interval: float = 0.2,
+):
+    with open(filename, 'rt') as f:
+        front_end = IncrementalFrontEnd(f.read())
+    last_modified = os.stat(filename).st_mtime_ns
+    while True:
+        try:
+            run_front_end(front_end, make_interpreter(budget, jit, jit_log))
+        except LoxError:
+            pass
+        print(f'[watching {filename}]')
+        try:
+            while True:
+                time.sleep(interval)
+                try:
+                    modified = os.stat(filename).st_mtime_ns
+                    if modified != last_modified:
+                        with open(filename, 'rt') as f:
+                            source = f.read()
+                        break
+                except FileNotFoundError:
+                    # Some editors save by deleting and re-creating the file.
+                    continue
+        except KeyboardInterrupt:
+            break
+        last_modified = modified
+        front_end.edit(*diff(front_end.source, source))
+
+
+def run_front_end(front_end: IncrementalFrontEnd, interpreter: Interpreter):
+    lines = LineTable(front_end.source)
+    if front_end.scan_errors:
+        for scan_error in front_end.scan_errors:
+            scan_error.locate(lines)
+            report(scan_error)
+        raise LoxError(65)
+    if len(front_end.errors) >= 1:
+        for parse_error in front_end.errors:
+            parse_error.locate(lines)
+            report(parse_error)
+        raise LoxError(65)
+    run_statements(front_end.statements, interpreter, lines)
 
 
-def run_prompt():
+def run_prompt(budget: Budget | None = None, jit: bool = False, jit_log: bool = False):
     global had_error
-    interpreter = Interpreter()
+    interpreter = make_interpreter(budget, jit, jit_log)
     while True:
         try:
             line = input("> ")
@@ -41,23 +233,37 @@ def run_prompt():
             continue
 
 
-def run(source: str, interpreter: Interpreter):
-    tokens, scan_errors = scan(source)
-    if scan_errors:
-        for scan_error in scan_errors:
-            report(scan_error)
-        raise LoxError(65)
+def run(source: str, interpreter: Interpreter, profile: Profile | None = None):
+    try:
+        program = compile(source)
+    except LoxCompileError as exc:
+        for error in exc.errors:
+            report(error)
+        raise
+    if profile is None:
+        run_statements(program.statements, interpreter, program.lines)
+        return
+    assert isinstance(interpreter, TracingInterpreter)
+    profile.apply(source, program.statements, interpreter)
+    try:
+        run_statements(program.statements, interpreter, program.lines)
+    finally:
+        profile.record(source, program.statements, interpreter)
 
-    parser = Parser()
-    statements = parser.parse(tokens)
-    if len(parser.errors) >= 1:
-        for parse_error in parser.errors:
-            report(parse_error)
-        raise LoxError(65)
 
+def run_statements(
+    statements: Sequence[Stmt],
+    interpreter: Interpreter,
+    lines: LineTable,
+):
     runtime_error = interpreter.interpret(statements)
     if runtime_error is not None:
+        runtime_error.locate(lines)
         report(runtime_error)
+        if isinstance(runtime_error, LoxBudgetError):
+            # Running out of budget gets its own code so callers can tell it apart
+            # from a bug in the script.
+            raise LoxError(75)
         raise LoxError(70)
 
 
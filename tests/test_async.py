@@ -0,0 +1,65 @@
+import asyncio
+import time
+import unittest
+
+from src._async_interpret import AsyncInterpreter, run_concurrently
+from src._budget import Budget
+from src._errors import LoxBudgetError
+from src._parse import Parser
+from src._scan import scan
+from src._symbols import symbols
+
+
+def parse(source: str):
+    tokens, _ = scan(source)
+    return Parser().parse(tokens)
+
+
+class TestAsyncInterpreter(unittest.TestCase):
+
+    def test_sleeping_programs_overlap(self):
+        programs = [parse('sleep(0.05);') for _ in range(200)]
+        start = time.monotonic()
+        errors = asyncio.run(run_concurrently(programs))
+        self.assertEqual(errors, [None] * 200)
+        self.assertLess(time.monotonic() - start, 2)
+
+    def test_busy_program_yields_to_others(self):
+        finished = []
+
+        async def note(name):
+            finished.append(name)
+
+        async def main():
+            busy = AsyncInterpreter(Budget(timeout=0.3), time_slice=0.001)
+            quick = AsyncInterpreter()
+            quick.define_native('done', 0, lambda: note('quick'))
+            return await asyncio.gather(
+                busy.interpret_async(parse('while (true) {}')),
+                quick.interpret_async(parse('sleep(0.01); done();')),
+            )
+
+        busy_error, quick_error = asyncio.run(main())
+        self.assertIsInstance(busy_error, LoxBudgetError)
+        self.assertIsNone(quick_error)
+        self.assertEqual(finished, ['quick'])
+
+    def test_lox_functions_and_control_flow(self):
+        source = '''
+            var total = 0;
+            fun add(n) { total = total + n; }
+            for (var i = 0; i < 5; i = i + 1) { if (i > 1) add(i); }
+        '''
+        interpreter = AsyncInterpreter()
+        self.assertIsNone(asyncio.run(interpreter.interpret_async(parse(source))))
+        self.assertEqual(interpreter.globals.values[symbols.intern('total')], 9)
+
+    def test_native_errors_are_located(self):
+        source = 'var s = "soon";\nsleep(s);'
+        error = asyncio.run(AsyncInterpreter().interpret_async(parse(source)))
+        self.assertEqual(error.msg, 'sleep() expects a number of seconds.')
+        self.assertEqual(error.offset, source.index(')'))
+
+
+if __name__ == '__main__':
+    unittest.main()
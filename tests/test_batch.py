@@ -0,0 +1,152 @@
+import array
+import random
+import unittest
+from unittest import mock
+
+from src import compile_formula, LoxCompileError, LoxRuntimeError
+from src import _batch
+from src._environment import Environment
+from src._interpret import Interpreter, stringify
+from src._symbols import symbols
+
+FORMULAS = [
+    'a + b',
+    'a - b * 2',
+    'a / b',
+    '-a',
+    '!a',
+    'a < b',
+    'a <= b',
+    'a >= 1 and b',
+    'a == b',
+    'a != nil',
+    'a or b',
+    'a and b or "neither"',
+    '(a + b) * (a - b)',
+    'a + "!"',
+    'clock() > 0 and a',
+]
+
+VALUES = [0, 1, -3, 2 ** 53, 0.5, -0.0, 1e300, True, False, None, 'x', 'yz']
+
+
+def row_by_row(source, columns):
+    'What calling the interpreter once per row gives, or the error it raises.'
+    formula = compile_formula(source)
+    interpreter = Interpreter()
+    results = []
+    rows = len(next(iter(columns.values())))
+    for row in range(rows):
+        env = Environment(enclosing=interpreter.globals)
+        for name, column in columns.items():
+            env.define(symbols.intern(name), column[row])
+        try:
+            results.append(interpreter.eval_expr(formula.expression, env))
+        except LoxRuntimeError as exc:
+            return exc.msg, exc.offset
+        except ZeroDivisionError:
+            return 'ZeroDivisionError'
+    return [stringify(result) for result in results]
+
+
+def batch(source, columns):
+    try:
+        results = compile_formula(source).evaluate(columns)
+    except LoxRuntimeError as exc:
+        return exc.msg, exc.offset
+    except ZeroDivisionError:
+        return 'ZeroDivisionError'
+    return [stringify(result) for result in results]
+
+
+class TestBatch(unittest.TestCase):
+
+    def test_matches_row_by_row(self):
+        rng = random.Random(43)
+        for _ in range(300):
+            pools = [rng.sample(VALUES, rng.randint(1, 4)) for _ in range(2)]
+            columns = {
+                name: [rng.choice(pool) for _ in range(6)]
+                for name, pool in zip('ab', pools)
+            }
+            for source in FORMULAS:
+                with self.subTest(source=source, columns=columns):
+                    expected = row_by_row(source, columns)
+                    self.assertEqual(batch(source, columns), expected)
+
+    def test_vectorized(self):
+        columns = {'price': [2, 1.5, 3], 'quantity': array.array('q', [3, 2, 0])}
+        with mock.patch.object(_batch, 'evaluate_rows') as evaluate_rows:
+            formula = compile_formula('price * quantity > 3 or -price')
+            self.assertEqual(formula.evaluate(columns), [True, -1.5, -3])
+        evaluate_rows.assert_not_called()
+
+    def test_falls_back(self):
+        for source, columns in [
+            ('a + 1', {'a': [1, 'x']}),
+            ('clock() > a', {'a': [1]}),
+            ('a / b', {'a': [1], 'b': [0]}),
+            ('a = 2', {'a': [1]}),
+        ]:
+            with self.subTest(source=source):
+                with mock.patch.object(
+                    _batch, 'evaluate_rows', return_value=[]
+                ) as evaluate_rows:
+                    compile_formula(source).evaluate(columns)
+                evaluate_rows.assert_called_once()
+
+    def test_errors(self):
+        formula = compile_formula('\n  a - b')
+        with self.assertRaises(LoxRuntimeError) as context:
+            formula.evaluate({'a': [1, 2, 'three'], 'b': [1, 2, 3]})
+        self.assertEqual(context.exception.msg, 'Operands must be numbers.')
+        self.assertEqual((context.exception.line, context.exception.column), (2, 5))
+        with self.assertRaises(LoxRuntimeError):
+            formula.evaluate({'a': [1]})
+        with self.assertRaises(LoxCompileError):
+            compile_formula('a +')
+        with self.assertRaises(LoxCompileError):
+            compile_formula('a; b')
+        with self.assertRaises(ValueError):
+            formula.evaluate({'a': [1], 'b': [1, 2]})
+
+    def test_results_are_fresh_lists(self):
+        column = [1, 2]
+        result = compile_formula('a').evaluate({'a': column})
+        self.assertEqual(result, column)
+        self.assertIsNot(result, column)
+        # Long concatenations come back as plain strings, not ropes.
+        long = ['x' * 100, 1]
+        result = compile_formula('a + a').evaluate({'a': long[:1]})
+        self.assertEqual(result, ['x' * 200])
+        self.assertIs(type(result[0]), str)
+        # Row by row too.
+        formula = compile_formula('b and a + a')
+        result = formula.evaluate({'a': long, 'b': [True, False]})
+        self.assertEqual(result, ['x' * 200, False])
+        self.assertIs(type(result[0]), str)
+
+
+@unittest.skipIf(_batch.numpy is None, 'NumPy is not installed')
+class TestBatchNumpy(unittest.TestCase):
+
+    def test_matches_lists(self):
+        numpy = _batch.numpy
+        a = numpy.array([1.5, -2.0, 0.0, 7.25])
+        b = numpy.array([3, 0, -1, 2 ** 40])
+        for source in ['a + b', 'a * b - 1', '-a <= b', 'a == b', 'a or b', '!a']:
+            with self.subTest(source=source):
+                lists = {'a': a.tolist(), 'b': b.tolist()}
+                self.assertEqual(batch(source, {'a': a, 'b': b}), batch(source, lists))
+
+    def test_big_ints_are_not_rounded(self):
+        numpy = _batch.numpy
+        column = numpy.array([2 ** 62 + 1], dtype=numpy.int64)
+        self.assertEqual(
+            compile_formula('a - 1').evaluate({'a': column}),
+            compile_formula('a - 1').evaluate({'a': column.tolist()}),
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+from src._budget import Budget
+from src._errors import LoxBudgetError
+from src._interpret import Interpreter
+from src._parse import Parser
+from src._scan import scan
+
+
+def parse(source: str):
+    tokens, _ = scan(source)
+    return Parser().parse(tokens)
+
+
+class TestBudget(unittest.TestCase):
+
+    def test_step_limit_stops_infinite_loop(self):
+        interpreter = Interpreter(Budget(max_steps=100))
+        error = interpreter.interpret(parse('while (true) {}'))
+        self.assertIsInstance(error, LoxBudgetError)
+        self.assertEqual(interpreter.steps, 101)
+
+    def test_function_calls_count_as_steps(self):
+        statements = parse('fun f() {} f(); f(); f();')
+        self.assertIsNone(Interpreter(Budget(max_steps=3)).interpret(statements))
+        error = Interpreter(Budget(max_steps=2)).interpret(statements)
+        self.assertIsInstance(error, LoxBudgetError)
+
+    def test_timeout(self):
+        error = Interpreter(Budget(timeout=0.05)).interpret(parse('while (true) {}'))
+        self.assertIsInstance(error, LoxBudgetError)
+
+    def test_allocation_limit(self):
+        statements = parse('var s = "x"; while (true) { s = s + s; }')
+        error = Interpreter(Budget(max_alloc_bytes=10_000)).interpret(statements)
+        self.assertIsInstance(error, LoxBudgetError)
+
+    def test_counters_reset_between_runs(self):
+        interpreter = Interpreter(Budget(max_steps=10))
+        statements = parse('var i = 0; while (i < 5) { i = i + 1; }')
+        self.assertIsNone(interpreter.interpret(statements))
+        self.assertIsNone(interpreter.interpret(statements))
+
+
+if __name__ == '__main__':
+    unittest.main()
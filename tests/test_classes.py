@@ -0,0 +1,207 @@
+import asyncio
+import gc
+import io
+import unittest
+import weakref
+
+from src._async_interpret import AsyncInterpreter
+from src._expr import Get, Set
+from src._interpret import Interpreter
+from src._jit import TracingInterpreter
+from src._lox_class import LoxInstance
+from src._parse import Parser
+from src._scan import scan
+from src._stmt import walk
+from src._symbols import symbols
+
+
+def parse(source: str):
+    tokens, _ = scan(source)
+    parser = Parser()
+    statements = parser.parse(tokens)
+    return statements, parser.errors
+
+
+def run(interpreter: Interpreter, source: str):
+    statements, errors = parse(source)
+    assert not errors, errors
+    output = io.StringIO()
+    interpreter.output = output
+    error = interpreter.interpret(statements)
+    return output.getvalue(), error, statements
+
+
+INHERITANCE = '''
+    class Animal {
+        init(name) { this.name = name; }
+        speak() { return this.name + " makes a sound"; }
+        greet(other) { return "hi " + other.name; }
+    }
+    class Dog < Animal {
+        init(name) { super.init(name); this.tricks = 0; }
+        speak() { return super.speak() + " (woof)"; }
+        learn() { this.tricks = this.tricks + 1; return this; }
+    }
+    var rex = Dog("Rex");
+    print rex.speak();
+    print rex.learn().learn().tricks;
+    print rex.greet(Animal("Tom"));
+    var bound = rex.speak;
+    print bound();
+    print rex;
+    print Dog;
+'''
+EXPECTED = (
+    'Rex makes a sound (woof)\n2\nhi Tom\nRex makes a sound (woof)\n'
+    'Dog instance\nDog\n'
+)
+
+
+class TestClasses(unittest.TestCase):
+
+    def test_inheritance_and_bound_methods(self):
+        for interpreter in [Interpreter(), TracingInterpreter()]:
+            with self.subTest(interpreter=type(interpreter).__name__):
+                output, error, _ = run(interpreter, INHERITANCE)
+                self.assertIsNone(error)
+                self.assertEqual(output, EXPECTED)
+
+    def test_async_classes(self):
+        statements, _ = parse(INHERITANCE)
+        output = io.StringIO()
+        interpreter = AsyncInterpreter(output=output)
+        self.assertIsNone(asyncio.run(interpreter.interpret_async(statements)))
+        self.assertEqual(output.getvalue(), EXPECTED)
+
+    def test_initializer_returns_the_instance(self):
+        output, error, _ = run(Interpreter(), '''
+            class Box { init(v) { this.v = v; if (v > 0) return; this.v = -1; } }
+            var box = Box(2);
+            print box.init(0) == box;
+            print box.v;
+        ''')
+        self.assertIsNone(error)
+        self.assertEqual(output, 'true\n-1\n')
+
+    def test_closures_capture_this(self):
+        output, error, _ = run(Interpreter(), '''
+            class Counter {
+                init() { this.count = 0; }
+                incrementer() { fun inc() { this.count = this.count + 1; } return inc; }
+            }
+            var counter = Counter();
+            var inc = counter.incrementer();
+            inc(); inc();
+            print counter.count;
+        ''')
+        self.assertIsNone(error)
+        self.assertEqual(output, '2\n')
+
+    def test_instances_with_the_same_fields_share_a_shape(self):
+        interpreter = Interpreter()
+        _, error, _ = run(interpreter, '''
+            class P { init(x, y) { this.x = x; this.y = y; } }
+            var a = P(1, 2);
+            var b = P(3, 4);
+            var c = P(5, 6);
+            c.z = 7;
+            var d = P(0, 0);
+            d.y = 1;
+        ''')
+        self.assertIsNone(error)
+        instances = {
+            name: interpreter.globals.values[symbols.intern(name)] for name in 'abcd'
+        }
+        for instance in instances.values():
+            assert isinstance(instance, LoxInstance)
+        a, b, c, d = instances.values()
+        self.assertIs(a.shape, b.shape)
+        self.assertIs(a.shape, d.shape)
+        self.assertIsNot(a.shape, c.shape)
+        self.assertEqual(c.fields, [5, 6, 7])
+        self.assertEqual(d.fields, [0, 1])
+
+    def test_inline_cache_states(self):
+        classes = ' '.join(
+            f'class C{i} {{ init() {{ this.v = {i}; }} }}' for i in range(6)
+        )
+        _, error, statements = run(Interpreter(), classes + '''
+            fun get(o) { return o.v; }
+            var total = 0;
+            for (var i = 0; i < 3; i = i + 1) total = total + get(C0());
+            for (var i = 0; i < 3; i = i + 1) total = total + get(C1());
+            print total;
+            fun get2(o) { return o.v; }
+            get2(C0()); get2(C1()); get2(C2()); get2(C3()); get2(C4()); get2(C5());
+            print get2(C5());
+        ''')
+        self.assertIsNone(error)
+        nodes = [node for stmt in statements for node in walk(stmt)]
+        gets = [node.cache.state for node in nodes if isinstance(node, Get)]
+        self.assertEqual(gets, ['polymorphic', 'megamorphic'])
+        sets = {node.cache.state for node in nodes if isinstance(node, Set)}
+        self.assertEqual(sets, {'monomorphic'})
+
+    def test_caches_stay_warm_across_runs(self):
+        statements, errors = parse('''
+            class P { init(x) { this.x = x; } get() { return this.x; } }
+            fun make() {
+                class Local { init() { this.y = 1; } }
+                return Local();
+            }
+            var p = P(1);
+            print p.get() + make().y + make().y;
+        ''')
+        assert not errors, errors
+        classes = []
+        for _ in range(5):
+            interpreter = Interpreter(output=io.StringIO())
+            self.assertIsNone(interpreter.interpret(statements))
+            p = interpreter.globals.values[symbols.intern('p')]
+            assert isinstance(p, LoxInstance)
+            classes.append(weakref.ref(p.klass))
+            del interpreter, p
+        nodes = [node for stmt in statements for node in walk(stmt)]
+        states = {
+            node.cache.state for node in nodes if isinstance(node, (Get, Set))
+        }
+        self.assertEqual(states, {'monomorphic'})
+        # The caches don't keep earlier runs' classes alive.
+        gc.collect()
+        self.assertEqual([ref() for ref in classes[:-1]], [None] * 4)
+
+    def test_runtime_errors(self):
+        cases = {
+            'class A {} A().missing;': "Undefined property 'missing'.",
+            'var x = 1; x.y;': 'Only instances have properties.',
+            'var x = "s"; x.y = 1;': 'Only instances have fields.',
+            'var NotAClass = 1; class B < NotAClass {}': 'Superclass must be a class.',
+            'class A { init(a) {} } A();': 'Expected 1 arguments but got 0.',
+            'class A {} class B < A { m() { return super.nope; } } B().m();':
+                "Undefined property 'nope'.",
+        }
+        for source, message in cases.items():
+            with self.subTest(source=source):
+                _, error, _ = run(Interpreter(), source)
+                self.assertIsNotNone(error)
+                self.assertEqual(error.msg, message)
+
+    def test_parse_errors(self):
+        cases = {
+            'print this;': "Can't use 'this' outside of a class.",
+            'fun f() { super.g(); }': "Can't use 'super' outside of a class.",
+            'class A { f() { super.g(); } }':
+                "Can't use 'super' in a class with no superclass.",
+            'class A < A {}': "A class can't inherit from itself.",
+            'class A { init() { return 1; } }':
+                "Can't return a value from an initializer.",
+        }
+        for source, message in cases.items():
+            with self.subTest(source=source):
+                _, errors = parse(source)
+                self.assertEqual(len(errors), 1)
+                self.assertIn(message, str(errors[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import asyncio
+import io
+import unittest
+
+from src._async_interpret import AsyncInterpreter
+from src._expr import Variable
+from src._interpret import Interpreter
+from src._jit import TracingInterpreter
+from src._lox_callable import LoxFunction
+from src._parse import Parser
+from src._scan import scan
+from src._stmt import FunctionStmt, VarStmt, walk
+from src._symbols import symbols
+
+
+def parse(source: str):
+    tokens, _ = scan(source)
+    return Parser().parse(tokens)
+
+
+def run(interpreter: Interpreter, source: str) -> str:
+    output = io.StringIO()
+    interpreter.output = output
+    error = interpreter.interpret(parse(source))
+    assert error is None, error
+    return output.getvalue()
+
+
+COUNTERS = '''
+    fun makeCounter() {
+        var count = 0;
+        fun increment() {
+            count = count + 1;
+            return count;
+        }
+        return increment;
+    }
+    var a = makeCounter();
+    var b = makeCounter();
+    a(); a();
+    print a();
+    print b();
+'''
+
+
+class TestClosures(unittest.TestCase):
+
+    def test_counters_are_independent(self):
+        for interpreter in [Interpreter(), TracingInterpreter()]:
+            with self.subTest(interpreter=type(interpreter).__name__):
+                self.assertEqual(run(interpreter, COUNTERS), '3\n1\n')
+
+    def test_closures_share_captured_variables(self):
+        source = '''
+            fun pair() {
+                var value = "old";
+                fun get() { return value; }
+                fun set(v) { value = v; }
+                set("new");
+                print get();
+                value = "newer";
+                print get();
+            }
+            pair();
+        '''
+        self.assertEqual(run(Interpreter(), source), 'new\nnewer\n')
+
+    def test_captures_pass_through_intermediate_functions(self):
+        source = '''
+            fun outer(x) {
+                fun middle() {
+                    fun inner() { return x * 2; }
+                    return inner;
+                }
+                return middle();
+            }
+            print outer(21)();
+        '''
+        self.assertEqual(run(Interpreter(), source), '42\n')
+
+    def test_nested_function_can_recurse(self):
+        source = '''
+            {
+                fun fact(n) { if (n < 2) return 1; return n * fact(n - 1); }
+                print fact(5);
+            }
+        '''
+        self.assertEqual(run(Interpreter(), source), '120\n')
+
+    def test_globals_are_looked_up_at_call_time(self):
+        source = '''
+            fun show() { print later; }
+            var later = "defined";
+            show();
+        '''
+        self.assertEqual(run(Interpreter(), source), 'defined\n')
+
+    def test_only_captured_variables_are_in_cells(self):
+        statements = parse('''
+            fun outer(kept, dropped) {
+                var local = 1;
+                var shared = 2;
+                fun inner() { return kept + shared; }
+                print local;
+                return inner;
+            }
+        ''')
+        outer = statements[0]
+        assert isinstance(outer, FunctionStmt)
+        kept, shared = symbols.intern('kept'), symbols.intern('shared')
+        self.assertEqual(outer.captured_params, (kept,))
+        flags = {
+            symbols.name(node.symbol): node.captured
+            for node in walk(outer) if isinstance(node, VarStmt)
+        }
+        self.assertEqual(flags, {'local': False, 'shared': True})
+        inner = outer.body[2]
+        assert isinstance(inner, FunctionStmt)
+        self.assertEqual(set(inner.captures), {kept, shared})
+        self.assertTrue(all(
+            node.captured for node in walk(inner) if isinstance(node, Variable)
+        ))
+
+        interpreter = Interpreter()
+        run(interpreter, '''
+            fun outer(a) { var big = "x"; fun f() { return a; } return f; }
+            var f = outer(1);
+        ''')
+        closure = interpreter.globals.values[symbols.intern('f')]
+        assert isinstance(closure, LoxFunction)
+        self.assertEqual(list(closure.closure), [symbols.intern('a')])
+
+    def test_async_closures(self):
+        output = io.StringIO()
+        interpreter = AsyncInterpreter(output=output)
+        error = asyncio.run(interpreter.interpret_async(parse(COUNTERS)))
+        self.assertIsNone(error)
+        self.assertEqual(output.getvalue(), '3\n1\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import io
+import unittest
+
+from src._interpret import Interpreter
+from src._parse import Parser
+from src._scan import scan
+
+SOURCE = '''
+var total = 0;
+fun add(a, b) { print "adding"; return a + b; }
+for (var i = 0; i < 3; i = i + 1) {
+    total = add(total, i * 2);
+    print "adding";
+    if (total > 2) { print -0.0; print 0; } else { print 0.0; print false; }
+}
+print total;
+'''
+
+
+def parse(source: str, hash_cons: bool) -> tuple[Parser, list]:
+    tokens, _ = scan(source)
+    parser = Parser(hash_cons=hash_cons)
+    return parser, parser.parse(tokens)
+
+
+def run(source: str, hash_cons: bool) -> str:
+    output = io.StringIO()
+    Interpreter(output=output).interpret(parse(source, hash_cons)[1])
+    return output.getvalue()
+
+
+class TestHashConsing(unittest.TestCase):
+
+    def test_shared(self):
+        parser, statements = parse('print "s"; print "s"; { print "s"; }', True)
+        first, second, block = statements
+        self.assertIs(first, second)
+        self.assertIs(block.statements[0], first)
+        self.assertEqual((parser.hash_conser.nodes, parser.hash_conser.shared), (7, 4))
+
+    def test_equal_values_kept_apart(self):
+        source = 'print 1; print 1.0; print true; print 0.0; print -0.0;'
+        _, statements = parse(source, True)
+        literals = [stmt.expression for stmt in statements]
+        self.assertEqual(len({id(literal) for literal in literals}), 5)
+
+    def test_positions_not_shared(self):
+        _, statements = parse('print x; print x; print 1 + x; print 1 + x;', True)
+        for a, b in [statements[:2], statements[2:]]:
+            self.assertEqual(str(a), str(b))
+            self.assertIsNot(a, b)
+            self.assertIsNot(a.expression, b.expression)
+        # The literals inside them still are.
+        self.assertIs(statements[2].expression.left, statements[3].expression.left)
+
+    def test_same_behavior(self):
+        self.assertEqual(run(SOURCE, True), run(SOURCE, False))
+        parser, statements = parse(SOURCE, True)
+        self.assertGreater(parser.hash_conser.ratio, 0)
+        self.assertEqual(statements, parse(SOURCE, False)[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import random
+import unittest
+
+from src._incremental import IncrementalFrontEnd, diff
+from src._parse import Parser
+from src._scan import scan
+
+SOURCE = '''var a = 1;
+fun show(x) {
+    print x;
+}
+if (a) print a;
+// A comment.
+show("one");
+show("two");
+'''
+
+
+def parse(source: str):
+    tokens, scan_errors = scan(source)
+    parser = Parser()
+    statements = parser.parse(tokens)
+    return statements, [str(e) for e in [*scan_errors, *parser.errors]]
+
+
+class TestIncrementalFrontEnd(unittest.TestCase):
+
+    def assert_matches_full_parse(self, front_end: IncrementalFrontEnd):
+        statements, errors = parse(front_end.source)
+        # Statements compare names and operators, and their offsets too.
+        self.assertEqual(front_end.statements, statements)
+        self.assertEqual([str(e) for e in front_end.errors], errors)
+
+    def apply(self, front_end: IncrementalFrontEnd, new_source: str):
+        front_end.edit(*diff(front_end.source, new_source))
+        self.assertEqual(front_end.source, new_source)
+        self.assert_matches_full_parse(front_end)
+
+    def test_edit_inside_function_reuses_later_declarations(self):
+        front_end = IncrementalFrontEnd(SOURCE)
+        self.apply(front_end, SOURCE.replace('print x;', 'print x;\n    print x;'))
+        # Only the function and the declaration before it are re-parsed.
+        self.assertEqual(front_end.reused, len(front_end.declarations) - 2)
+
+    def test_edits_that_change_how_later_code_parses(self):
+        front_end = IncrementalFrontEnd(SOURCE)
+        self.apply(front_end, SOURCE.replace('if (a) print a;', 'if (a) print a; else'))
+        self.apply(front_end, SOURCE.replace('// A comment.', '// A comment. "'))
+        self.apply(front_end, SOURCE.replace('show("one");', 'show("one"'))
+        self.apply(front_end, SOURCE.replace('var a', '// var a'))
+        self.apply(front_end, SOURCE)
+
+    def test_closing_an_earlier_unterminated_string(self):
+        source = '"var a = 1;\nprint a;\nvar b = 2;\nprint b;\n'
+        front_end = IncrementalFrontEnd(source)
+        self.assert_matches_full_parse(front_end)
+        self.apply(front_end, source.replace('\nprint a', '\n"print a'))
+        self.apply(front_end, source)
+
+    def test_random_edits(self):
+        snippets = [
+            'x', ' ', '\n', ';', '{', '}', '"', '//', '(', ')', '1.5', '!', '=', '#',
+            'else print 2;', 'var q = 1;', 'fun g() {}',
+        ]
+        rng = random.Random(1)
+        for _ in range(150):
+            front_end = IncrementalFrontEnd(SOURCE)
+            for _ in range(8):
+                source = front_end.source
+                offset = rng.randrange(len(source) + 1)
+                removed = rng.randrange(min(5, len(source) - offset) + 1)
+                inserted = rng.choice(snippets) if rng.random() < 0.8 else ''
+                new_source = source[:offset] + inserted + source[offset + removed:]
+                with self.subTest(source=source, new_source=new_source):
+                    front_end.edit(offset, removed, inserted)
+                    self.assertEqual(front_end.source, new_source)
+                    self.assert_matches_full_parse(front_end)
+
+    def test_diff(self):
+        self.assertEqual(diff('abcdef', 'abXYef'), (2, 2, 'XY'))
+        self.assertEqual(diff('aaa', 'aaaa'), (3, 0, 'a'))
+        self.assertEqual(diff('abc', ''), (0, 3, ''))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import io
+import unittest
+from unittest import mock
+
+from src import _parse
+from src._expr import Binary, Unary
+from src._interpret import Interpreter
+from src._parse import Parser
+from src._scan import scan
+from src._stmt import walk
+
+
+def parse(source: str):
+    tokens, _ = scan(source)
+    return Parser().parse(tokens)
+
+
+def numeric(source: str) -> list[tuple[str, bool]]:
+    'Whether each operator in the source was proven to have numeric operands.'
+    return [
+        (str(node), node.numeric)
+        for stmt in parse(source)
+        for node in walk(stmt)
+        if isinstance(node, (Binary, Unary))
+    ]
+
+
+def run(source: str, infer: bool = True) -> tuple[str, str | None]:
+    if infer:
+        statements = parse(source)
+    else:
+        with mock.patch.object(_parse, 'infer_types'):
+            statements = parse(source)
+    output = io.StringIO()
+    error = Interpreter(output=output).interpret(statements)
+    return output.getvalue(), None if error is None else f'{error.offset} {error.msg}'
+
+
+class TestInfer(unittest.TestCase):
+
+    def test_loop_counter(self):
+        self.assertEqual(
+            numeric('for (var i = 0; i < 10; i = i + 1) print -i * 2;'),
+            [
+                ('(< i 10)', True), ('(* (- i) 2)', True), ('(- i)', True),
+                ('(+ i 1)', True),
+            ],
+        )
+
+    def test_unproven(self):
+        self.assertEqual(numeric('var g = 1; print g + 1;'), [('(+ g 1)', False)])
+        self.assertEqual(
+            numeric('fun f(n) { var m = n - 1; return m * n; }'),
+            [('(- n 1)', False), ('(* m n)', False)],
+        )
+        # Strings can be added too.
+        self.assertEqual(
+            numeric('{ var s = "a"; print s + s; }'), [('(+ s s)', False)]
+        )
+        # Assigned a string on a later iteration.
+        self.assertEqual(
+            numeric('{ var x = 0; while (true) { print x - 1; x = "s"; } }'),
+            [('(- x 1)', False)],
+        )
+        # Assigned a string on one branch.
+        self.assertEqual(
+            numeric('{ var x = 0; if (clock()) x = "s"; else x = 2; print x < 1; }'),
+            [('(< x 1)', False)],
+        )
+        self.assertEqual(
+            numeric('{ var x = 0; clock() or (x = "s"); print x < 1; }'),
+            [('(< x 1)', False)],
+        )
+        # Captured, so a closure could assign it.
+        self.assertEqual(
+            numeric('{ var x = 0; fun f() { x = "s"; } f(); print x / 2; }'),
+            [('(/ x 2)', False)],
+        )
+        # Shadowed by a declaration the outer one doesn't share.
+        self.assertEqual(
+            numeric('{ var x = 0; { var x = "s"; print x > 1; } print x > 1; }'),
+            [('(> x 1)', False), ('(> x 1)', True)],
+        )
+
+    def test_proven_in_both_branches(self):
+        self.assertEqual(
+            numeric('{ var x; if (clock()) x = 1; else x = 2.5; print x > 1; }'),
+            [('(> x 1)', True)],
+        )
+        self.assertEqual(
+            numeric('fun f() { var t = 0; while (t < 3) t = t + 1; return t * 2; }'),
+            [('(< t 3)', True), ('(+ t 1)', True), ('(* t 2)', True)],
+        )
+
+    def test_same_behavior(self):
+        for source in [
+            'for (var i = 0; i < 5; i = i + 1) print -i * 2 / 3;',
+            '{ var x = 0; while (x < 3) { x = x + 1; print x <= 2; } }',
+            'var x = "s"; print -x;',
+            '{ var x = 0; var n = 0; while (n < 3) { print x - 1; x = nil; } }',
+            'fun f(n) { var a = 0; return a + n; } print f(1); print f("s");',
+        ]:
+            with self.subTest(source=source):
+                self.assertEqual(run(source), run(source, infer=False))
+
+
+if __name__ == '__main__':
+    unittest.main()
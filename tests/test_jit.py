@@ -0,0 +1,96 @@
+import io
+import unittest
+
+from src._budget import Budget
+from src._interpret import Interpreter
+from src._jit import TracingInterpreter
+from src._parse import Parser
+from src._scan import scan
+
+
+def parse(source: str):
+    tokens, _ = scan(source)
+    return Parser().parse(tokens)
+
+
+def run(interpreter: Interpreter, source: str):
+    output = io.StringIO()
+    interpreter.output = output
+    error = interpreter.interpret(parse(source))
+    return output.getvalue(), str(error), interpreter.steps, interpreter.alloc_bytes
+
+
+class TestTracingInterpreter(unittest.TestCase):
+
+    def assert_same_as_tree_walker(self, source: str, budget: Budget | None = None):
+        log = io.StringIO()
+        expected = run(Interpreter(budget), source)
+        self.assertEqual(run(TracingInterpreter(budget, log=log), source), expected)
+        return log.getvalue()
+
+    def test_hot_loop_is_compiled(self):
+        log = self.assert_same_as_tree_walker('''
+            var total = 0;
+            for (var i = 0; i < 300; i = i + 1) {
+                for (var j = 0; j < 30; j = j + 1) { total = total + i * j - 1; }
+                if (i > 295 and total != 0) print total / 2;
+            }
+            print total;
+        ''')
+        self.assertIn('compiled loop', log)
+        self.assertNotIn('deoptimized', log)
+
+    def test_guard_failure_deoptimizes(self):
+        log = self.assert_same_as_tree_walker('''
+            var x = 0;
+            var s = "";
+            for (var i = 0; i < 300; i = i + 1) {
+                if (i == 150) x = 0.5;
+                if (i == 200) s = nil;
+                x = x + 1;
+                s = s or "a";
+                print -x;
+            }
+        ''')
+        self.assertIn('deoptimized', log)
+        self.assertEqual(log.count('compiled loop'), 2)
+
+    def test_runtime_errors_match(self):
+        self.assert_same_as_tree_walker('''
+            var x = 0;
+            for (var i = 0; i < 300; i = i + 1) { if (i == 250) x = "oops"; x = x - 1; }
+        ''')
+
+    def test_literals_that_are_not_finite(self):
+        # Too big for a float, so it's infinity.
+        huge = '9' * 400 + '.5'
+        log = self.assert_same_as_tree_walker('''
+            var x = 0;
+            for (var i = 0; i < 300; i = i + 1) {
+                x = %s;
+                if (i > 297) print x - %s;
+                if (i > 297) print -x;
+            }
+        ''' % (huge, huge))
+        self.assertIn('compiled loop', log)
+        self.assertNotIn('deoptimized', log)
+
+    def test_loops_with_calls_are_not_compiled(self):
+        log = self.assert_same_as_tree_walker('''
+            fun show(n) { print n; }
+            for (var i = 0; i < 100; i = i + 1) { if (i > 95) show(i); }
+        ''')
+        self.assertIn('not compiling loop', log)
+
+    def test_budgets_are_kept(self):
+        self.assert_same_as_tree_walker(
+            'var i = 0; while (true) { i = i + 1; }', Budget(max_steps=500)
+        )
+        self.assert_same_as_tree_walker(
+            'var s = "x"; while (true) { s = s + "ab"; }',
+            Budget(max_alloc_bytes=50_000),
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
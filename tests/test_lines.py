@@ -0,0 +1,33 @@
+import unittest
+
+from src import compile, LoxCompileError, LoxRuntimeError
+from src._lines import LineTable
+
+
+class TestLineTable(unittest.TestCase):
+
+    def test_position(self):
+        lines = LineTable('ab\ncd\n\nef')
+        self.assertEqual(lines.position(0), (1, 1))
+        self.assertEqual(lines.position(2), (1, 3))
+        self.assertEqual(lines.position(3), (2, 1))
+        self.assertEqual(lines.position(6), (3, 1))
+        self.assertEqual(lines.position(8), (4, 2))
+
+    def test_errors_report_lines_and_columns(self):
+        with self.assertRaises(LoxCompileError) as compile_context:
+            compile('print 1;\nprint 1 +;')
+        self.assertEqual(
+            str(compile_context.exception),
+            "[line 2, column 10] Parse Error at ';'. Expect expression.",
+        )
+        with self.assertRaises(LoxRuntimeError) as run_context:
+            compile('var a = 1;\nprint a +\n  "b";').run()
+        self.assertEqual(
+            str(run_context.exception),
+            'Operands must be two numbers or two strings\n[line 2, column 9]',
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import io
+import unittest
+
+from src._budget import Budget
+from src._interpret import Interpreter
+from src._lines import LineTable
+from src._memprofile import MemoryProfiler
+from src._parse import Parser
+from src._scan import scan
+
+SOURCE = '''fun build(n) {
+    var s = "";
+    for (var i = 0; i < n; i = i + 1) {
+        s = s + "abcdefghij";
+    }
+}
+build(100);
+build(200);
+'''
+
+
+def parse(source: str):
+    tokens, _ = scan(source)
+    return Parser().parse(tokens)
+
+
+class TestMemoryProfiler(unittest.TestCase):
+
+    def test_allocations_are_charged_to_functions_and_lines(self):
+        profiler = MemoryProfiler(output=io.StringIO())
+        self.assertIsNone(profiler.interpret(parse(SOURCE)))
+        lines = LineTable(SOURCE)
+        sites = {
+            (site['function'], site['line'], site['kind']): site
+            for site in profiler.dump(lines)['sites']  # type: ignore[attr-defined]
+        }
+        strings = sites['build', 4, 'string']
+        self.assertEqual(strings['count'], 300)
+        # The strings average over 800 characters, but they're ropes, so each append
+        # allocates only a little, however long the string already is.
+        self.assertGreater(strings['total_bytes'], 300 * 10)
+        self.assertLess(strings['total_bytes'], 300 * 800)
+        self.assertEqual(sites['build', 1, 'environment']['count'], 2)
+        self.assertEqual(sites['<script>', 1, 'function']['count'], 1)
+        self.assertIn('string', [site.kind for site in profiler.top_sites(3)])
+        self.assertIn('build, line 4, column 15', profiler.report(lines, 3))
+
+    def test_inlined_calls_are_charged_to_their_functions(self):
+        source = '''fun twice(s) { return s + s; }
+var s = "ab";
+for (var i = 0; i < 5; i = i + 1) s = twice(s);
+'''
+        statements = parse(source)
+        profiler = MemoryProfiler(Budget(max_steps=1000), output=io.StringIO())
+        self.assertIsNone(profiler.interpret(statements))
+        interpreter = Interpreter(Budget(max_steps=1000))
+        interpreter.interpret(statements)
+        self.assertEqual(profiler.steps, interpreter.steps)
+        sites = {
+            (site.function, site.offset, site.kind): site.count
+            for site in profiler.top_sites()
+        }
+        self.assertEqual(sites['twice', source.index('twice'), 'environment'], 5)
+        self.assertEqual(sites['twice', source.index('+'), 'string'], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,294 @@
+import io
+import itertools
+import unittest
+from unittest import mock
+
+from src import _parse
+from src._budget import Budget
+from src._interpret import Interpreter
+from src._parse import Parser
+from src._scan import scan
+from src._expr import Call
+from src._optimize import INLINE_BUDGET
+from src._stmt import ForRangeStmt, walk
+from src._symbols import symbols
+
+
+def parse(source: str, optimize: bool = True, inline_budget: int = INLINE_BUDGET):
+    tokens, _ = scan(source)
+    if optimize:
+        return Parser(inline_budget).parse(tokens)
+    with mock.patch.object(_parse, 'optimize', lambda stmt, functions: stmt):
+        return Parser().parse(tokens)
+
+
+def counted(source: str) -> int:
+    'How many counted loops the optimizer found.'
+    return sum(
+        isinstance(node, ForRangeStmt)
+        for stmt in parse(source)
+        for node in walk(stmt)
+    )
+
+
+def inlined(source: str, inline_budget: int = INLINE_BUDGET) -> list[str]:
+    'The names of the functions whose calls were inlined.'
+    return [
+        symbols.name(node.inline.function.symbol)
+        for stmt in parse(source, inline_budget=inline_budget)
+        for node in walk(stmt)
+        if isinstance(node, Call) and node.inline is not None
+    ]
+
+
+def dump(source: str) -> str:
+    return '\n'.join(str(stmt) for stmt in parse(source))
+
+
+def run(
+    source: str,
+    optimize: bool = True,
+    budget: Budget | None = None,
+) -> tuple[str, str | None]:
+    output = io.StringIO()
+    interpreter = Interpreter(budget, output)
+    error = interpreter.interpret(parse(source, optimize))
+    return output.getvalue(), None if error is None else f'{error.offset} {error.msg}'
+
+
+class TestCountedLoops(unittest.TestCase):
+
+    def test_recognized(self):
+        for source in [
+            'for (var i = 0; i < 10; i = i + 1) print i;',
+            'for (var i = 10; i > 0; i = i - 2) print i;',
+            'for (var i = 10; i >= n; i = i - 1) { print i; }',
+            'for (var i = 0; i < 10;) { i = i + 1; }',
+            'fun f(n) { for (var i = 0; i < n * 2; i = i + 1) print g(i); }',
+            'fun f() { var i = 0; while (i < 5) { print i; i = i + 1; } }',
+            '{ var n = 3; for (var i = 0; i < n; i = i + 1) { var n = 1; f(); } }',
+        ]:
+            with self.subTest(source=source):
+                self.assertEqual(counted(source), 1)
+
+    def test_not_recognized(self):
+        for source in [
+            # Counts the wrong way for its condition.
+            'for (var i = 0; i > 10; i = i + 1) print i;',
+            'for (var i = 0; i < 10; i = i + 0) print i;',
+            'for (var i = 0; i < 10; i = i + 0.5) print i;',
+            'for (var i = 0; i < 10; i = i * 2) print i;',
+            'for (var i = 0; i < 10; i = i + 1) { i = i + 1; }',
+            'for (var i = 0; i < n; i = i + 1) { n = n - 1; }',
+            # The call could change the global bound.
+            'for (var i = 0; i < n; i = i + 1) f();',
+            'for (var i = 0; i < f(); i = i + 1) print i;',
+            'for (var i = 0; i < i + 1; i = i + 1) print i;',
+            'for (var i = 0; i < 10; i = i + 1) { fun f() { return i; } }',
+            'for (var i = 0; i < 10;) { i = i + 1; print i; }',
+            'var i = 0; while (i < 10) { print i; i = i + 1; }',
+            # The increment updates the counter declared in the body.
+            'fun f() { var i = 0; while (i < 3) { var i = 10; i = i + 1; } }',
+            'fun f() { var i = 0; while (i < 3) { fun i() {} i = i + 1; } }',
+        ]:
+            with self.subTest(source=source):
+                self.assertEqual(counted(source), 0)
+
+    def test_same_behavior(self):
+        for source in [
+            'for (var i = 0; i < 5; i = i + 1) print i;',
+            '{ var i = 0; while (i < 10.5) { print i; i = i + 3; } print i; }',
+            '{ var i = 7; while (i > -2.5) { print i; i = i - 2; } print i; }',
+            '{ var i = 7; while (i >= 2) { print i; i = i - 1; } print i; }',
+            # Compares with >=, like every other <=.
+            '{ var i = 3; while (i <= 0) { print i; i = i - 1; } print i; }',
+            '{ var i = 5; while (i < 3) { print i; i = i + 1; } print i; }',
+            '{ var i = 0.5; while (i < 3) { print i; i = i + 1; } print i; }',
+            '{ var i; while (i < 3) { print i; i = i + 1; } print i; }',
+            '{ var i = 0; while (i < "3") { print i; i = i + 1; } print i; }',
+            '{ var i = 9007199254740990; while (i < 9007199254740992) {'
+            ' print i; i = i + 1; } print i; }',
+            'fun f() { for (var i = 0; i < 5; i = i + 1) { if (i == 3) return i; } }'
+            ' print f();',
+            'for (var i = 0; i < 3; i = i + 1) { var i = "inner"; print i; }',
+            'for (var i = 0; i < 3; i = i + 1) { fun f() { return 1; } print f(); }',
+        ]:
+            with self.subTest(source=source):
+                self.assertEqual(counted(source), 1)
+                self.assertEqual(run(source), run(source, optimize=False))
+
+    def test_redeclared_counter(self):
+        source = '''
+            fun f() {
+                var n = 0;
+                var i = 0;
+                while (i < 3) {
+                    var i = 10;
+                    n = n + 1;
+                    if (n > 5) return n;
+                    i = i + 1;
+                }
+                return -1;
+            }
+            print f();
+        '''
+        self.assertEqual(counted(source), 0)
+        self.assertEqual(run(source), ('6\n', None))
+
+    def test_same_final_value(self):
+        for start, bound, step, operator in itertools.product(
+            [-3, 0, 4], [-2.5, 0, 3, 3.5], [-2, -1, 1, 3], ['<', '>', '>=', '<=']
+        ):
+            if (step > 0) != (operator == '<'):
+                # It would never stop.
+                continue
+            source = (
+                f'{{ var i = {start}; var n = 0;'
+                f' while (i {operator} {bound}) {{ n = n + 1; i = i + {step}; }}'
+                f' print i; print n; }}'
+            ).replace('+ -', '- ')
+            with self.subTest(source=source):
+                self.assertEqual(run(source), run(source, optimize=False))
+
+    def test_same_budget(self):
+        source = 'for (var i = 0; i < 100; i = i + 1) print i;'
+        for limit in [0, 5, 1000]:
+            budget = Budget(max_steps=limit)
+            with self.subTest(limit=limit):
+                self.assertEqual(
+                    run(source, budget=budget), run(source, False, budget=budget)
+                )
+
+
+class TestDeadCode(unittest.TestCase):
+
+    def test_folded(self):
+        self.assertEqual(dump('print -(1 + 2) * 3 < 4 == !nil;'), '(print true)')
+        self.assertEqual(dump('print false or "s";'), '(print "s")')
+        # Strings allocate, and division by zero raises.
+        self.assertEqual(dump('print "a" + "b";'), '(print (+ "a" "b"))')
+        self.assertEqual(dump('print 1 / 0;'), '(print (/ 1 0))')
+
+    def test_dead_branches(self):
+        self.assertEqual(dump('if (1 > 2) print 1; else print 2;'), '(print 2)')
+        self.assertEqual(dump('fun f() { if (nil) return 1; return 2; print 3; }'),
+                         '(fun f ()\n  (return 2))')
+        self.assertEqual(dump('{ while (false) print 1; print 2; }'),
+                         '(block\n  (print 2))')
+
+    def test_unused_variables(self):
+        self.assertEqual(dump('{ var a = 1; var b = -a; var c; print 2; }'),
+                         '(block\n  (print 2))')
+        for source in [
+            '{ var a = f(); }',
+            # Reading a global can fail.
+            '{ var a = g; }',
+            '{ var a = 1; a = 2; }',
+            '{ var a = 1; fun f() { return a; } }',
+            'var a = 1;',
+        ]:
+            with self.subTest(source=source):
+                self.assertEqual(dump(source), str(parse(source, False)[0]))
+
+    def test_hoisted(self):
+        self.assertEqual(
+            dump('{ var a = 2; var n = 0; while (n < 5) { n = n + -a * 3; } }'),
+            '''(block
+  (var a 2)
+  (var n 0)
+  (var $0 (* (- a) 3))
+  (while (< n 5)
+    (block
+      (expr n = (+ n $0)))))''',
+        )
+
+    def test_not_hoisted(self):
+        for source in [
+            # Assigned or declared in the loop.
+            '{ var a = 2; var n = 0; while (n < 5) { n = n + a * 3; a = 1; } }',
+            '{ var n = 0; while (n < 5) { var a = n; n = n + a * 3; } }',
+            # Globals and parameters could hold anything, and could be undefined.
+            '{ var n = 0; while (n < 5) { n = n + g * 3; } }',
+            'fun f(a) { var n = 0; while (n < 5) { n = n + a * 3; } }',
+            '{ var a = 0; var n = 0; while (n < 5) { n = n + 1 / a; } }',
+        ]:
+            with self.subTest(source=source):
+                self.assertNotIn('$', dump(source))
+
+    def test_same_behavior(self):
+        for source in [
+            '{ var a = 2; var n = 0; while (n < 50) { n = n - -a * 3; print n; } }',
+            'fun f(a) { var n = 0; while (n < 3) { n = n + a * 3; print n; } } f("s");',
+            '{ var a = 1; var n = 0; while (n < 3) {'
+            ' if (a == 1 and n > 0) print "a"; n = n + 1; } }',
+            '{ var a = 1; var b = 2; var c = 0; while (c < 2 * a + b) {'
+            ' { var a = 3; print a * b; } c = c + 1; } print c; }',
+            'var x = 1; { var x = 2; var y = x; } print x;',
+            'fun f() { return 1; print "unreachable"; } print f();',
+            'if (1 < 2 and "s") print 1; else print 2;',
+            'print 7 / 2 - 1.5 * 2 == 0.5;',
+        ]:
+            with self.subTest(source=source):
+                self.assertEqual(run(source), run(source, optimize=False))
+
+
+class TestInlining(unittest.TestCase):
+
+    def test_inlined(self):
+        self.assertEqual(
+            inlined('fun sq(x) { return x * x; } fun f(y) { return sq(y) + sq(2); }'),
+            ['sq', 'sq'],
+        )
+        self.assertEqual(
+            inlined('fun one() { return 1; } fun f() { return one(); } print f();'),
+            ['one', 'f'],
+        )
+
+    def test_not_inlined(self):
+        for source in [
+            'fun f(n) { return n < 2 and f(n - 1); } print f(3);',
+            'fun f(n) { print n; return n; } print f(3);',
+            'print f(1); fun f(n) { return n; }',
+            'fun f(n) { return n; } print f(1, 2);',
+            'fun f(n) { return n; } { fun f(n) { return 0; } print f(1); }',
+            'fun f(n) { return n; } fun g() { var f = clock; return f(); }',
+            # Declared again, or assigned, so later calls may not be to it.
+            'fun f(n) { return n; } var f = clock; print f();',
+            'fun f(n) { return n; } fun g() { f = clock; } print f(1);',
+        ]:
+            with self.subTest(source=source):
+                self.assertEqual(inlined(source), [])
+
+    def test_budget(self):
+        source = 'fun f(a, b) { return a * b + 1; } print f(2, 3);'
+        self.assertEqual(inlined(source, inline_budget=5), ['f'])
+        self.assertEqual(inlined(source, inline_budget=4), [])
+
+    def test_same_behavior(self):
+        for source in [
+            'fun sq(x) { return x * x; } var t = 0;'
+            ' for (var i = 0; i < 5; i = i + 1) t = t + sq(i); print t;',
+            'fun f(x) { return x * 2; } print f("s");',
+            'fun f(x) { return g + x; } var g = 1; print f(2);',
+            'fun f(x) { return g + x; } print f(2);',
+            # Redefined after the calls to it were inlined.
+            'fun f() { return 1; } fun g() { return f(); } print g();'
+            ' fun f() { return 2; } print g(); f = clock; print g() > 0;',
+            'fun f() { return 1; } fun g() { return f(); }'
+            ' fun h() { fun f() { return 3; } return f; } f = h(); print g();',
+        ]:
+            with self.subTest(source=source):
+                self.assertEqual(run(source), run(source, optimize=False))
+
+    def test_same_budget(self):
+        source = 'fun f(x) { return x + 1; } print f(f(f(1)));'
+        for limit in [0, 2, 3]:
+            budget = Budget(max_steps=limit)
+            with self.subTest(limit=limit):
+                self.assertEqual(
+                    run(source, budget=budget), run(source, False, budget=budget)
+                )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import io
+import time
+import unittest
+
+from src import Budget, compile, LoxBudgetError, LoxRuntimeError
+
+
+def run(source: str) -> str:
+    output = io.StringIO()
+    compile(source).run(output=output)
+    return output.getvalue()
+
+
+class TestParallelMap(unittest.TestCase):
+
+    def test_results_in_order(self):
+        source = '''
+            fun square(x) { return x * x; }
+            fun f(x) { return square(x) - x; }
+            print parallelMap(f, 0, 50);
+        '''
+        expected = [x * x - x for x in range(50)]
+        self.assertEqual(run(source), f'[{", ".join(map(str, expected))}]\n')
+        self.assertEqual(run('fun f(x) { return x; } print parallelMap(f, 3, 3);'),
+                         '[]\n')
+
+    def test_reads_globals(self):
+        source = '''
+            var k = 3;
+            var label = "n";
+            fun f(x) { return x * k; }
+            fun g(x) { return label + "!"; }
+            print parallelMap(f, 0, 4);
+            print parallelMap(g, 0, 2);
+        '''
+        self.assertEqual(run(source), '[0, 3, 6, 9]\n[n!, n!]\n')
+
+    def test_errors_are_located(self):
+        source = '''fun f(x) {
+  if (x == 7) return -"seven";
+  return x;
+}
+print parallelMap(f, 0, 20);'''
+        with self.assertRaises(LoxRuntimeError) as context:
+            compile(source).run()
+        self.assertEqual(
+            str(context.exception),
+            'Operand must be a number.\n[line 2, column 22]',
+        )
+
+    def test_bad_arguments_are_located(self):
+        for source, message in [
+            ('print 1;\nprint parallelMap(clock, 0, 2);',
+             'parallelMap() expects a function of one argument.'),
+            ('fun f(x) { return x; }\nprint parallelMap(f, "a", 2);',
+             'parallelMap() expects numeric bounds.'),
+        ]:
+            with self.subTest(source=source):
+                with self.assertRaises(LoxRuntimeError) as context:
+                    compile(source).run()
+                self.assertEqual(context.exception.msg, message)
+                self.assertEqual(context.exception.line, 2)
+
+    def test_output_in_order(self):
+        source = 'fun f(x) { print x; return x * 2; } print parallelMap(f, 0, 30);'
+        expected = ''.join(f'{x}\n' for x in range(30))
+        expected += f'[{", ".join(str(x * 2) for x in range(30))}]\n'
+        self.assertEqual(run(source), expected)
+
+    def test_budget(self):
+        source = '''
+            fun f(x) {
+                var n = 0;
+                for (var i = 0; i < %d; i = i + 1) n = n + 1;
+                return n;
+            }
+            print parallelMap(f, 0, 40);
+        '''
+        program = compile(source % 20_000)
+        with self.assertRaises(LoxBudgetError) as context:
+            program.run(output=io.StringIO(), budget=Budget(max_steps=100))
+        self.assertEqual(str(context.exception),
+                         'Exceeded step limit of 100.\n[line 4, column 17]')
+        # No one chunk goes over, but all of them together do.
+        program = compile(source % 10)
+        with self.assertRaises(LoxBudgetError):
+            program.run(output=io.StringIO(), budget=Budget(max_steps=200))
+        program.run(output=io.StringIO(), budget=Budget(max_steps=1000))
+
+        start = time.monotonic()
+        with self.assertRaises(LoxBudgetError):
+            compile('fun f(x) { while (true) {} } parallelMap(f, 0, 8);').run(
+                budget=Budget(timeout=0.2)
+            )
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_nothing_left_over_between_runs(self):
+        run('fun helper(x) { return x; } fun f(x) { return helper(x); }'
+            ' print parallelMap(f, 0, 4);')
+        with self.assertRaises(LoxRuntimeError) as context:
+            run('fun f(x) { return helper(x); } print parallelMap(f, 0, 4);')
+        self.assertIn("Undefined variable 'helper'.", str(context.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
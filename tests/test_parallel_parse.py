@@ -0,0 +1,77 @@
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+from src import _parallel_parse
+from src._parallel_parse import parse_parallel, split_points
+from src._parse import Parser
+from src._scan import scan
+from src._serialize import dump_statements, load_statements
+
+SOURCE = '''
+var total = 0;
+fun add(a, b) { return a + b; }
+class Counter < Base {
+    init() { this.n = -0.0; }
+    bump() { this.n = this.n + 1; return this; }
+}
+for (var i = 0; i < 10; i = i + 1) { total = add(total, i * 2.5); }
+if (total > 3) print "big"; else { print "small"; }
+{ var s = "a"; while (s != "aaa") s = s + "a"; print !nil or s; }
+print Counter().bump().n;
+'''
+
+
+def parse(source: str):
+    tokens, _ = scan(source)
+    parser = Parser()
+    return parser.parse(tokens), [str(error) for error in parser.errors]
+
+
+class TestParallelParse(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.executor = ProcessPoolExecutor(2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.shutdown()
+
+    def parse_parallel(self, source: str):
+        tokens, _ = scan(source)
+        # Cut even tiny programs into chunks of a declaration or two.
+        with mock.patch.object(_parallel_parse, 'MIN_CHUNK_TOKENS', 5):
+            statements, errors = parse_parallel(source, tokens, self.executor)
+        return statements, [str(error) for error in errors]
+
+    def test_split_points(self):
+        source = 'var a = 1; if (a) { a = 2; } else a = 3; for (;;) {} print a;'
+        tokens, _ = scan(source)
+        self.assertEqual(
+            [str(tokens[point].lexeme) for point in split_points(tokens)],
+            ['if', 'for', 'print'],
+        )
+
+    def test_same_as_serial(self):
+        statements, errors = self.parse_parallel(SOURCE)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(statements), 7)
+        self.assertEqual(statements, parse(SOURCE)[0])
+
+    def test_errors_in_order(self):
+        for source in [
+            SOURCE + 'print (; x = 1; var y = 2; print );' + SOURCE,
+            'var a = ;' + SOURCE + 'fun f( {}',
+            SOURCE + '{ print 1;',
+        ]:
+            with self.subTest(source=source):
+                self.assertEqual(self.parse_parallel(source), parse(source))
+
+    def test_serialized(self):
+        statements, _ = parse(SOURCE)
+        self.assertEqual(load_statements(dump_statements(statements)), statements)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+
+from src._jit import TracingInterpreter
+from src._parse import Parser
+from src._profile import Profile
+from src._scan import scan
+from src._symbols import symbols
+
+SOURCE = '''
+fun total(n) {
+    var sum = 0;
+    for (var i = 0; i < n; i = i + 1) { sum = sum + i; }
+    result = sum;
+}
+var result;
+for (var k = 0; k < 30; k = k + 1) total(5);
+var x = 0;
+while (x < 100) { x = x + 0.5; }
+'''
+
+
+def parse(source: str):
+    tokens, _ = scan(source)
+    return Parser().parse(tokens)
+
+
+class TestProfile(unittest.TestCase):
+
+    def run_with_profile(self, profile: Profile) -> TracingInterpreter:
+        statements = parse(SOURCE)
+        interpreter = TracingInterpreter()
+        profile.apply(SOURCE, statements, interpreter)
+        self.assertIsNone(interpreter.interpret(statements))
+        profile.record(SOURCE, statements, interpreter)
+        return interpreter
+
+    def test_profile_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'profile.json')
+            profile = Profile.load(path)
+            first = self.run_with_profile(profile)
+            profile.save(path)
+            second = self.run_with_profile(Profile.load(path))
+
+        def compiled(interpreter):
+            return {
+                trace.stmt.offset: trace.iterations
+                for trace in interpreter.traces.values()
+                if trace.compiled is not None
+            }
+
+        # The first run compiles the two loops without calls once they warm up, and
+        # the second compiles them before they run a single iteration.
+        self.assertEqual(len(compiled(first)), 2)
+        self.assertTrue(all(compiled(first).values()))
+        self.assertEqual(compiled(second).keys(), compiled(first).keys())
+        self.assertFalse(any(compiled(second).values()))
+        for name in ('result', 'x'):
+            symbol = symbols.intern(name)
+            values = second.globals.values, first.globals.values
+            self.assertEqual(values[0][symbol], values[1][symbol])
+
+    def test_not_a_profile(self):
+        profile = Profile()
+        self.run_with_profile(profile)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'profile.json')
+            profile.save(path)
+            with open(path, 'rt') as f:
+                saved = f.read()
+            for data in [
+                '', saved[:-10], '[]', '{"version": 1}', '{"version": 1, "sources": 3}',
+                '{"version": 1, "sources": {"k": {"types": {"x": []}}}}',
+            ]:
+                with self.subTest(data=data):
+                    with open(path, 'wt') as f:
+                        f.write(data)
+                    self.assertEqual(Profile.load(path).sources, {})
+            with open(path, 'wb') as f:
+                f.write(b'\xff\xfe')
+            self.assertEqual(Profile.load(path).sources, {})
+
+    def test_other_sources_are_unaffected(self):
+        profile = Profile()
+        self.run_with_profile(profile)
+        source = 'var i = 0; while (i < 10) { i = i + 1; }'
+        interpreter = TracingInterpreter()
+        profile.apply(source, parse(source), interpreter)
+        self.assertEqual(interpreter.feedback, {})
+        self.assertEqual(interpreter.traces, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
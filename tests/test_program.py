@@ -0,0 +1,44 @@
+import io
+import unittest
+
+from src import compile, LoxCompileError, LoxRuntimeError
+from src._symbols import symbols
+
+
+class TestProgram(unittest.TestCase):
+
+    def test_run_with_injected_globals(self):
+        program = compile('print price * quantity;')
+        for price, quantity, expected in [(2, 3, '6'), (1.5, 2, '3')]:
+            output = io.StringIO()
+            program.run(globals={'price': price, 'quantity': quantity}, output=output)
+            self.assertEqual(output.getvalue(), expected + '\n')
+
+    def test_runs_are_independent(self):
+        program = compile('var seen = 1; if (previous) print "leaked";')
+        output = io.StringIO()
+        program.run(globals={'previous': False}, output=output)
+        program.run(globals={'previous': False}, output=output)
+        self.assertEqual(output.getvalue(), '')
+
+    def test_results_are_read_from_globals(self):
+        interpreter = compile('var total = a + b;').run(globals={'a': 1, 'b': 2})
+        self.assertEqual(interpreter.globals.values[symbols.intern('total')], 3)
+
+    def test_compile_is_cached(self):
+        self.assertIs(compile('print 1;'), compile('print 1;'))
+        self.assertIsNot(compile('print 1;'), compile('print 2;'))
+        # Parsing in parallel doesn't inline calls, so it's cached separately.
+        self.assertIsNot(compile('print 1;'), compile('print 1;', parallel=True))
+        self.assertIs(compile('print 1;', parallel=True), compile('print 1;', True))
+
+    def test_errors(self):
+        with self.assertRaises(LoxCompileError) as context:
+            compile('print 1 +;')
+        self.assertEqual(context.exception.return_code, 65)
+        with self.assertRaises(LoxRuntimeError):
+            compile('print missing;').run()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import asyncio
+import io
+import unittest
+
+from src._async_interpret import AsyncInterpreter
+from src._interpret import Interpreter
+from src._jit import TracingInterpreter
+from src._memprofile import MemoryProfiler
+from src._parse import Parser
+from src._scan import scan
+
+
+def parse(source: str):
+    tokens, _ = scan(source)
+    parser = Parser()
+    statements = parser.parse(tokens)
+    return statements, parser.errors
+
+
+def run(interpreter: Interpreter, source: str) -> str:
+    statements, errors = parse(source)
+    assert not errors, errors
+    output = io.StringIO()
+    interpreter.output = output
+    error = interpreter.interpret(statements)
+    assert error is None, error
+    return output.getvalue()
+
+
+class TestReturn(unittest.TestCase):
+
+    def test_recursive_fib(self):
+        source = '''
+            fun fib(n) {
+                if (n < 2) return n;
+                return fib(n - 2) + fib(n - 1);
+            }
+            print fib(20);
+        '''
+        self.assertEqual(run(Interpreter(), source), '6765\n')
+
+    def test_return_leaves_loops_and_blocks(self):
+        source = '''
+            fun find(limit) {
+                for (var i = 0; i < 100; i = i + 1) {
+                    {
+                        if (i * i > limit) { return i; }
+                    }
+                }
+                return -1;
+            }
+            print find(50);
+            print find(100000);
+        '''
+        for interpreter in [Interpreter(), TracingInterpreter(), MemoryProfiler()]:
+            with self.subTest(interpreter=type(interpreter).__name__):
+                self.assertEqual(run(interpreter, source), '8\n-1\n')
+
+    def test_bare_return_and_falling_off_the_end_give_nil(self):
+        source = '''
+            fun early() { return; print "unreachable"; }
+            fun none() {}
+            print early();
+            print none();
+        '''
+        self.assertEqual(run(Interpreter(), source), 'nil\nnil\n')
+
+    def test_return_from_hot_loop_is_not_compiled(self):
+        source = '''
+            fun count() {
+                var i = 0;
+                while (true) {
+                    i = i + 1;
+                    if (i == 500) return i;
+                }
+            }
+            print count();
+        '''
+        log = io.StringIO()
+        self.assertEqual(run(TracingInterpreter(log=log), source), '500\n')
+        self.assertIn('returns from a function', log.getvalue())
+
+    def test_top_level_return_is_a_parse_error(self):
+        _, errors = parse('print 1; return 2; print 3;')
+        self.assertEqual(len(errors), 1)
+        self.assertIn("Can't return from top-level code.", str(errors[0]))
+
+    def test_async_return(self):
+        source = '''
+            fun slow(n) { sleep(0.001); if (n > 0) return n + slow(n - 1); return 0; }
+            print slow(10);
+        '''
+        statements, _ = parse(source)
+        output = io.StringIO()
+        error = asyncio.run(AsyncInterpreter(output=output).interpret_async(statements))
+        self.assertIsNone(error)
+        self.assertEqual(output.getvalue(), '55\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import io
+import marshal
+import os
+import tempfile
+import unittest
+
+from src import compile, LoxRuntimeError, Snapshot
+from src._snapshot import SNAPSHOT_VERSION
+from src._symbols import symbols
+
+PRELUDE = '''
+fun square(x) { return x * x; }
+fun sum(n) {
+    var total = 0;
+    for (var i = 0; i < n; i = i + 1) total = total + square(i);
+    return total;
+}
+var alias = sum;
+var greeting = "hello" + ", " + "world";
+var limit = 4;
+var ratio = -0.0;
+var flag = true;
+var nothing;
+'''
+PROGRAM = '''
+print sum(limit) + alias(2);
+print greeting;
+print ratio;
+print flag and !nothing;
+limit = limit + 1;
+print limit;
+'''
+
+
+def run(program: str, snapshot: Snapshot | None = None) -> str:
+    output = io.StringIO()
+    compile(program).run(output=output, snapshot=snapshot)
+    return output.getvalue()
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def test_same_as_running_the_prelude(self):
+        expected = run(PRELUDE + PROGRAM)
+        snapshot = Snapshot.capture(compile(PRELUDE).run())
+        self.assertEqual(run(PROGRAM, snapshot), expected)
+        loaded = Snapshot.from_bytes(snapshot.to_bytes())
+        self.assertEqual(run(PROGRAM, loaded), expected)
+
+    def test_save_and_load(self):
+        snapshot = Snapshot.capture(compile(PRELUDE).run())
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'prelude.snapshot')
+            snapshot.save(path)
+            self.assertEqual(os.listdir(directory), ['prelude.snapshot'])
+            self.assertEqual(run(PROGRAM, Snapshot.load(path)), run(PRELUDE + PROGRAM))
+
+    def test_shared_declarations(self):
+        snapshot = Snapshot.from_bytes(
+            Snapshot.capture(compile(PRELUDE).run()).to_bytes()
+        )
+        values = snapshot.values
+        self.assertIs(values[symbols.intern('alias')], values[symbols.intern('sum')])
+
+    def test_instances_are_independent(self):
+        snapshot = Snapshot.capture(compile(PRELUDE).run())
+        first = snapshot.instantiate()
+        first.interpret(compile('limit = 10; var extra = 1;').statements)
+        second = snapshot.instantiate()
+        self.assertEqual(second.globals.values[symbols.intern('limit')], 4)
+        self.assertNotIn(symbols.intern('extra'), second.globals.values)
+        self.assertEqual(run('print limit;', snapshot), '4\n')
+
+    def test_builtins_are_not_captured(self):
+        snapshot = Snapshot.capture(compile('var n = 1;').run())
+        self.assertEqual(list(snapshot.values), [symbols.intern('n')])
+        self.assertEqual(run('print clock() > 0;', snapshot), 'true\n')
+
+    def test_not_capturable(self):
+        for source in [
+            'fun outer() { var n = 1; fun inner() { return n; } return inner; }'
+            ' var f = outer();',
+            'class A {}',
+            'class A {} var a = A();',
+            'class A { m() {} } var m = A().m;',
+            'var c = clock;',
+        ]:
+            with self.subTest(source=source):
+                interpreter = compile(source).run()
+                with self.assertRaises(ValueError):
+                    Snapshot.capture(interpreter)
+
+    def test_errors_are_located_in_their_source(self):
+        prelude = compile('fun helper(a) {\n  return a - 1;\n}')
+        snapshot = Snapshot.capture(prelude.run(), prelude.lines)
+        program = compile('var x = "s";\n\nprint helper(2);\n\nprint helper(x);')
+        for snapshot in [snapshot, Snapshot.from_bytes(snapshot.to_bytes())]:
+            with self.assertRaises(LoxRuntimeError) as context:
+                program.run(output=io.StringIO(), snapshot=snapshot)
+            self.assertEqual(
+                str(context.exception), 'Operands must be numbers.\n[line 2, column 12]'
+            )
+        # Errors in the program are still located in the program.
+        with self.assertRaises(LoxRuntimeError) as context:
+            compile('print helper(1);\nprint -"x";').run(
+                output=io.StringIO(), snapshot=snapshot
+            )
+        self.assertEqual(context.exception.where(), 'line 2, column 7')
+
+    def test_errors_without_lines_are_unlocated(self):
+        source = 'fun helper(a) {\n  return a - 1;\n}'
+        snapshot = Snapshot.capture(compile(source).run())
+        with self.assertRaises(LoxRuntimeError) as context:
+            compile('print helper("s");').run(snapshot=snapshot)
+        self.assertIsNone(context.exception.line)
+        self.assertEqual(context.exception.offset, source.index('-'))
+
+    def test_not_a_snapshot(self):
+        snapshot = Snapshot.capture(compile(PRELUDE).run())
+        for data in [
+            b'', b'junk', snapshot.to_bytes()[:-3], marshal.dumps(3),
+            marshal.dumps((SNAPSHOT_VERSION, ['f'], [(99,)], [], None)),
+            marshal.dumps((SNAPSHOT_VERSION, ['f'], [(5, 0.5)], [], None)),
+            marshal.dumps((SNAPSHOT_VERSION, [], [], [(5, False, 1)], None)),
+            marshal.dumps((SNAPSHOT_VERSION + 1, [], [], [], None)),
+        ]:
+            with self.subTest(data=data):
+                with self.assertRaises(ValueError):
+                    Snapshot.from_bytes(data)
+
+
+if __name__ == '__main__':
+    unittest.main()
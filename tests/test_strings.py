@@ -0,0 +1,92 @@
+import io
+import unittest
+
+from src._interpret import Interpreter
+from src._jit import TracingInterpreter
+from src._parse import Parser
+from src._scan import scan
+from src._strings import ROPE_THRESHOLD, Rope
+from src._symbols import symbols
+
+
+def parse(source: str):
+    tokens, _ = scan(source)
+    return Parser().parse(tokens)
+
+
+def run(interpreter: Interpreter, source: str) -> str:
+    output = io.StringIO()
+    interpreter.output = output
+    error = interpreter.interpret(parse(source))
+    assert error is None, error
+    return output.getvalue()
+
+
+class TestRopes(unittest.TestCase):
+
+    def test_long_concatenations_are_ropes(self):
+        interpreter = Interpreter()
+        run(interpreter, f'''
+            var short = "a" + "b";
+            var long = "{"x" * ROPE_THRESHOLD}" + "y";
+            var longer = long + "z";
+        ''')
+        values = interpreter.globals.values
+        self.assertEqual(values[symbols.intern('short')], 'ab')
+        long = values[symbols.intern('long')]
+        longer = values[symbols.intern('longer')]
+        assert isinstance(long, Rope) and isinstance(longer, Rope)
+        self.assertEqual(len(longer), ROPE_THRESHOLD + 2)
+        self.assertEqual(str(longer), 'x' * ROPE_THRESHOLD + 'yz')
+        self.assertEqual(str(long), 'x' * ROPE_THRESHOLD + 'y')
+
+    def test_appends_to_the_same_rope_dont_interfere(self):
+        source = f'''
+            var base = "{"-" * ROPE_THRESHOLD}";
+            base = base + "|";
+            var left = base + "left";
+            var right = base + "right";
+            var leftMore = left + "!";
+            print left == base + "left";
+            print right == base + "right";
+            print leftMore == left + "!";
+            print left == right;
+        '''
+        self.assertEqual(run(Interpreter(), source), 'true\ntrue\ntrue\nfalse\n')
+
+    def test_semantics_match_plain_strings(self):
+        source = f'''
+            var s = "";
+            for (var i = 0; i < 200; i = i + 1) {{ s = s + "ab"; }}
+            var plain = "{"ab" * 200}";
+            print s == plain;
+            print plain == s;
+            print s != plain + "c";
+            print s == 400;
+            print s == nil;
+            print s + s == plain + plain;
+            if (s) print "truthy";
+            var short = "";
+            for (var i = 0; i < 3; i = i + 1) {{ short = short + "ab"; }}
+            print short;
+            print s + "!" == plain + "!";
+        '''
+        expected = 'true\ntrue\ntrue\nfalse\nfalse\ntrue\ntruthy\nababab\ntrue\n'
+        for interpreter in [Interpreter(), TracingInterpreter()]:
+            with self.subTest(interpreter=type(interpreter).__name__):
+                self.assertEqual(run(interpreter, source), expected)
+
+    def test_printing_flattens(self):
+        output = run(Interpreter(), f'var s = "{"=" * ROPE_THRESHOLD}" + "."; print s;')
+        self.assertEqual(output, '=' * ROPE_THRESHOLD + '.\n')
+
+    def test_appends_are_charged_for_what_they_add(self):
+        loop = 'var s = ""; for (var i = 0; i < 1000; i = i + 1) { %s }'
+        with_appends, without = Interpreter(), Interpreter()
+        run(with_appends, loop % 's = s + "abcd";')
+        run(without, loop % 's;')
+        # Charging for the whole string on every append would come to about 2MB.
+        self.assertLess(with_appends.alloc_bytes - without.alloc_bytes, 100_000)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import io
+import os
+import sys
+import threading
+import time
+import unittest
+
+from src._interpret import Interpreter
+from src._parse import Parser
+from src._scan import scan
+
+N_THREADS = 4
+
+SOURCE = '''
+var total = 0;
+for (var i = 0; i < 20000; i = i + 1) {
+    total = total + i;
+}
+print total;
+'''
+
+
+def parse(source: str):
+    tokens, _ = scan(source)
+    return Parser().parse(tokens)
+
+
+def run_on_threads(n_threads: int) -> tuple[float, list[str]]:
+    '''Run one interpreter per thread, returning the wall time and each output.'''
+    statements = parse(SOURCE)
+    outputs = [io.StringIO() for _ in range(n_threads)]
+    interpreters = [Interpreter(output=output) for output in outputs]
+    threads = [
+        threading.Thread(target=interpreter.interpret, args=(statements,))
+        for interpreter in interpreters
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, [output.getvalue() for output in outputs]
+
+
+class TestThreads(unittest.TestCase):
+
+    def test_interpreters_on_threads_are_independent(self):
+        _, outputs = run_on_threads(N_THREADS)
+        self.assertEqual(outputs, ['199990000\n'] * N_THREADS)
+
+    @unittest.skipIf(
+        getattr(sys, '_is_gil_enabled', lambda: True)(),
+        'Throughput only scales with threads on free-threaded Python.',
+    )
+    @unittest.skipIf((os.cpu_count() or 1) < N_THREADS, 'Not enough cores.')
+    def test_throughput_scales_with_threads(self):
+        one_thread, _ = run_on_threads(1)
+        many_threads, _ = run_on_threads(N_THREADS)
+        # N times the work should take well under N times as long.
+        self.assertLess(many_threads, one_thread * N_THREADS * 0.6)
+
+
+if __name__ == '__main__':
+    unittest.main()